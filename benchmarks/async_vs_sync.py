@@ -0,0 +1,110 @@
+"""
+Compare concurrent-request throughput of the sync and async accounts views.
+
+Both modes hit the same local FakeXeroServer, which answers every Accounts
+request after a fixed delay. The sync view is driven by a fixed pool of
+threads, like a threaded WSGI server; the async view is driven from a single
+event loop, like one ASGI worker. Sync coalescing is bypassed, so every
+request makes its own Xero call.
+
+Usage:
+    python -m benchmarks.async_vs_sync --requests 200 --threads 8 --latency 0.2
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import benchmark_database, emit, make_accounts, setup_django, uncoalesced_syncs
+
+
+def run_sync(requests, threads):
+    from django.test import Client
+
+    def call(_):
+        response = Client().get("/api/v1/xero/accounts/update/", {"wait": "true"})
+        assert response.status_code == 200, response.content
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(call, range(requests)))
+    return time.perf_counter() - started
+
+
+def run_async(requests, concurrency):
+    from django.test import AsyncClient
+
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                response = await client.get("/api/v1/xero/async/accounts/update/")
+                assert response.status_code == 200, response.content
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(requests)))
+        return time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=8, help="Thread pool size for the sync view.")
+    parser.add_argument("--concurrency", type=int, default=100, help="In-flight requests for the async view.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the fake Xero server waits per call.")
+    parser.add_argument("--accounts", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+    from django.utils import timezone
+    from datetime import timedelta
+    from features.xero.models import XeroToken
+    from features.xero.testing import FakeXeroServer
+
+    with benchmark_database(), FakeXeroServer() as server:
+        server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": make_accounts(args.accounts)}, delay=args.latency)
+        with override_settings(
+            XERO_API_BASE_URL=server.url,
+            XERO_IDENTITY_BASE_URL=server.url,
+            XERO_SYNC_IN_BACKGROUND=False,
+            XERO_HTTP_POOL_SIZE=max(args.threads, args.concurrency),
+            # The fake server does not enforce Xero's limits here.
+            XERO_RATE_LIMIT_ENABLED=False,
+        ), uncoalesced_syncs():
+            XeroToken.objects.create(
+                access_token="benchmark",
+                refresh_token="benchmark",
+                expires_in=3600,
+                expires_at=timezone.now() + timedelta(hours=1),
+            )
+            # Prime the chart so the timed runs measure request handling rather
+            # than the one-off initial insert.
+            run_sync(1, 1)
+            sync_seconds = run_sync(args.requests, args.threads)
+            async_seconds = run_async(args.requests, args.concurrency)
+
+    emit({
+        "benchmark": "async_vs_sync",
+        "requests": args.requests,
+        "latency_seconds": args.latency,
+        "accounts": args.accounts,
+        "sync": {
+            "threads": args.threads,
+            "seconds": round(sync_seconds, 4),
+            "requests_per_second": round(args.requests / sync_seconds, 2),
+        },
+        "async": {
+            "concurrency": args.concurrency,
+            "seconds": round(async_seconds, 4),
+            "requests_per_second": round(args.requests / async_seconds, 2),
+        },
+    })
+
+
+if __name__ == "__main__":
+    main()
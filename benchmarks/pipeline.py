@@ -0,0 +1,267 @@
+"""
+End-to-end benchmark of the /accounts/update/ sync pipeline.
+
+For each payload size a local FakeXeroServer serves a synthetic Accounts
+payload, with optional latency and injected 503s, and the update endpoint is
+called in-process. Two scenarios are measured per size and mode: ``initial``
+syncs into an empty table, ``resync`` reconciles the same payload again.
+``buffered`` is the default update that echoes the accounts; ``stream`` is
+``?stream=true``.
+
+Each scenario reports the best wall time of ``--repeat`` runs with per-stage
+timings taken from that run, then runs once more under tracemalloc to record
+peak Python memory and the SQL query count.
+
+Results are printed as JSON; ``--output`` also writes them to a file.
+``--baseline`` compares against an earlier output and exits with status 1
+when a metric is worse by more than ``--tolerance``.
+
+Usage:
+    python -m benchmarks.pipeline --sizes 100 10000 100000 --output bench.json
+    python -m benchmarks.pipeline --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import functools
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import ExitStack
+from unittest import mock
+
+from benchmarks.common import BASE_DIR, benchmark_database, emit, make_accounts, setup_django
+
+MODES = {"buffered": {}, "stream": {"stream": "true"}}
+# Stages every run must go through; a run without them did not sync, e.g.
+# because its result was shared from an earlier run.
+SYNC_STAGES = {"buffered": ("fetch", "write"), "stream": ("fetch", "parse_and_write")}
+# Metrics compared against a baseline; lower is better for all of them.
+COMPARED_METRICS = ("seconds", "queries", "peak_memory_bytes")
+
+
+class StageTimer:
+    """
+    Accumulate the time spent in wrapped callables, per stage.
+    """
+    def __init__(self):
+        self.seconds = defaultdict(float)
+
+    def wrap(self, stage, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - started
+        return timed
+
+    def patches(self):
+        """
+        Return patchers that time each stage of the sync pipeline.
+
+        ``fetch`` ends when the response headers arrive for streamed calls, or
+        the whole body for buffered ones; a streamed body is read inside
+        ``parse_and_write``.
+        """
+        import requests
+        from features.xero import sync, views
+        from features.xero.renderers import FastJSONRenderer
+
+        return [
+            mock.patch.object(sync, "xero_get", self.wrap("fetch", sync.xero_get)),
+            mock.patch.object(requests.Response, "json", self.wrap("parse", requests.Response.json)),
+            mock.patch.object(sync, "upsert_accounts", self.wrap("write", sync.upsert_accounts)),
+            mock.patch.object(
+                sync, "upsert_account_stream", self.wrap("parse_and_write", sync.upsert_account_stream)
+            ),
+            mock.patch.object(
+                views.account_values_serializer,
+                "serialize_objects",
+                self.wrap("serialize", views.account_values_serializer.serialize_objects),
+            ),
+            mock.patch.object(FastJSONRenderer, "render", self.wrap("render", FastJSONRenderer.render)),
+        ]
+
+
+def reset_accounts():
+    from features.xero.models import ChartOfAccount, XeroSyncState
+
+    ChartOfAccount.objects.all().delete()
+    XeroSyncState.objects.all().delete()
+
+
+def call_update(params):
+    from django.test import Client
+
+    return Client().get("/api/v1/xero/accounts/update/", {"wait": "true", "full": "true", **params})
+
+
+def timed_run(mode):
+    """
+    Call the endpoint once, returning its wall time, status and stage timings.
+    """
+    params = MODES[mode]
+    timer = StageTimer()
+    with ExitStack() as stack:
+        for patcher in timer.patches():
+            stack.enter_context(patcher)
+        started = time.perf_counter()
+        response = call_update(params)
+        seconds = time.perf_counter() - started
+
+    # A call failed by injected errors legitimately stops after the fetch.
+    if response.status_code == 200:
+        missing = [stage for stage in SYNC_STAGES[mode] if stage not in timer.seconds]
+        assert not missing, f"{mode} run skipped the {', '.join(missing)} stage(s); the sync did not run"
+    stages = {stage: round(value, 4) for stage, value in sorted(timer.seconds.items())}
+    stages["other"] = round(max(seconds - sum(timer.seconds.values()), 0), 4)
+    return {
+        "seconds": round(seconds, 4),
+        "status": response.status_code,
+        "response_bytes": len(response.content),
+        "stages": stages,
+    }
+
+
+def traced_run(params):
+    """
+    Call the endpoint once under tracemalloc, counting SQL queries.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            call_update(params)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"queries": len(queries), "peak_memory_bytes": peak}
+
+
+def measure(mode, repeat, prepare):
+    """
+    Run a scenario ``repeat`` times plus one traced run, calling ``prepare``
+    before each to put the database in the scenario's starting state.
+    """
+    best = None
+    for _ in range(repeat):
+        prepare()
+        run = timed_run(mode)
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+    prepare()
+    return {**best, **traced_run(MODES[mode])}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return the metrics that got worse than ``baseline`` by more than ``tolerance``.
+    """
+    previous = {(r["accounts"], r["mode"], r["scenario"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["accounts"], result["mode"], result["scenario"]))
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append({
+                    "accounts": result["accounts"],
+                    "mode": result["mode"],
+                    "scenario": result["scenario"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": round(new / old - 1, 3),
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=sorted(MODES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the fake Xero server waits per call.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with a 503.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the injected errors.")
+    parser.add_argument("--output", help="Also write the results to this file.")
+    parser.add_argument("--baseline", help="Earlier output to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a regression.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+    from features.xero.models import XeroToken
+    from features.xero.testing import FakeXeroServer
+
+    results = []
+    with benchmark_database(), FakeXeroServer() as server:
+        server.inject_errors(args.error_rate, seed=args.seed)
+        with override_settings(
+            XERO_API_BASE_URL=server.url,
+            XERO_IDENTITY_BASE_URL=server.url,
+            XERO_SYNC_IN_BACKGROUND=False,
+            XERO_HTTP_BACKOFF_FACTOR=0,
+            XERO_RATE_LIMIT_PER_MINUTE=10 ** 6,
+            # Every run must sync; a result shared from the previous run
+            # would skip the fetch and write stages.
+            XERO_SYNC_FRESH_SECONDS=0,
+        ):
+            XeroToken.objects.create(access_token="benchmark", refresh_token="benchmark", expires_in=3600)
+            for size in args.sizes:
+                server.routes.clear()
+                server.add(
+                    "GET", "/api.xro/2.0/Accounts", json={"Accounts": make_accounts(size)}, delay=args.latency
+                )
+                for mode in args.modes:
+                    params = MODES[mode]
+
+                    def populate():
+                        reset_accounts()
+                        call_update(params)
+
+                    scenarios = {"initial": reset_accounts, "resync": populate}
+                    for scenario, prepare in scenarios.items():
+                        run = measure(mode, args.repeat, prepare)
+                        results.append({"accounts": size, "mode": mode, "scenario": scenario, **run})
+
+    output = {
+        "benchmark": "pipeline",
+        "revision": git_revision(),
+        "repeat": args.repeat,
+        "latency_seconds": args.latency,
+        "error_rate": args.error_rate,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            output["regressions"] = compare(results, json.load(baseline), args.tolerance)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(output, file, indent=2, sort_keys=True)
+    emit(output)
+    if output.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
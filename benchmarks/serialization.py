@@ -0,0 +1,75 @@
+"""
+Compare the ModelSerializer/JSONRenderer path with the values()/FastJSONRenderer
+path used by the accounts endpoints.
+
+Each size is loaded into a fresh table, then both paths serialize and render
+the whole table; the best of ``--repeat`` runs is reported. The outputs are
+checked to be byte-identical.
+
+Usage:
+    python -m benchmarks.serialization --sizes 1000 10000 100000 --repeat 3
+"""
+import argparse
+import time
+
+from benchmarks.common import benchmark_database, emit, make_accounts, setup_django
+
+
+def best_of(repeat, func):
+    timings, output = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from features.xero.models import ChartOfAccount
+    from features.xero.renderers import FastJSONRenderer, orjson
+    from features.xero.serializers import ChartOfAccountSerializer, account_values_serializer
+    from features.xero.sync import upsert_accounts
+
+    def model_serializer():
+        data = ChartOfAccountSerializer(ChartOfAccount.objects.all(), many=True).data
+        return JSONRenderer().render(data)
+
+    def values_serializer():
+        rows = account_values_serializer.values(ChartOfAccount.objects.all())
+        return FastJSONRenderer().render(account_values_serializer.serialize_rows(rows))
+
+    results = []
+    with benchmark_database():
+        for size in args.sizes:
+            ChartOfAccount.objects.all().delete()
+            upsert_accounts(make_accounts(size))
+
+            model_seconds, expected = best_of(args.repeat, model_serializer)
+            values_seconds, rendered = best_of(args.repeat, values_serializer)
+            assert rendered == expected, "outputs differ"
+
+            results.append({
+                "rows": size,
+                "bytes": len(rendered),
+                "model_serializer_seconds": round(model_seconds, 4),
+                "values_serializer_seconds": round(values_seconds, 4),
+                "speedup": round(model_seconds / values_seconds, 2),
+            })
+
+    emit({
+        "benchmark": "serialization",
+        "orjson": orjson is not None,
+        "repeat": args.repeat,
+        "results": results,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -51,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "features.common.middleware.metrics_middleware",
+    "features.common.middleware.query_count_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,16 +83,6 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 
 
-# Database
-# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
-
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
-}
-
 AUTH_USER_MODEL = "users.BaseUser"
 
 # Password validation
@@ -134,4 +126,8 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-from config.settings.rest_framework import *
\ No newline at end of file
+from config.settings.database import *
+from config.settings.rest_framework import *
+from config.settings.logging import *
+from config.settings.metrics import *
+from config.settings.xero import *
\ No newline at end of file
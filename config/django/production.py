@@ -0,0 +1,3 @@
+from config.django.base import *
+
+DEBUG = env.bool("DJANGO_DEBUG", default=False)
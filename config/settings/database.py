@@ -0,0 +1,56 @@
+from config.env import BASE_DIR, env
+
+# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+
+# Seconds a connection is kept open between requests (0 closes it after every
+# request), and whether a kept connection is checked before it is reused, so
+# one dropped by the server is replaced instead of failing the request. Both
+# are read here only, for every profile; production deployments should set
+# DATABASE_CONN_MAX_AGE=600 and DATABASE_CONN_HEALTH_CHECKS=true.
+DATABASE_CONN_MAX_AGE = env.int("DATABASE_CONN_MAX_AGE", default=0)
+DATABASE_CONN_HEALTH_CHECKS = env.bool("DATABASE_CONN_HEALTH_CHECKS", default=False)
+
+# SQLite only: use write-ahead logging, so reads run alongside a sync's write
+# transaction instead of waiting for it, and wait up to this many seconds for
+# the write lock instead of failing with "database is locked".
+SQLITE_WAL = env.bool("SQLITE_WAL", default=True)
+SQLITE_BUSY_TIMEOUT = env.float("SQLITE_BUSY_TIMEOUT", default=20.0)
+
+
+def database_config(url):
+    config = env.db_url_config(url)
+    config["CONN_MAX_AGE"] = DATABASE_CONN_MAX_AGE
+    config["CONN_HEALTH_CHECKS"] = DATABASE_CONN_HEALTH_CHECKS
+    if config["ENGINE"] == "django.db.backends.sqlite3":
+        options = config.setdefault("OPTIONS", {})
+        options.setdefault("timeout", SQLITE_BUSY_TIMEOUT)
+        # Take the write lock when a transaction starts. A deferred transaction
+        # that reads and then writes can't wait for the lock and fails at once.
+        options.setdefault("transaction_mode", "IMMEDIATE")
+        if SQLITE_WAL:
+            options.setdefault("init_command", "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL")
+    return config
+
+
+DATABASES = {
+    "default": database_config(env.str("DATABASE_URL", default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")),
+}
+
+# Read replicas of the primary, as database URLs. Views that opt in read from
+# them (see features.common.db); every write goes to the primary.
+DATABASE_REPLICAS = []
+for number, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[]), start=1):
+    alias = f"replica{number}"
+    DATABASES[alias] = database_config(url)
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["features.common.db.ReplicaRouter"]
+
+# With DEBUG on, requests running more SQL queries than this are logged as a
+# warning; the query count of every other request is logged at DEBUG.
+QUERY_COUNT_WARNING = env.int("QUERY_COUNT_WARNING", default=50)
+
+# Seconds after a sync commits during which reads stay on the primary, so a
+# client sees its own sync's changes. Set it above the replicas' usual lag.
+DATABASE_REPLICA_LAG = env.float("DATABASE_REPLICA_LAG", default=5.0)
@@ -0,0 +1,18 @@
+from config.env import env
+
+# Send the app's own loggers to the console, next to Django's defaults.
+# Set FEATURES_LOG_LEVEL=DEBUG for more detail, including the query count of
+# every request in DEBUG mode.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "features": {
+            "handlers": ["console"],
+            "level": env.str("FEATURES_LOG_LEVEL", default="INFO"),
+        },
+    },
+}
@@ -0,0 +1,5 @@
+from config.env import env
+
+# Bearer token required to scrape /metrics. Leave empty to serve it openly,
+# e.g. when the endpoint is only reachable from inside the cluster.
+METRICS_AUTH_TOKEN = env.str("METRICS_AUTH_TOKEN", default="")
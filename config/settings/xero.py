@@ -0,0 +1,134 @@
+import os
+import tempfile
+
+from config.env import env
+
+# Seconds between full Chart of Accounts reconciles. Syncs in between only
+# fetch accounts modified since the stored watermark.
+XERO_FULL_SYNC_INTERVAL = env.int("XERO_FULL_SYNC_INTERVAL", default=24 * 60 * 60)
+
+# Base URLs for the Xero APIs. Point these at a local stand-in server in tests.
+XERO_API_BASE_URL = env.str("XERO_API_BASE_URL", default="https://api.xero.com")
+XERO_IDENTITY_BASE_URL = env.str("XERO_IDENTITY_BASE_URL", default="https://identity.xero.com")
+
+# Shared HTTP client used for every Xero call.
+XERO_HTTP_POOL_SIZE = env.int("XERO_HTTP_POOL_SIZE", default=10)
+XERO_HTTP_CONNECT_TIMEOUT = env.float("XERO_HTTP_CONNECT_TIMEOUT", default=5.0)
+XERO_HTTP_READ_TIMEOUT = env.float("XERO_HTTP_READ_TIMEOUT", default=30.0)
+XERO_HTTP_MAX_RETRIES = env.int("XERO_HTTP_MAX_RETRIES", default=3)
+XERO_HTTP_BACKOFF_FACTOR = env.float("XERO_HTTP_BACKOFF_FACTOR", default=0.5)
+XERO_HTTP_BACKOFF_JITTER = env.float("XERO_HTTP_BACKOFF_JITTER", default=0.5)
+XERO_HTTP_MAX_RETRY_AFTER = env.float("XERO_HTTP_MAX_RETRY_AFTER", default=60.0)
+
+# Access tokens are refreshed this many seconds before they expire.
+XERO_TOKEN_REFRESH_MARGIN = env.int("XERO_TOKEN_REFRESH_MARGIN", default=120)
+# How long one worker may hold the refresh lock before others take over.
+XERO_TOKEN_REFRESH_LEASE = env.int("XERO_TOKEN_REFRESH_LEASE", default=30)
+
+# Run /accounts/update/ in the background job queue (see the xero_worker
+# management command) instead of inside the request.
+XERO_SYNC_IN_BACKGROUND = env.bool("XERO_SYNC_IN_BACKGROUND", default=True)
+# Seconds a worker may hold a job before it is considered crashed and requeued,
+# and seconds between renewals of the lease while the job runs. Keep the
+# heartbeat well below the lease so a slow renewal doesn't let it lapse.
+XERO_JOB_LEASE = env.int("XERO_JOB_LEASE", default=600)
+XERO_JOB_HEARTBEAT = env.float("XERO_JOB_HEARTBEAT", default=60.0)
+XERO_JOB_MAX_ATTEMPTS = env.int("XERO_JOB_MAX_ATTEMPTS", default=3)
+# Base delay in seconds before a failed job is retried; doubles per attempt.
+XERO_JOB_RETRY_DELAY = env.int("XERO_JOB_RETRY_DELAY", default=30)
+
+# Inline syncs of the same entity and tenant run once: requests arriving while
+# one runs, in this or another process, wait for its result, and so do
+# requests arriving up to XERO_SYNC_FRESH_SECONDS after it finished. A waiting
+# request gives up after XERO_SYNC_FLIGHT_WAIT seconds; a sync holding the
+# flight longer than XERO_SYNC_FLIGHT_LEASE seconds is assumed to have died.
+XERO_SYNC_FRESH_SECONDS = env.float("XERO_SYNC_FRESH_SECONDS", default=5.0)
+XERO_SYNC_FLIGHT_WAIT = env.float("XERO_SYNC_FLIGHT_WAIT", default=60.0)
+XERO_SYNC_FLIGHT_LEASE = env.int("XERO_SYNC_FLIGHT_LEASE", default=300)
+
+# Maximum number of tenants synced concurrently by the fan-out sync.
+XERO_FANOUT_WORKERS = env.int("XERO_FANOUT_WORKERS", default=8)
+
+# Largest page clients may request from /accounts/all/ with ?page_size=.
+XERO_ACCOUNTS_MAX_PAGE_SIZE = env.int("XERO_ACCOUNTS_MAX_PAGE_SIZE", default=200)
+
+# Seconds a process trusts its copy of the sync generation behind the
+# accounts list ETag before re-reading it from the database.
+XERO_GENERATION_TTL = env.float("XERO_GENERATION_TTL", default=1.0)
+# Cache holding rendered account list pages, and how long they are kept.
+XERO_PAGE_CACHE_ALIAS = env.str("XERO_PAGE_CACHE_ALIAS", default="default")
+XERO_PAGE_CACHE_TIMEOUT = env.int("XERO_PAGE_CACHE_TIMEOUT", default=300)
+
+# Rows fetched from the database, and written to the response, at a time by
+# the streaming /accounts/export/ endpoint.
+XERO_EXPORT_CHUNK_SIZE = env.int("XERO_EXPORT_CHUNK_SIZE", default=2000)
+
+# Bytes read from the Xero response at a time by streaming syncs.
+XERO_STREAM_CHUNK_SIZE = env.int("XERO_STREAM_CHUNK_SIZE", default=64 * 1024)
+
+# Items requested per page from paged Xero endpoints such as Contacts and
+# Invoices (Xero allows up to 1000), and how many pages are fetched ahead of
+# the database writer.
+XERO_SYNC_PAGE_SIZE = env.int("XERO_SYNC_PAGE_SIZE", default=100)
+XERO_SYNC_PREFETCH_PAGES = env.int("XERO_SYNC_PREFETCH_PAGES", default=2)
+
+# Signing key of the Xero webhook, from the app's webhook settings. Deliveries
+# are rejected while it is unset.
+XERO_WEBHOOK_KEY = env.str("XERO_WEBHOOK_KEY", default="")
+# Seconds webhook events are left to accumulate before the job fetching the
+# changed records runs, and the most events handled per run.
+XERO_WEBHOOK_COALESCE_SECONDS = env.int("XERO_WEBHOOK_COALESCE_SECONDS", default=5)
+XERO_WEBHOOK_BATCH_SIZE = env.int("XERO_WEBHOOK_BATCH_SIZE", default=1000)
+
+# Directory the prebuilt /accounts/snapshot/ files are published to, shared by
+# the processes of a host. A snapshot is built by the first request after a sync.
+XERO_SNAPSHOT_DIR = env.str("XERO_SNAPSHOT_DIR", default=os.path.join(tempfile.gettempdir(), "xero-snapshots"))
+
+# Entries returned per call by /accounts/changes/ unless ?page_size= is given,
+# the most a client may ask for, and the days entries are kept by the
+# xero_compact_changes command.
+XERO_CHANGES_PAGE_SIZE = env.int("XERO_CHANGES_PAGE_SIZE", default=500)
+XERO_CHANGES_MAX_PAGE_SIZE = env.int("XERO_CHANGES_MAX_PAGE_SIZE", default=5000)
+XERO_CHANGES_RETENTION_DAYS = env.int("XERO_CHANGES_RETENTION_DAYS", default=30)
+
+# Client-side scheduling of Xero API calls, shared by every worker through the
+# database. Calls wait for a token in the tenant's and the app's buckets, and
+# for a free slot under the tenant's concurrency cap. Defaults follow Xero's
+# published limits: 60 calls a minute and 5 in flight per tenant, 10,000 a
+# minute per app.
+XERO_RATE_LIMIT_ENABLED = env.bool("XERO_RATE_LIMIT_ENABLED", default=True)
+XERO_RATE_LIMIT_PER_MINUTE = env.int("XERO_RATE_LIMIT_PER_MINUTE", default=60)
+XERO_RATE_LIMIT_APP_PER_MINUTE = env.int("XERO_RATE_LIMIT_APP_PER_MINUTE", default=10000)
+XERO_RATE_LIMIT_CONCURRENT = env.int("XERO_RATE_LIMIT_CONCURRENT", default=5)
+# Length in seconds of the "minute" the per-minute limits refill over.
+XERO_RATE_LIMIT_PERIOD = env.float("XERO_RATE_LIMIT_PERIOD", default=60.0)
+# Longest a call waits for capacity before RateLimitedError is raised, so the
+# caller can requeue the work instead of holding a worker.
+XERO_RATE_LIMIT_MAX_WAIT = env.float("XERO_RATE_LIMIT_MAX_WAIT", default=30.0)
+# Seconds a concurrency slot is held if its worker dies mid-call.
+XERO_RATE_LIMIT_SLOT_LEASE = env.int("XERO_RATE_LIMIT_SLOT_LEASE", default=60)
+# Back-off when X-DayLimit-Remaining reaches zero and Xero sent no Retry-After.
+XERO_RATE_LIMIT_DAY_RETRY = env.int("XERO_RATE_LIMIT_DAY_RETRY", default=60 * 60)
+
+# Circuit breakers, one per Xero endpoint and process. A breaker opens when at
+# least XERO_BREAKER_MIN_CALLS calls were made in the last XERO_BREAKER_WINDOW
+# seconds and XERO_BREAKER_FAILURE_RATE of them failed (a connection error,
+# timeout or 5xx) or took longer than XERO_BREAKER_SLOW_CALL seconds. Calls
+# are then refused for XERO_BREAKER_OPEN_SECONDS, after which up to
+# XERO_BREAKER_PROBES calls are let through: a success closes the breaker, a
+# failure opens it again.
+XERO_BREAKER_ENABLED = env.bool("XERO_BREAKER_ENABLED", default=True)
+XERO_BREAKER_WINDOW = env.float("XERO_BREAKER_WINDOW", default=60.0)
+XERO_BREAKER_MIN_CALLS = env.int("XERO_BREAKER_MIN_CALLS", default=10)
+XERO_BREAKER_FAILURE_RATE = env.float("XERO_BREAKER_FAILURE_RATE", default=0.5)
+XERO_BREAKER_SLOW_CALL = env.float("XERO_BREAKER_SLOW_CALL", default=10.0)
+XERO_BREAKER_OPEN_SECONDS = env.float("XERO_BREAKER_OPEN_SECONDS", default=30.0)
+XERO_BREAKER_PROBES = env.int("XERO_BREAKER_PROBES", default=1)
+
+# Latency budgets in seconds of the views that call Xero: the OAuth callback,
+# the token refresh and inline syncs. Xero calls, waits for rate limit
+# capacity and waits for a concurrent sync are cut short when the budget runs
+# out. 0 disables a budget.
+XERO_CALLBACK_LATENCY_BUDGET = env.float("XERO_CALLBACK_LATENCY_BUDGET", default=20.0)
+XERO_REFRESH_LATENCY_BUDGET = env.float("XERO_REFRESH_LATENCY_BUDGET", default=15.0)
+XERO_SYNC_LATENCY_BUDGET = env.float("XERO_SYNC_LATENCY_BUDGET", default=120.0)
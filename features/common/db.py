@@ -0,0 +1,51 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# The replica reads are sent to in the current context, if any.
+_read_alias = ContextVar("read_alias", default=None)
+
+
+class ReplicaRouter:
+    """
+    Send reads made inside ``read_from_replica()`` to a replica and every
+    other query to the primary.
+
+    Reads default to the primary so that code which writes and then reads
+    again, like a sync, always sees its own changes; only views that opt in
+    and can tolerate replica lag read from ``DATABASE_REPLICAS``.
+    """
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    """
+    Route the reads of the ``with`` block to a randomly picked replica.
+
+    Does nothing when ``enabled`` is false or no replica is configured.
+    Querysets evaluated after the block, such as a streamed response body,
+    should be bound to the yielded alias with ``.using()``.
+
+    Yields:
+        str: The alias reads go to.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    token = _read_alias.set(random.choice(replicas) if enabled and replicas else None)
+    try:
+        yield _read_alias.get() or DEFAULT_DB_ALIAS
+    finally:
+        _read_alias.reset(token)
@@ -0,0 +1,190 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return f"{value:.1f}"
+    return repr(value)
+
+
+def _escape_help(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape(value):
+    return _escape_help(value).replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    """
+    Base class for metrics held in a Registry.
+
+    Values are kept per label set in a dict guarded by a lock, so recording a
+    sample costs a dict update and the text exposition is only built when
+    ``/metrics`` is scraped.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """
+        Yield ``(suffix, label pairs, value)`` for every sample.
+        """
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {_escape_help(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+        for suffix, pairs, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(pairs)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    A monotonically increasing count. Name it with a ``_total`` suffix.
+    """
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield "", list(zip(self.labelnames, key)), float(value)
+
+
+class Histogram(Metric):
+    """
+    Counts observations into fixed buckets, plus their sum and count.
+    """
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), the sum and the count.
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the ``with`` block in seconds.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in values:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                yield "_bucket", [*pairs, ("le", _format_value(float(bound)))], float(cumulative)
+            yield "_sum", pairs, total
+            yield "_count", pairs, float(count)
+
+
+class Registry:
+    """
+    A set of metrics rendered together in the Prometheus text format.
+
+    Metrics live in the memory of the process that records them; with several
+    worker processes each one serves its own values and Prometheus should
+    scrape every worker, or aggregate with ``sum by``.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def reset(self):
+        """
+        Clear every recorded value, keeping the metrics registered.
+        """
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "".join(metric.render() + "\n" for metric in metrics)
+
+
+REGISTRY = Registry()
+
+http_request_duration = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests, by view.",
+    ["method", "view", "status"],
+)
@@ -0,0 +1,116 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+
+from .metrics import http_request_duration
+
+query_logger = logging.getLogger("features.common.queries")
+
+
+def _observe(request, response, started):
+    match = getattr(request, "resolver_match", None)
+    http_request_duration.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        view=match.view_name if match is not None else "unmatched",
+        status=response.status_code,
+    )
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """
+    Record the latency of every request in ``http_request_duration_seconds``.
+
+    Requests are labelled with the URL name of the view rather than the path,
+    so ids in URLs do not create new series. For streaming responses the
+    time until the response starts is recorded.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = time.perf_counter()
+            response = await get_response(request)
+            _observe(request, response, started)
+            return response
+    else:
+        def middleware(request):
+            started = time.perf_counter()
+            response = get_response(request)
+            _observe(request, response, started)
+            return response
+    return middleware
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting queries and the time spent running them.
+    """
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def _wrap_connections(counter):
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(counter))
+    return stack
+
+
+def _log_queries(request, counter):
+    level = logging.WARNING if counter.count > settings.QUERY_COUNT_WARNING else logging.DEBUG
+    query_logger.log(
+        level, "%s %s: %d queries in %.1f ms", request.method, request.path, counter.count, counter.seconds * 1000
+    )
+
+
+@sync_and_async_middleware
+def query_count_middleware(get_response):
+    """
+    Log the number of SQL queries and the database time of every request.
+
+    Only active when ``DEBUG`` is on. Counts are logged at DEBUG, or at
+    WARNING for requests running more than ``QUERY_COUNT_WARNING`` queries.
+    Queries are counted with an execute wrapper on every database
+    connection, so nothing is stored per query. Queries run while a
+    streaming response is being sent are not counted.
+
+    Connections belong to a thread, so for async views the wrappers are set
+    on the thread that runs the request's ``sync_to_async`` database calls;
+    the view itself stays on the event loop.
+    """
+    if not settings.DEBUG:
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            counter = QueryCounter()
+            stack = await sync_to_async(_wrap_connections)(counter)
+            try:
+                response = await get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+            _log_queries(request, counter)
+            return response
+    else:
+        def middleware(request):
+            counter = QueryCounter()
+            with _wrap_connections(counter):
+                response = get_response(request)
+            _log_queries(request, counter)
+            return response
+    return middleware
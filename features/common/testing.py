@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+def format_queries(queries):
+    return "\n".join(f"{number}. {query['sql']}" for number, query in enumerate(queries, start=1))
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting upper bounds on the number of SQL queries.
+
+    Unlike ``assertNumQueries`` the bound is a ceiling rather than an exact
+    count, so harmless query savings do not break tests, and a failure lists
+    every query that ran so the offending one is easy to spot.
+    """
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS, msg=None):
+        """
+        Fail if the ``with`` block runs more than ``budget`` queries on ``using``.
+        """
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context)
+        if executed > budget:
+            header = f"{executed} queries executed, at most {budget} expected"
+            if msg:
+                header = f"{msg}: {header}"
+            self.fail(f"{header}. Queries:\n{format_queries(context.captured_queries)}")
+
+    def assertQueryBudget(self, budget, sizes, setup, call, using=DEFAULT_DB_ALIAS):
+        """
+        Check that ``call`` stays within ``budget`` queries at every dataset size.
+
+        This is the guard against N+1 patterns: a per-row query shows up as a
+        count that grows with the data and breaks the bound at the larger sizes.
+
+        Args:
+            budget: The most queries allowed, or a callable taking the size for
+                bounds that legitimately grow with batching.
+            sizes: Dataset sizes to try, e.g. ``[1, 10, 100]``.
+            setup: Called with each size to build the dataset; its queries are
+                not counted.
+            call: Runs the code under test.
+
+        Returns:
+            dict: The query count observed at each size.
+        """
+        counts = {}
+        for size in sizes:
+            limit = budget(size) if callable(budget) else budget
+            with self.subTest(size=size):
+                setup(size)
+                with self.assertMaxQueries(limit, using=using, msg=f"With {size} rows") as context:
+                    call()
+                counts[size] = len(context)
+        return counts
@@ -1,3 +1,212 @@
-from django.test import TestCase
+import logging
+import uuid
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from features.common.db import ReplicaRouter, read_from_replica
+from features.common.metrics import Registry
+from features.common.middleware import query_count_middleware
+from features.common.testing import QueryBudgetMixin
+
+
+class RegistryTests(SimpleTestCase):
+    def setUp(self):
+        """
+        Set up the test with an empty registry.
+        """
+        self.registry = Registry()
+
+    def test_counter_exposition(self):
+        """
+        Test that counters render one sample per label set in the text format.
+        """
+        counter = self.registry.counter("jobs_total", "Jobs run.", ["kind"])
+        counter.inc(kind="accounts")
+        counter.inc(2, kind="accounts")
+        counter.inc(kind="contacts")
+
+        self.assertEqual(
+            self.registry.render(),
+            "# HELP jobs_total Jobs run.\n"
+            "# TYPE jobs_total counter\n"
+            'jobs_total{kind="accounts"} 3.0\n'
+            'jobs_total{kind="contacts"} 1.0\n',
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        """
+        Test that histogram buckets count every observation at or below their bound.
+        """
+        histogram = self.registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        lines = self.registry.render().splitlines()
+
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2.0', lines)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 3.0', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4.0', lines)
+        self.assertIn("latency_seconds_sum 3.65", lines)
+        self.assertIn("latency_seconds_count 4.0", lines)
+
+    def test_label_values_are_escaped(self):
+        """
+        Test that quotes, backslashes and newlines in label values are escaped.
+        """
+        counter = self.registry.counter("errors_total", "Errors.", ["message"])
+        counter.inc(message='bad "value"\\\n')
+
+        self.assertIn('errors_total{message="bad \\"value\\"\\\\\\n"} 1.0', self.registry.render())
+
+    def test_wrong_labels_are_rejected(self):
+        """
+        Test that recording with missing labels, or re-registering a name differently, fails.
+        """
+        counter = self.registry.counter("jobs_total", "Jobs run.", ["kind"])
+
+        with self.assertRaises(ValueError):
+            counter.inc()
+        with self.assertRaises(ValueError):
+            self.registry.histogram("jobs_total", "Jobs run.", ["kind"])
+
+
+class MetricsViewTests(SimpleTestCase):
+    def test_exposes_request_metrics(self):
+        """
+        Test that /metrics serves the Prometheus text format, including the
+        latency of earlier requests labelled by view name.
+        """
+        self.client.get("/metrics")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",view="metrics",status="200"}',
+            response.content.decode(),
+        )
+
+    @override_settings(METRICS_AUTH_TOKEN="secret")
+    def test_auth_token(self):
+        """
+        Test that a configured token must be sent as a bearer token.
+        """
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code, 200)
+
+
+class QueryBudgetMixinTests(QueryBudgetMixin, TestCase):
+    def run_sql(self, *statements):
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def test_failure_lists_queries(self):
+        """
+        Test that exceeding the budget fails with every query numbered.
+        """
+        with self.assertRaises(AssertionError) as failure:
+            with self.assertMaxQueries(1):
+                self.run_sql("SELECT 1", "SELECT 2")
+
+        message = str(failure.exception)
+        self.assertIn("2 queries executed, at most 1 expected", message)
+        self.assertIn("1. SELECT 1", message)
+        self.assertIn("2. SELECT 2", message)
+
+
+class QueryCountMiddlewareTests(TestCase):
+    @override_settings(DEBUG=True)
+    def test_logs_queries_in_debug(self):
+        """
+        Test that each request logs its query count at DEBUG when DEBUG is on.
+        """
+        with self.assertLogs("features.common.queries", "DEBUG") as logs:
+            Client().get(f"/api/v1/xero/jobs/{uuid.uuid4()}/")
+
+        self.assertEqual(logs.records[0].levelno, logging.DEBUG)
+        self.assertRegex(logs.output[0], r"GET /api/v1/xero/jobs/.+/: 1 queries in [\d.]+ ms")
+
+    @override_settings(DEBUG=True, QUERY_COUNT_WARNING=0)
+    def test_warns_above_threshold(self):
+        """
+        Test that a request running more than QUERY_COUNT_WARNING queries is logged as a warning.
+        """
+        with self.assertLogs("features.common.queries", "WARNING"):
+            Client().get(f"/api/v1/xero/jobs/{uuid.uuid4()}/")
+
+    @override_settings(DEBUG=True)
+    def test_counts_async_requests(self):
+        """
+        Test that the middleware stays async for async views, and counts
+        the queries they run.
+        """
+        async def view(request):
+            await sync_to_async(list)(get_user_model().objects.all())
+            return HttpResponse()
+
+        middleware = query_count_middleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs("features.common.queries", "DEBUG") as logs:
+            async_to_sync(middleware)(RequestFactory().get("/async/"))
+
+        self.assertRegex(logs.output[0], r"GET /async/: 1 queries in [\d.]+ ms")
+
+    def test_inactive_without_debug(self):
+        """
+        Test that nothing is logged when DEBUG is off.
+        """
+        with self.assertNoLogs("features.common.queries"):
+            Client().get(f"/api/v1/xero/jobs/{uuid.uuid4()}/")
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        """
+        Set up the test with a router and a model to route.
+        """
+        self.router = ReplicaRouter()
+        self.model = get_user_model()
+
+    def test_reads_go_to_primary_by_default(self):
+        """
+        Test that reads outside read_from_replica() and all writes use the primary.
+        """
+        self.assertEqual(self.router.db_for_read(self.model), DEFAULT_DB_ALIAS)
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_write(self.model), DEFAULT_DB_ALIAS)
+
+    def test_reads_go_to_replica_inside_block(self):
+        """
+        Test that reads inside read_from_replica() go to a replica, and only
+        until the block ends.
+        """
+        with read_from_replica() as alias:
+            self.assertEqual(alias, "replica1")
+            self.assertEqual(self.router.db_for_read(self.model), "replica1")
+        self.assertEqual(self.router.db_for_read(self.model), DEFAULT_DB_ALIAS)
+
+    def test_disabled_or_no_replicas(self):
+        """
+        Test that reads stay on the primary when replicas are disabled for the
+        block or none are configured.
+        """
+        with read_from_replica(enabled=False) as alias:
+            self.assertEqual(alias, DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_read(self.model), DEFAULT_DB_ALIAS)
+        with override_settings(DATABASE_REPLICAS=[]), read_from_replica() as alias:
+            self.assertEqual(alias, DEFAULT_DB_ALIAS)
+
+    def test_migrations_skip_replicas(self):
+        """
+        Test that migrations only run on the primary.
+        """
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, "xero"))
+        self.assertFalse(self.router.allow_migrate("replica1", "xero"))
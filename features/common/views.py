@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from .metrics import REGISTRY
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics_view(request):
+    """
+    Serve the process's metrics in the Prometheus text exposition format.
+
+    When ``METRICS_AUTH_TOKEN`` is set, scrapers must send it as a bearer token.
+    """
+    token = settings.METRICS_AUTH_TOKEN
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
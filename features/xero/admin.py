@@ -1,10 +1,59 @@
 from django.contrib import admin
-from features.xero.models import XeroToken, ChartOfAccount
+from features.xero.models import (
+    XeroToken, ChartOfAccount, Contact, Invoice, XeroSyncState, SyncJob, SyncGeneration, XeroRateLimit,
+    XeroRateLimitSlot, XeroWebhookEvent, ChartOfAccountChange, SyncFlight,
+)
 
 @admin.register(XeroToken)
 class XeroTokenAdmin(admin.ModelAdmin):
-    pass
+    list_display = ["tenant_id", "tenant_name", "expires_at"]
 
 @admin.register(ChartOfAccount)
 class ChartOfAccountAdmin(admin.ModelAdmin):
-    list_display = ["account_id", "code", "name", "type", "status"]
+    list_display = ["account_id", "tenant_id", "code", "name", "type", "status"]
+    list_filter = ["tenant_id"]
+
+@admin.register(Contact)
+class ContactAdmin(admin.ModelAdmin):
+    list_display = ["contact_id", "tenant_id", "name", "contact_status", "is_customer", "is_supplier"]
+    list_filter = ["tenant_id", "contact_status"]
+
+@admin.register(Invoice)
+class InvoiceAdmin(admin.ModelAdmin):
+    list_display = ["invoice_id", "tenant_id", "type", "invoice_number", "status", "date", "total"]
+    list_filter = ["tenant_id", "type", "status"]
+
+@admin.register(XeroSyncState)
+class XeroSyncStateAdmin(admin.ModelAdmin):
+    list_display = ["token", "entity", "watermark", "last_full_sync_at", "last_sync_at"]
+
+@admin.register(SyncJob)
+class SyncJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "kind", "status", "priority", "attempts", "created_at", "finished_at"]
+    list_filter = ["kind", "status"]
+
+@admin.register(SyncGeneration)
+class SyncGenerationAdmin(admin.ModelAdmin):
+    list_display = ["name", "value", "changed_at"]
+
+@admin.register(XeroRateLimit)
+class XeroRateLimitAdmin(admin.ModelAdmin):
+    list_display = ["key", "tokens", "day_remaining", "blocked_until"]
+
+@admin.register(XeroRateLimitSlot)
+class XeroRateLimitSlotAdmin(admin.ModelAdmin):
+    list_display = ["id", "key", "expires_at"]
+
+@admin.register(XeroWebhookEvent)
+class XeroWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ["tenant_id", "category", "event_type", "resource_id", "event_date", "processed_at"]
+    list_filter = ["category", "event_type"]
+
+@admin.register(ChartOfAccountChange)
+class ChartOfAccountChangeAdmin(admin.ModelAdmin):
+    list_display = ["seq", "tenant_id", "account_id", "operation", "changed_at"]
+    list_filter = ["operation"]
+
+@admin.register(SyncFlight)
+class SyncFlightAdmin(admin.ModelAdmin):
+    list_display = ["key", "locked_by", "locked_until", "started_at", "finished_at"]
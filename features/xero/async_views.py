@@ -0,0 +1,156 @@
+import math
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import status
+
+from config.env import env
+from .client import get_async_client
+from .exceptions import (
+    CircuitOpenError, LatencyBudgetExceededError, NoTokenError, RateLimitedError, SyncInProgressError,
+    TokenRefreshError, XeroAPIError, XeroUnauthorizedError,
+)
+from .serializers import parse_fields
+from .sync import async_sync_chart_of_accounts_once
+from .tokens import XERO_CONNECTIONS_PATH, XERO_TOKEN_PATH, aget_access_token, store_connections
+from .views import LatencyBudgetMixin, sync_response_data
+
+
+def xero_unavailable_response(exc):
+    response = JsonResponse({"error": str(exc), "degraded": True}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response["Retry-After"] = str(math.ceil(exc.retry_after))
+    return response
+
+
+def budget_exceeded_response(exc):
+    return JsonResponse(exc.details, status=status.HTTP_504_GATEWAY_TIMEOUT)
+
+
+class AsyncXeroCallbackView(LatencyBudgetMixin, View):
+    """
+    Async version of ``XeroCallbackAPIView``.
+
+    Exchanges the authorization code for tokens with the async HTTP client, so
+    the event loop is free while Xero responds.
+
+    Returns:
+        JsonResponse: The result of the authentication flow.
+    """
+    latency_budget_setting = "XERO_CALLBACK_LATENCY_BUDGET"
+
+    async def get(self, request):
+        code = request.GET.get("code")
+        if not code:
+            return JsonResponse({"error": "Authorization code missing"}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": env.str("XERO_REDIRECT_URI"),
+            "client_id": env.str("XERO_CLIENT_ID"),
+            "client_secret": env.str("XERO_CLIENT_SECRET"),
+        }
+        client = get_async_client()
+        try:
+            response = (await client.post(client.identity_url(XERO_TOKEN_PATH), data=data)).json()
+
+            if "error" in response:
+                return JsonResponse({"error": response.get("error_description", "OAuth token exchange failed")}, status=status.HTTP_400_BAD_REQUEST)
+
+            connections = await client.get(
+                client.api_url(XERO_CONNECTIONS_PATH),
+                headers={"Authorization": f"Bearer {response['access_token']}", "Accept": "application/json"},
+            )
+        except CircuitOpenError as exc:
+            return xero_unavailable_response(exc)
+        except LatencyBudgetExceededError as exc:
+            return budget_exceeded_response(exc)
+        if connections.status_code != 200:
+            return JsonResponse({"error": "Could not list Xero connections"}, status=status.HTTP_502_BAD_GATEWAY)
+
+        tenants = await sync_to_async(store_connections)(response, connections.json())
+        if not tenants:
+            return JsonResponse({"error": "No Xero organisation was connected"}, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({"message": "Xero authentication successful", "tenants": tenants}, status=status.HTTP_200_OK)
+
+
+class AsyncRefreshTokenView(LatencyBudgetMixin, View):
+    """
+    Async version of ``RefreshTokenAPIView``.
+
+    Returns:
+        JsonResponse: A success message, or the error details from Xero.
+    """
+    latency_budget_setting = "XERO_REFRESH_LATENCY_BUDGET"
+
+    async def get(self, request):
+        try:
+            await aget_access_token(request.GET.get("tenant_id"), force_refresh=True)
+        except NoTokenError:
+            return JsonResponse({"error": "No token found"}, status=status.HTTP_400_BAD_REQUEST)
+        except CircuitOpenError as exc:
+            return xero_unavailable_response(exc)
+        except LatencyBudgetExceededError as exc:
+            return budget_exceeded_response(exc)
+        except TokenRefreshError as exc:
+            return JsonResponse(
+                {"error": "Token refresh failed", "details": exc.details},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return JsonResponse({"message": "Token refreshed successfully"}, status=status.HTTP_200_OK)
+
+
+class AsyncUpdateChartOfAccountsView(LatencyBudgetMixin, View):
+    """
+    Async version of ``UpdateChartOfAccountsAPIView``.
+
+    Always syncs inside the request: the upstream wait does not hold a thread,
+    so there is no need to hand the work to the job queue. Takes the same
+    ``?full=``, ``?tenant_id=`` (except ``all``), ``?stream=``, ``?echo=``
+    and ``?fields=`` parameters and answers with the same body. Syncs are
+    coalesced with the sync view's: a request arriving while the same sync
+    runs, or within ``XERO_SYNC_FRESH_SECONDS`` after it, gets its result.
+
+    Returns:
+        JsonResponse: The synced Chart of Accounts or its counts, or error details.
+    """
+    latency_budget_setting = "XERO_SYNC_LATENCY_BUDGET"
+
+    async def get(self, request):
+        try:
+            serializer = parse_fields(request.GET.get("fields"))
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = request.GET.get("stream") == "true"
+        echo = not stream or request.GET.get("echo") == "true"
+        try:
+            result, ran = await async_sync_chart_of_accounts_once(
+                full=request.GET.get("full") == "true",
+                tenant_id=request.GET.get("tenant_id"),
+                stream=stream,
+                keep_accounts=echo,
+            )
+        except NoTokenError:
+            return JsonResponse({"error": "No token found"}, status=status.HTTP_400_BAD_REQUEST)
+        except (TokenRefreshError, XeroUnauthorizedError):
+            return JsonResponse({"error": "Unauthorized - Token expired"}, status=status.HTTP_401_UNAUTHORIZED)
+        except RateLimitedError as exc:
+            response = JsonResponse({"error": "Xero rate limit reached"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response["Retry-After"] = str(math.ceil(exc.retry_after))
+            return response
+        except LatencyBudgetExceededError as exc:
+            return budget_exceeded_response(exc)
+        except XeroAPIError as exc:
+            return JsonResponse({"error": str(exc)}, status=status.HTTP_502_BAD_GATEWAY)
+        except SyncInProgressError as exc:
+            response = JsonResponse({"error": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response["Retry-After"] = str(math.ceil(exc.retry_after))
+            return response
+        except CircuitOpenError as exc:
+            return xero_unavailable_response(exc)
+
+        data = await sync_to_async(sync_response_data)(result, ran, serializer, echo)
+        return JsonResponse(data, status=status.HTTP_200_OK)
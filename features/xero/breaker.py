@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from .exceptions import CircuitOpenError, LatencyBudgetExceededError
+from .metrics import circuit_breaker_rejections, circuit_breaker_transitions, endpoint_label
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# The latency budget of the current request, as (seconds, monotonic deadline).
+_budget = ContextVar("latency_budget", default=None)
+
+
+class CircuitBreaker:
+    """
+    Refuse calls to a Xero endpoint while most recent calls to it fail.
+
+    Closed, every call is let through and its outcome kept for
+    ``XERO_BREAKER_WINDOW`` seconds. Once enough of them failed or were slow,
+    the breaker opens and refuses calls for ``XERO_BREAKER_OPEN_SECONDS``.
+    It then half-opens: up to ``XERO_BREAKER_PROBES`` calls are let through
+    at a time, and the first to finish closes it again or reopens it.
+
+    State is kept per process, so a worker stops waiting on a failing
+    endpoint after its own first few calls rather than a shared count's.
+    """
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.state = CLOSED
+        self.calls = deque()
+        self.failures = 0
+        self.open_until = 0.0
+        self.probes = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Let a call through or refuse it.
+
+        Returns:
+            bool: Whether the call is a half-open probe.
+
+        Raises:
+            CircuitOpenError: The breaker is open, or half-open with every
+                probe already in flight.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now < self.open_until:
+                    self._reject(self.open_until - now)
+                self._set_state(HALF_OPEN)
+            if self.probes >= settings.XERO_BREAKER_PROBES:
+                self._reject(1)
+            self.probes += 1
+            return True
+
+    def record(self, failed, probe=False):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                # Calls let through before the breaker opened don't decide it.
+                if not probe:
+                    return
+                self.probes -= 1
+                if failed:
+                    self._open(now)
+                else:
+                    self._set_state(CLOSED)
+                return
+            if self.state == OPEN:
+                return
+
+            self.calls.append((now, failed))
+            self.failures += failed
+            cutoff = now - settings.XERO_BREAKER_WINDOW
+            while self.calls[0][0] < cutoff:
+                _, expired = self.calls.popleft()
+                self.failures -= expired
+            if (
+                len(self.calls) >= settings.XERO_BREAKER_MIN_CALLS
+                and self.failures >= settings.XERO_BREAKER_FAILURE_RATE * len(self.calls)
+            ):
+                self._open(now)
+
+    def _open(self, now):
+        logger.warning("Circuit breaker for %s opened", self.endpoint)
+        self.open_until = now + settings.XERO_BREAKER_OPEN_SECONDS
+        self.probes = 0
+        self._set_state(OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        self.calls.clear()
+        self.failures = 0
+        circuit_breaker_transitions.inc(endpoint=self.endpoint, state=state)
+
+    def _reject(self, retry_after):
+        circuit_breaker_rejections.inc(endpoint=self.endpoint)
+        raise CircuitOpenError(self.endpoint, retry_after)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url):
+    """
+    Return the breaker of the endpoint a Xero URL belongs to.
+    """
+    endpoint = endpoint_label(url)
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(endpoint, CircuitBreaker(endpoint))
+    return breaker
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+@contextmanager
+def latency_budget(seconds):
+    """
+    Give the Xero calls made in the ``with`` block ``seconds`` in total.
+
+    Timeouts of calls are cut to what is left of the budget, and calls made
+    once it has run out fail at once with LatencyBudgetExceededError. A
+    budget inside another keeps the earlier deadline. ``seconds`` of 0 or
+    None sets no budget.
+    """
+    current = _budget.get()
+    if seconds:
+        deadline = time.monotonic() + seconds
+        if current is None or deadline < current[1]:
+            current = (seconds, deadline)
+    token = _budget.set(current)
+    try:
+        yield
+    finally:
+        _budget.reset(token)
+
+
+def remaining_budget():
+    """
+    Return the seconds left in the current latency budget, or None without one.
+    """
+    budget = _budget.get()
+    return None if budget is None else budget[1] - time.monotonic()
+
+
+class XeroCall:
+    """
+    One call guarded by ``guard()``; set ``status`` to the response status.
+    """
+    status = None
+
+    def timeout(self, timeout):
+        """
+        Cut a timeout, or a ``(connect, read)`` pair, to the remaining latency budget.
+        """
+        remaining = remaining_budget()
+        if remaining is None:
+            return timeout
+        if isinstance(timeout, tuple):
+            return tuple(min(part, remaining) for part in timeout)
+        return min(timeout, remaining)
+
+
+@contextmanager
+def guard(url):
+    """
+    Wrap one call to Xero, retries included.
+
+    The call is refused while the endpoint's breaker is open, or when the
+    latency budget has run out. Its outcome is recorded: an exception, a 5xx
+    or a call slower than ``XERO_BREAKER_SLOW_CALL`` counts as a failure,
+    and a timeout caused by the budget is raised as LatencyBudgetExceededError.
+
+    Yields:
+        XeroCall: Set its ``status`` once the response arrives.
+    """
+    budget = _budget.get()
+    if budget is not None and budget[1] <= time.monotonic():
+        raise LatencyBudgetExceededError(budget[0])
+    breaker = get_breaker(url) if settings.XERO_BREAKER_ENABLED else None
+    probe = breaker.before_call() if breaker is not None else False
+
+    call = XeroCall()
+    started = time.monotonic()
+    try:
+        yield call
+    except Exception as exc:
+        if breaker is not None:
+            breaker.record(True, probe)
+        if budget is not None and budget[1] <= time.monotonic():
+            raise LatencyBudgetExceededError(budget[0]) from exc
+        raise
+    if breaker is not None:
+        slow = time.monotonic() - started > settings.XERO_BREAKER_SLOW_CALL
+        breaker.record(call.status is None or call.status >= 500 or slow, probe)
@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import router, transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import SyncGeneration
+
+ACCOUNTS = "accounts"
+
+
+@dataclass(frozen=True)
+class Generation:
+    """
+    A snapshot of a data set's generation counter.
+
+    The counter is bumped whenever a sync commits changes, so any value
+    derived from one generation (an ETag, a cached page) is valid until the
+    next bump.
+    """
+    name: str
+    value: int
+    changed_at: datetime
+
+    @property
+    def etag(self):
+        return f'"{self.name}-{self.value}"'
+
+
+# Generations read from the database, with the monotonic time they were read.
+_local = {}
+_local_lock = threading.Lock()
+
+
+def get_generation(name):
+    """
+    Return the current generation of a data set.
+
+    The value is kept in process memory for ``XERO_GENERATION_TTL`` seconds,
+    so polling clients are answered without a query; a bump in another
+    process (e.g. a sync worker) is seen once the entry expires. Bumps in this
+    process are seen as soon as they commit.
+    """
+    entry = _local.get(name)
+    if entry is not None and time.monotonic() - entry[1] < settings.XERO_GENERATION_TTL:
+        return entry[0]
+
+    # Always read from the primary: views decide whether a replica is current
+    # enough from the generation.
+    primary = router.db_for_write(SyncGeneration)
+    row = SyncGeneration.objects.using(primary).filter(name=name).values_list("value", "changed_at").first()
+    generation = Generation(name, *row) if row else Generation(name, 0, None)
+    with _local_lock:
+        _local[name] = (generation, time.monotonic())
+    return generation
+
+
+def bump_generation(name):
+    """
+    Advance a data set's generation inside the current transaction.
+
+    Call this from any code that changes the data set; cached pages and ETags
+    of the previous generation stop matching once the transaction commits.
+    """
+    now = timezone.now()
+    updated = SyncGeneration.objects.filter(name=name).update(value=F("value") + 1, changed_at=now)
+    if not updated:
+        _, created = SyncGeneration.objects.get_or_create(name=name, defaults={"value": 1, "changed_at": now})
+        if not created:
+            SyncGeneration.objects.filter(name=name).update(value=F("value") + 1, changed_at=now)
+    # Forget now so this connection reads its own bump, and again after the
+    # commit in case another thread re-read the old value in the meantime.
+    forget_generation(name)
+    transaction.on_commit(lambda: forget_generation(name))
+
+
+def replicas_caught_up(name):
+    """
+    Whether read replicas can be assumed to hold a data set's latest generation:
+    true once ``DATABASE_REPLICA_LAG`` seconds have passed since it changed.
+    """
+    changed_at = get_generation(name).changed_at
+    return changed_at is None or timezone.now() - changed_at >= timedelta(seconds=settings.DATABASE_REPLICA_LAG)
+
+
+def forget_generation(name=None):
+    """
+    Drop the in-process copy of one generation, or of all of them.
+    """
+    with _local_lock:
+        if name is None:
+            _local.clear()
+        else:
+            _local.pop(name, None)
+
+
+@receiver(setting_changed)
+def _forget_generations_on_setting_change(setting, **kwargs):
+    if setting == "XERO_GENERATION_TTL":
+        forget_generation()
+
+
+def page_cache():
+    return caches[settings.XERO_PAGE_CACHE_ALIAS]
+
+
+def page_cache_key(generation, request, variant=""):
+    """
+    Build the cache key of a rendered page for one generation.
+
+    The key covers the absolute URL, so every query string (filters, cursor,
+    page size) is cached separately, and old generations are never read again.
+    """
+    digest = hashlib.sha1(f"{variant}:{request.build_absolute_uri()}".encode()).hexdigest()
+    return f"xero:{generation.name}:{generation.value}:{digest}"
+
+
+def accounts_etag(request, *args, **kwargs):
+    return get_generation(ACCOUNTS).etag
+
+
+def accounts_last_modified(request, *args, **kwargs):
+    return get_generation(ACCOUNTS).changed_at
@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from .models import ChartOfAccount, ChartOfAccountChange, SyncGeneration
+from .serializers import account_values_serializer
+
+Operation = ChartOfAccountChange.Operation
+
+# SyncGeneration row holding the highest sequence number removed by retention.
+# Cursors below it can no longer be served.
+CHANGES_HORIZON = "account_changes_horizon"
+
+BATCH_SIZE = 500
+
+
+class AccountChanges:
+    """
+    The account changes made by one sync, written to the change log at the end.
+
+    Several changes to one account within a sync collapse into one entry: a
+    created account that is then updated is still ``created``, and any
+    account that ends up deleted is ``deleted``.
+    """
+    def __init__(self):
+        self.operations = {}
+
+    def __len__(self):
+        return len(self.operations)
+
+    def record(self, operation, account_ids):
+        for account_id in account_ids:
+            previous = self.operations.get(account_id)
+            if previous == Operation.CREATED and operation == Operation.UPDATED:
+                continue
+            if previous == Operation.DELETED and operation == Operation.CREATED:
+                operation = Operation.UPDATED
+            self.operations[account_id] = operation
+
+    def save(self, tenant_id):
+        """
+        Append the collected changes to the log.
+
+        Call this inside the sync transaction after ``bump_generation``: the
+        generation row stays locked until the commit, so syncs commit in the
+        order their entries are numbered and a reader never sees a sequence
+        number after one that is still uncommitted.
+        """
+        now = timezone.now()
+        entries = [
+            ChartOfAccountChange(account_id=account_id, tenant_id=tenant_id, operation=operation, changed_at=now)
+            for account_id, operation in self.operations.items()
+        ]
+        ChartOfAccountChange.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+        self.operations = {}
+
+
+def get_horizon():
+    return SyncGeneration.objects.filter(name=CHANGES_HORIZON).values_list("value", flat=True).first() or 0
+
+
+def changes_since(since, limit, tenant_id=None):
+    """
+    Return up to ``limit`` change log entries after the sequence number ``since``.
+
+    Each entry carries the account's current values, read with a query per
+    ``BATCH_SIZE`` entries, or None when the account no longer exists (a later
+    ``deleted`` entry follows in the log).
+
+    Returns:
+        tuple: The entries as dicts, and whether more entries follow.
+    """
+    entries = ChartOfAccountChange.objects.filter(seq__gt=since)
+    if tenant_id is not None:
+        entries = entries.filter(tenant_id=tenant_id)
+    entries = list(
+        entries.order_by("seq").values("seq", "operation", "account_id", "tenant_id", "changed_at")[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    ids = list({entry["account_id"] for entry in entries if entry["operation"] != Operation.DELETED})
+    accounts = {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ChartOfAccount.objects.filter(account_id__in=ids[start:start + BATCH_SIZE])
+        rows = account_values_serializer.values(batch)
+        accounts.update((account["account_id"], account) for account in account_values_serializer.serialize_rows(rows))
+    for entry in entries:
+        entry["account"] = accounts.get(str(entry["account_id"]))
+    return entries, has_more
+
+
+def compact_changes(retention_days=None):
+    """
+    Shrink the change log.
+
+    Entries superseded by a later entry for the same account are removed;
+    since the feed serves each account's current values, this loses nothing
+    for any reader. Entries older than ``retention_days`` are then removed
+    and the horizon raised past them, so readers with an older cursor are
+    told to download the chart in full instead.
+
+    Args:
+        retention_days: Defaults to ``XERO_CHANGES_RETENTION_DAYS``.
+
+    Returns:
+        dict: The number of superseded and expired entries removed, and the
+        horizon.
+    """
+    if retention_days is None:
+        retention_days = settings.XERO_CHANGES_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+
+    later = ChartOfAccountChange.objects.filter(account_id=OuterRef("account_id"), seq__gt=OuterRef("seq"))
+    with transaction.atomic():
+        superseded, _ = ChartOfAccountChange.objects.filter(Exists(later)).delete()
+
+        expired = ChartOfAccountChange.objects.filter(changed_at__lt=cutoff)
+        last_expired = expired.aggregate(last=Max("seq"))["last"]
+        removed = 0
+        if last_expired is not None:
+            removed, _ = ChartOfAccountChange.objects.filter(seq__lte=last_expired).delete()
+            SyncGeneration.objects.update_or_create(
+                name=CHANGES_HORIZON, defaults={"value": last_expired, "changed_at": timezone.now()}
+            )
+    return {"superseded": superseded, "expired": removed, "horizon": get_horizon()}
@@ -0,0 +1,293 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from .breaker import guard, remaining_budget, reset_breakers
+from .metrics import observe_request
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({"HEAD", "GET", "OPTIONS", "PUT", "DELETE"})
+
+
+class XeroRetry(Retry):
+    """
+    urllib3 retry policy that gives up instead of sleeping on a long Retry-After.
+
+    Xero answers exhausted daily limits with a Retry-After measured in hours,
+    which must not hold a worker thread; the 429 is returned to the caller.
+    """
+    max_retry_after = 60
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None:
+            retry_after = self.get_retry_after(response)
+            if retry_after is not None and retry_after > self.max_retry_after:
+                raise MaxRetryError(_pool, url, ResponseError(f"Retry-After of {retry_after}s is too long"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class XeroClient:
+    """
+    HTTP client for the Xero identity and accounting APIs.
+
+    Wraps a pooled ``requests.Session`` so that connections (and their TLS
+    handshakes) are reused between calls. Every request gets the configured
+    connect/read timeouts, and idempotent requests are retried with jittered
+    exponential backoff on 429 and 5xx responses, honouring ``Retry-After``.
+    Read timeouts are raised rather than retried so a stalled upstream costs
+    at most one read timeout. Calls go through the endpoint's circuit breaker
+    and are cut short by the request's latency budget (see ``breaker``).
+    """
+    def __init__(
+        self,
+        api_base_url=None,
+        identity_base_url=None,
+        pool_size=None,
+        connect_timeout=None,
+        read_timeout=None,
+        max_retries=None,
+        backoff_factor=None,
+    ):
+        self.api_base_url = (api_base_url or settings.XERO_API_BASE_URL).rstrip("/")
+        self.identity_base_url = (identity_base_url or settings.XERO_IDENTITY_BASE_URL).rstrip("/")
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else settings.XERO_HTTP_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else settings.XERO_HTTP_READ_TIMEOUT,
+        )
+        pool_size = pool_size or settings.XERO_HTTP_POOL_SIZE
+
+        retry = XeroRetry(
+            total=max_retries if max_retries is not None else settings.XERO_HTTP_MAX_RETRIES,
+            read=False,
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=backoff_factor if backoff_factor is not None else settings.XERO_HTTP_BACKOFF_FACTOR,
+            backoff_jitter=settings.XERO_HTTP_BACKOFF_JITTER,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        retry.max_retry_after = settings.XERO_HTTP_MAX_RETRY_AFTER
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def api_url(self, path):
+        return f"{self.api_base_url}/{path.lstrip('/')}"
+
+    def identity_url(self, path):
+        return f"{self.identity_base_url}/{path.lstrip('/')}"
+
+    def request(self, method, url, **kwargs):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with guard(url) as call:
+                kwargs["timeout"] = call.timeout(kwargs.get("timeout", self.timeout))
+                response = self.session.request(method, url, **kwargs)
+                status = call.status = response.status_code
+            return response
+        finally:
+            observe_request(method, url, status, time.perf_counter() - started)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncXeroClient:
+    """
+    Non-blocking counterpart of XeroClient built on ``httpx.AsyncClient``.
+
+    Applies the same pool size, timeouts and retry policy, so a single event
+    loop can keep many Xero calls in flight. ``transport`` lets tests plug in
+    an ``httpx.MockTransport``.
+    """
+    def __init__(
+        self,
+        api_base_url=None,
+        identity_base_url=None,
+        pool_size=None,
+        connect_timeout=None,
+        read_timeout=None,
+        max_retries=None,
+        backoff_factor=None,
+        transport=None,
+    ):
+        self.api_base_url = (api_base_url or settings.XERO_API_BASE_URL).rstrip("/")
+        self.identity_base_url = (identity_base_url or settings.XERO_IDENTITY_BASE_URL).rstrip("/")
+        self.max_retries = max_retries if max_retries is not None else settings.XERO_HTTP_MAX_RETRIES
+        self.backoff_factor = backoff_factor if backoff_factor is not None else settings.XERO_HTTP_BACKOFF_FACTOR
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else settings.XERO_HTTP_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else settings.XERO_HTTP_READ_TIMEOUT,
+        )
+        pool_size = pool_size or settings.XERO_HTTP_POOL_SIZE
+
+        self.session = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport,
+        )
+
+    def api_url(self, path):
+        return f"{self.api_base_url}/{path.lstrip('/')}"
+
+    def identity_url(self, path):
+        return f"{self.identity_base_url}/{path.lstrip('/')}"
+
+    async def request(self, method, url, **kwargs):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with guard(url) as call:
+                if remaining_budget() is not None:
+                    connect, read = call.timeout(self.timeout)
+                    kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+                response = await self._request_with_retries(method, url, **kwargs)
+                status = call.status = response.status_code
+            return response
+        finally:
+            observe_request(method, url, status, time.perf_counter() - started)
+
+    async def _request_with_retries(self, method, url, **kwargs):
+        retries = self.max_retries if method.upper() in IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            response = await self.session.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            delay = self._retry_delay(response, attempt)
+            remaining = remaining_budget()
+            if delay is None or remaining is not None and delay >= remaining:
+                return response
+            await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, response, attempt):
+        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return retry_after if retry_after <= settings.XERO_HTTP_MAX_RETRY_AFTER else None
+        if attempt == 0:
+            return 0
+        backoff = self.backoff_factor * 2 ** attempt
+        return backoff + random.uniform(0, settings.XERO_HTTP_BACKOFF_JITTER)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self.session.aclose()
+
+
+def _parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - timezone.now()).total_seconds(), 0)
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+# httpx pools are bound to the event loop that opened them, so async clients
+# are kept per loop rather than per process.
+_async_clients = weakref.WeakKeyDictionary()
+_async_client_factory = None
+
+
+def get_client():
+    """
+    Return the per-process XeroClient, creating it on first use.
+
+    The client is rebuilt after a fork so that worker processes never share
+    pooled sockets with their parent.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = XeroClient()
+                _client_pid = os.getpid()
+    return _client
+
+
+def set_client(client):
+    """
+    Replace the per-process client, e.g. with one pointed at a local test server.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client is not client:
+            _client.close()
+        _client = client
+        _client_pid = os.getpid() if client is not None else None
+
+
+def reset_client():
+    set_client(None)
+    _async_clients.clear()
+    reset_breakers()
+
+
+@receiver(setting_changed)
+def _reset_client_on_setting_change(setting, **kwargs):
+    if setting.startswith("XERO_"):
+        reset_client()
+
+
+def get_async_client():
+    """
+    Return the AsyncXeroClient for the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_client_factory() if _async_client_factory else AsyncXeroClient()
+        _async_clients[loop] = client
+    return client
+
+
+def set_async_client_factory(factory):
+    """
+    Build async clients with ``factory`` from now on, e.g. one using a mock transport.
+    """
+    global _async_client_factory
+    _async_client_factory = factory
+    _async_clients.clear()
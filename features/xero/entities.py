@@ -0,0 +1,189 @@
+import re
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ChartOfAccount, Contact, Invoice
+
+_MS_DATE_RE = re.compile(r"^/Date\((-?\d+)([+-]\d{4})?\)/$")
+
+
+def parse_xero_datetime(value):
+    """
+    Parse a Xero timestamp into an aware datetime.
+
+    Xero returns dates either as ISO 8601 strings or in the legacy
+    Microsoft JSON format, e.g. ``/Date(1573755038314+0000)/``.
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    match = _MS_DATE_RE.match(value)
+    if match:
+        return datetime.fromtimestamp(int(match.group(1)) / 1000, tz=dt_timezone.utc)
+    parsed = parse_datetime(value)
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def parse_xero_date(value):
+    """
+    Parse a Xero date, in either of the timestamp formats, into a date.
+    """
+    if value is None:
+        return None
+    parsed = parse_xero_datetime(value)
+    return parsed.date() if parsed is not None else parse_date(value)
+
+
+def parse_decimal(value):
+    return None if value is None else Decimal(str(value))
+
+
+@dataclass(frozen=True)
+class EntitySpec:
+    """
+    Declares how a Xero collection maps onto a model.
+
+    Attributes:
+        name: The Xero collection, e.g. ``"Contacts"``. Also the key holding
+            the items in a response and the ``XeroSyncState.entity``.
+        path: The API path the collection is fetched from.
+        model: The model the items are written to. It must have a UUID
+            primary key and a ``tenant_id`` field.
+        id_key: The payload key holding the item id.
+        fields: Model field names mapped to payload keys. Dotted keys such as
+            ``"Contact.ContactID"`` reach into nested objects.
+        converters: Model field names mapped to a callable applied to the
+            raw payload value.
+        params: Extra query parameters sent with every request.
+        paged: Whether the endpoint is read page by page with ``?page=``.
+    """
+    name: str
+    path: str
+    model: type
+    id_key: str
+    fields: dict
+    converters: dict = field(default_factory=dict)
+    params: dict = field(default_factory=dict)
+    paged: bool = True
+
+    def item_id(self, item):
+        return uuid.UUID(str(item[self.id_key]))
+
+    def values(self, item):
+        """
+        Convert one payload item into field values for the model.
+        """
+        values = {}
+        for field_name, key in self.fields.items():
+            value = item
+            for part in key.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            converter = self.converters.get(field_name)
+            values[field_name] = converter(value) if converter else value
+        return values
+
+
+ACCOUNTS = EntitySpec(
+    name="Accounts",
+    path="api.xro/2.0/Accounts",
+    model=ChartOfAccount,
+    id_key="AccountID",
+    fields={
+        "code": "Code",
+        "name": "Name",
+        "type": "Type",
+        "bank_account_number": "BankAccountNumber",
+        "status": "Status",
+        "description": "Description",
+        "bank_account_type": "BankAccountType",
+        "currency_code": "CurrencyCode",
+        "tax_type": "TaxType",
+        "enable_payments_to_account": "EnablePaymentsToAccount",
+        "show_in_expense_claims": "ShowInExpenseClaims",
+        "class_type": "Class",
+        "system_account": "SystemAccount",
+        "reporting_code": "ReportingCode",
+        "reporting_code_name": "ReportingCodeName",
+        "has_attachments": "HasAttachments",
+        "updated_date_utc": "UpdatedDateUTC",
+        "add_to_watchlist": "AddToWatchlist",
+    },
+    converters={
+        "enable_payments_to_account": bool,
+        "show_in_expense_claims": bool,
+        "has_attachments": bool,
+        "add_to_watchlist": bool,
+        "updated_date_utc": parse_xero_datetime,
+    },
+    paged=False,
+)
+
+CONTACTS = EntitySpec(
+    name="Contacts",
+    path="api.xro/2.0/Contacts",
+    model=Contact,
+    id_key="ContactID",
+    fields={
+        "name": "Name",
+        "contact_number": "ContactNumber",
+        "account_number": "AccountNumber",
+        "contact_status": "ContactStatus",
+        "first_name": "FirstName",
+        "last_name": "LastName",
+        "email_address": "EmailAddress",
+        "tax_number": "TaxNumber",
+        "default_currency": "DefaultCurrency",
+        "is_supplier": "IsSupplier",
+        "is_customer": "IsCustomer",
+        "updated_date_utc": "UpdatedDateUTC",
+    },
+    converters={
+        "is_supplier": bool,
+        "is_customer": bool,
+        "updated_date_utc": parse_xero_datetime,
+    },
+    # Archived contacts are left out unless asked for, and would be pruned.
+    params={"includeArchived": "true"},
+)
+
+INVOICES = EntitySpec(
+    name="Invoices",
+    path="api.xro/2.0/Invoices",
+    model=Invoice,
+    id_key="InvoiceID",
+    fields={
+        "type": "Type",
+        "invoice_number": "InvoiceNumber",
+        "reference": "Reference",
+        "contact_id": "Contact.ContactID",
+        "status": "Status",
+        "date": "Date",
+        "due_date": "DueDate",
+        "currency_code": "CurrencyCode",
+        "sub_total": "SubTotal",
+        "total_tax": "TotalTax",
+        "total": "Total",
+        "amount_due": "AmountDue",
+        "amount_paid": "AmountPaid",
+        "updated_date_utc": "UpdatedDateUTC",
+    },
+    converters={
+        "contact_id": lambda value: uuid.UUID(str(value)) if value else None,
+        "date": parse_xero_date,
+        "due_date": parse_xero_date,
+        "sub_total": parse_decimal,
+        "total_tax": parse_decimal,
+        "total": parse_decimal,
+        "amount_due": parse_decimal,
+        "amount_paid": parse_decimal,
+        "updated_date_utc": parse_xero_datetime,
+    },
+)
+
+# Paged entities synced by ``features.xero.entity_sync``, by Xero collection name.
+ENTITIES = {spec.name: spec for spec in (CONTACTS, INVOICES)}
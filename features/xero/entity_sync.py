@@ -0,0 +1,291 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db import transaction
+
+from . import ratelimit
+from .client import get_client
+from .entities import ENTITIES, parse_xero_datetime
+from .exceptions import TokenRefreshError
+from .metrics import SyncTimer, sync_stage_duration
+from .singleflight import run_once
+from .sync import BATCH_SIZE, SyncSummary, check_response_status, prepare_sync, save_sync_state
+from .tokens import get_access_token
+
+
+class PageFetcher:
+    """
+    Fetch the pages of a paged Xero endpoint ahead of the caller.
+
+    Requests run one after another on a background thread, at most
+    ``prefetch`` pages ahead, so the next pages download while the caller
+    writes the current one. Only the HTTP call runs on that thread: rate-limit
+    slots are taken and settled, and tokens refreshed, on the calling thread,
+    so every query stays on the caller's database connection.
+
+    Until the end of the collection is known, up to ``prefetch`` pages past
+    it may be requested; they are discarded.
+    """
+    def __init__(self, url, headers, token, params=None, prefetch=2):
+        self.url = url
+        self.headers = headers
+        self.token = token
+        self.params = params or {}
+        self.prefetch = max(prefetch, 1)
+        self.client = get_client()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="xero-prefetch")
+        self.pending = deque()
+        self.next_page = 1
+        self.last_page = None
+        self.refreshed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def stop_after(self, page):
+        """
+        Mark ``page`` as the last one; pages after it are not requested.
+        """
+        if self.last_page is None or page < self.last_page:
+            self.last_page = page
+
+    def _wanted(self, page):
+        return self.last_page is None or page <= self.last_page
+
+    def _acquire(self):
+        if settings.XERO_RATE_LIMIT_ENABLED:
+            return ratelimit.acquire(self.token.tenant_id)
+        return None
+
+    def _request(self, page, token):
+        return self.client.get(
+            self.url, headers={**self.headers, **token.headers()}, params={**self.params, "page": page}
+        )
+
+    def _settle(self, token, slot, response):
+        if not settings.XERO_RATE_LIMIT_ENABLED:
+            return response
+        ratelimit.release(token.tenant_id, slot)
+        return ratelimit.check_response(token.tenant_id, response)
+
+    def _fill(self):
+        while len(self.pending) < self.prefetch and self._wanted(self.next_page):
+            slot = self._acquire()
+            token = self.token
+            # Run in a copy of the caller's context, so the request keeps its latency budget.
+            future = self.executor.submit(copy_context().run, self._request, self.next_page, token)
+            self.pending.append((self.next_page, token, slot, future))
+            self.next_page += 1
+
+    def _result(self, token, slot, future):
+        try:
+            response = future.result()
+        except BaseException:
+            if settings.XERO_RATE_LIMIT_ENABLED:
+                ratelimit.release(token.tenant_id, slot)
+            raise
+        return self._settle(token, slot, response)
+
+    def next(self):
+        """
+        Return the next page number and its response, or None once the last
+        page has been returned.
+
+        A 401 refreshes the token once and repeats the request; pages already
+        requested with the old token are repeated with the new one.
+
+        Raises:
+            RateLimitedError: Xero's rate limits leave no room for the call.
+        """
+        self._fill()
+        while self.pending and not self._wanted(self.pending[0][0]):
+            self._discard(*self.pending.popleft())
+        if not self.pending:
+            return None
+
+        page, token, slot, future = self.pending.popleft()
+        response = self._result(token, slot, future)
+        if response.status_code == 401:
+            if token is self.token and not self.refreshed:
+                self.refreshed = True
+                try:
+                    self.token = get_access_token(token.tenant_id, force_refresh=True, stale=token)
+                except TokenRefreshError:
+                    return page, response
+            if token is not self.token:
+                response.close()
+                slot = self._acquire()
+                response = self._settle(self.token, slot, self._request(page, self.token))
+        return page, response
+
+    def _discard(self, page, token, slot, future):
+        if future.cancel():
+            if settings.XERO_RATE_LIMIT_ENABLED:
+                ratelimit.release(token.tenant_id, slot)
+            return
+        try:
+            self._result(token, slot, future).close()
+        except Exception:
+            pass
+
+    def close(self):
+        """
+        Drop the pages still in flight and stop the background thread.
+        """
+        while self.pending:
+            self._discard(*self.pending.popleft())
+        self.executor.shutdown(wait=True)
+
+
+def write_page(spec, items, tenant_id, result):
+    """
+    Upsert one page of items in a single transaction, recording each in ``result``.
+
+    Existing rows are loaded with one query; only new rows and rows whose
+    values changed are written, with ``bulk_create``/``bulk_update``.
+    """
+    incoming = {spec.item_id(item): spec.values(item) for item in items}
+    with transaction.atomic():
+        existing = spec.model.objects.filter(tenant_id=tenant_id).in_bulk(list(incoming))
+        to_create, to_update = [], []
+        for item_id, values in incoming.items():
+            obj = existing.get(item_id)
+            if obj is None:
+                to_create.append(spec.model(pk=item_id, tenant_id=tenant_id, **values))
+                result.record("created", None)
+            elif any(getattr(obj, name) != value for name, value in values.items()):
+                for name, value in values.items():
+                    setattr(obj, name, value)
+                to_update.append(obj)
+                result.record("updated", None)
+            else:
+                result.record("unchanged", None)
+        if to_update:
+            spec.model.objects.bulk_update(to_update, list(spec.fields), batch_size=BATCH_SIZE)
+        if to_create:
+            spec.model.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    return incoming
+
+
+def prune_missing(spec, seen, tenant_id):
+    """
+    Delete the tenant's rows whose ids were not seen during a full sync.
+    """
+    ids = spec.model.objects.filter(tenant_id=tenant_id).values_list("pk", flat=True)
+    missing = [item_id for item_id in ids.iterator() if item_id not in seen]
+    for start in range(0, len(missing), BATCH_SIZE):
+        spec.model.objects.filter(pk__in=missing[start:start + BATCH_SIZE]).delete()
+    return len(missing)
+
+
+def sync_entity(entity, full=False, tenant_id=None, prefetch=None):
+    """
+    Fetch a paged Xero collection, such as Contacts or Invoices, into its model.
+
+    Pages are fetched by a PageFetcher up to ``XERO_SYNC_PREFETCH_PAGES``
+    ahead of the writer, and each page is committed as one batch, so the
+    wall time of a multi-page sync approaches the larger of the fetch and
+    write times rather than their sum. Syncs are incremental like the
+    accounts sync: ``If-Modified-Since`` carries the stored watermark, and a
+    full sync, which also deletes rows missing from Xero, runs every
+    ``XERO_FULL_SYNC_INTERVAL`` seconds or when ``full`` is set.
+
+    Pages committed before a failure stay written; the watermark only moves
+    once every page is in, so the next sync fetches them again.
+
+    Args:
+        entity: A key of ``features.xero.entities.ENTITIES``.
+        full: Force a full sync.
+        tenant_id: The Xero tenant to sync. Defaults to the first stored connection.
+        prefetch: Override ``XERO_SYNC_PREFETCH_PAGES``.
+
+    Returns:
+        SyncSummary: The counts of created, updated, unchanged and deleted rows.
+
+    Raises:
+        KeyError: ``entity`` is not a known paged entity.
+        NoTokenError: No Xero token has been stored for the tenant.
+        TokenRefreshError: The access token expired and could not be refreshed.
+        XeroUnauthorizedError: Xero rejected the access token.
+        RateLimitedError: Xero's rate limits leave no room for the calls.
+        XeroAPIError: Xero answered with an unexpected status.
+    """
+    spec = ENTITIES[entity]
+    page_size = settings.XERO_SYNC_PAGE_SIZE
+    with SyncTimer("paged") as timer:
+        token = get_access_token(tenant_id)
+        state, full_sync, headers = prepare_sync(token, full, entity=spec.name)
+        tenant = token.tenant_id or ""
+        result = SyncSummary()
+        seen, latest = set(), None
+
+        fetcher = PageFetcher(
+            get_client().api_url(spec.path),
+            headers,
+            token,
+            params={**spec.params, "pageSize": page_size},
+            prefetch=prefetch or settings.XERO_SYNC_PREFETCH_PAGES,
+        )
+        with fetcher:
+            while True:
+                started = time.perf_counter()
+                fetched = fetcher.next()
+                sync_stage_duration.observe(time.perf_counter() - started, stage="fetch")
+                if fetched is None:
+                    break
+                page, response = fetched
+                try:
+                    if check_response_status(response.status_code):
+                        fetcher.stop_after(page)
+                        continue
+                    with sync_stage_duration.time(stage="parse"):
+                        body = response.json()
+                finally:
+                    response.close()
+
+                items = body.get(spec.name) or []
+                page_count = (body.get("pagination") or {}).get("pageCount")
+                if page_count is not None:
+                    fetcher.stop_after(page_count)
+                if len(items) < page_size:
+                    fetcher.stop_after(page)
+
+                with sync_stage_duration.time(stage="write"):
+                    seen.update(write_page(spec, items, tenant, result))
+                for item in items:
+                    updated = parse_xero_datetime(item.get("UpdatedDateUTC"))
+                    if updated is not None and (latest is None or updated > latest):
+                        latest = updated
+
+        if not seen and not full_sync:
+            result.not_modified = True
+            return timer.done(result)
+        if full_sync:
+            with transaction.atomic():
+                result.deleted = prune_missing(spec, seen, tenant)
+        save_sync_state(state, full_sync, latest)
+        return timer.done(result)
+
+
+def sync_entity_once(entity, full=False, tenant_id=None):
+    """
+    ``sync_entity`` for requests and jobs: concurrent and just-finished syncs
+    of the same entity and tenant share one run (see ``singleflight.run_once``).
+    A full sync is not answered by an incremental one.
+
+    Returns:
+        dict: The sync summary.
+    """
+    tenant = get_access_token(tenant_id).tenant_id or ""
+
+    def run():
+        return {"full": full, "summary": sync_entity(entity, full=full, tenant_id=tenant_id).summary()}
+
+    result, _ = run_once(ENTITIES[entity].name, tenant, run, accept=lambda result: result["full"] or not full)
+    return result["summary"]
@@ -0,0 +1,72 @@
+class XeroError(Exception):
+    """
+    Base class for errors raised while talking to Xero.
+    """
+
+
+class NoTokenError(XeroError):
+    def __init__(self):
+        super().__init__("No token found")
+
+
+class TokenRefreshError(XeroError):
+    def __init__(self, details):
+        super().__init__("Token refresh failed")
+        self.details = details
+
+
+class XeroUnauthorizedError(XeroError):
+    def __init__(self):
+        super().__init__("Unauthorized - Token expired")
+
+
+class XeroAPIError(XeroError):
+    def __init__(self, status_code, details=None):
+        super().__init__(f"Xero API request failed with status {status_code}")
+        self.status_code = status_code
+        self.details = details
+
+
+class RateLimitedError(XeroAPIError):
+    """
+    Xero's rate limits leave no capacity for a call within the allowed wait.
+
+    ``retry_after`` is the number of seconds until a call is expected to be
+    allowed again.
+    """
+    def __init__(self, retry_after, details=None):
+        super().__init__(429, details)
+        self.retry_after = retry_after
+
+
+class SyncInProgressError(XeroError):
+    """
+    The same sync is running elsewhere and did not finish within the wait.
+
+    ``retry_after`` is the number of seconds until it is expected to be done.
+    """
+    def __init__(self, retry_after):
+        super().__init__("Sync already in progress")
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(XeroError):
+    """
+    Calls to a Xero endpoint are refused without being sent, because too
+    many recent ones failed or were slow.
+
+    ``retry_after`` is the number of seconds until a probe call is allowed.
+    """
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f"Xero is unavailable ({endpoint})")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class LatencyBudgetExceededError(XeroAPIError):
+    """
+    The request's latency budget ran out before Xero answered.
+    """
+    def __init__(self, budget):
+        super().__init__(504, {"error": f"Xero did not answer within the {budget:g}s latency budget"})
+        self.budget = budget
@@ -0,0 +1,97 @@
+import csv
+
+from django.conf import settings
+
+from .renderers import FastJSONRenderer
+from .serializers import account_values_serializer
+
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class _Echo:
+    """
+    File-like object that hands back what csv.writer writes to it.
+    """
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset):
+    """
+    Yield serialized accounts from ``queryset`` without loading it into memory.
+
+    Rows are read with a server-side cursor where the database supports one,
+    ``XERO_EXPORT_CHUNK_SIZE`` at a time, and serialized with the same field
+    map as the accounts list.
+    """
+    converters = account_values_serializer.converters()
+    rows = account_values_serializer.values(queryset).iterator(chunk_size=settings.XERO_EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield account_values_serializer.to_representation(row, converters)
+
+
+def _batched(lines):
+    """
+    Send the first line straight away, then join lines into chunks of about
+    ``XERO_EXPORT_CHUNK_SIZE`` rows so the response is not written one small
+    line at a time.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    yield first
+
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= settings.XERO_EXPORT_CHUNK_SIZE:
+            yield b"".join(batch)
+            batch = []
+    if batch:
+        yield b"".join(batch)
+
+
+def export_ndjson(queryset):
+    """
+    Return the accounts as newline-delimited JSON chunks, one object per line.
+    """
+    render = FastJSONRenderer().render
+    return _batched(render(row) + b"\n" for row in export_rows(queryset))
+
+
+def export_csv(queryset):
+    """
+    Return the accounts as CSV chunks with a header row. NULLs are written as empty
+    fields and booleans as ``true``/``false``.
+    """
+    writer = csv.writer(_Echo())
+    names = account_values_serializer.field_names
+
+    def lines():
+        yield writer.writerow(names).encode()
+        for row in export_rows(queryset):
+            values = (_csv_value(row[name]) for name in names)
+            yield writer.writerow(values).encode()
+
+    # The header goes out before the first query runs.
+    return _batched(lines())
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return value
+
+
+EXPORTERS = {
+    "ndjson": export_ndjson,
+    "csv": export_csv,
+}
@@ -0,0 +1,61 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+# Query parameters matched exactly against ChartOfAccount fields. A comma
+# separated value matches any of the listed values.
+ACCOUNT_FILTER_FIELDS = (
+    "tenant_id",
+    "type",
+    "status",
+    "class_type",
+    "currency_code",
+    "tax_type",
+    "reporting_code",
+)
+ACCOUNT_BOOLEAN_FILTER_FIELDS = (
+    "enable_payments_to_account",
+    "show_in_expense_claims",
+    "has_attachments",
+    "add_to_watchlist",
+)
+TRUE_VALUES = {"true", "1"}
+FALSE_VALUES = {"false", "0"}
+
+
+def parse_bool(name, value):
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError({name: "Must be true or false."})
+
+
+class ChartOfAccountFilterBackend(BaseFilterBackend):
+    """
+    Filter the accounts list by attribute, e.g. ``?type=EXPENSE&status=ACTIVE``
+    or ``?type=BANK&currency_code=NZD``.
+
+    The common combinations within a tenant (``?tenant_id=``) are served by
+    the composite indexes on ChartOfAccount, which start with ``tenant_id``
+    and end in ``(name, account_id)`` so that the keyset pagination order
+    comes straight from the index.
+    """
+    def filter_queryset(self, request, queryset, view):
+        filters = {}
+        for name in ACCOUNT_FILTER_FIELDS:
+            value = request.query_params.get(name)
+            if not value:
+                continue
+            values = [v for v in value.split(",") if v]
+            if len(values) == 1:
+                filters[name] = values[0]
+            else:
+                filters[f"{name}__in"] = values
+
+        for name in ACCOUNT_BOOLEAN_FILTER_FIELDS:
+            value = request.query_params.get(name)
+            if value:
+                filters[name] = parse_bool(name, value)
+
+        return queryset.filter(**filters) if filters else queryset
@@ -0,0 +1,217 @@
+import logging
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .exceptions import (
+    CircuitOpenError,
+    NoTokenError,
+    RateLimitedError,
+    SyncInProgressError,
+    TokenRefreshError,
+    XeroUnauthorizedError,
+)
+from .entity_sync import sync_entity_once
+from .models import SyncJob
+from .sync import sync_all_tenants, sync_chart_of_accounts_once
+from .webhooks import process_webhook_events
+
+logger = logging.getLogger(__name__)
+
+# Errors that retrying cannot fix; the job fails straight away.
+PERMANENT_ERRORS = (NoTokenError, TokenRefreshError, XeroUnauthorizedError)
+
+
+def run_accounts_sync(params):
+    result, _ = sync_chart_of_accounts_once(
+        full=params.get("full", False), tenant_id=params.get("tenant_id"), stream=True, keep_accounts=False
+    )
+    return result["summary"]
+
+
+def run_accounts_sync_all(params):
+    return sync_all_tenants(full=params.get("full", False))
+
+
+def run_entity_sync(params):
+    return sync_entity_once(params["entity"], full=params.get("full", False), tenant_id=params.get("tenant_id"))
+
+
+def run_webhook_events(params):
+    result = process_webhook_events()
+    if result.get("remaining"):
+        enqueue("webhook_events")
+    return result
+
+
+JOB_HANDLERS = {
+    "accounts": run_accounts_sync,
+    "accounts_all": run_accounts_sync_all,
+    "entity": run_entity_sync,
+    "webhook_events": run_webhook_events,
+}
+
+
+def enqueue(kind, params=None, priority=0, delay=0):
+    """
+    Queue a sync job, reusing an identical job that is still waiting to run.
+
+    Args:
+        kind: The handler to run, one of ``JOB_HANDLERS``.
+        params: JSON-serializable keyword arguments for the handler.
+        priority: Jobs with a higher priority are claimed first.
+        delay: Seconds before a new job may run. A reused job keeps its
+            own start time, so work arriving meanwhile joins it.
+
+    Returns:
+        SyncJob: The queued job.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    params = params or {}
+    job = SyncJob.objects.filter(kind=kind, params=params, status=SyncJob.Status.QUEUED, attempts=0).first()
+    if job is not None:
+        if priority > job.priority:
+            SyncJob.objects.filter(pk=job.pk).update(priority=priority)
+            job.priority = priority
+        return job
+    return SyncJob.objects.create(
+        kind=kind,
+        params=params,
+        priority=priority,
+        max_attempts=settings.XERO_JOB_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim_job(worker_id):
+    """
+    Atomically claim the next runnable job for a worker.
+
+    Candidates are queued jobs that are due, plus running jobs whose lease has
+    expired because their worker died. A job is claimed with a conditional
+    UPDATE, so two workers can never run the same job.
+
+    Returns:
+        SyncJob or None: The claimed job, or None if nothing is runnable.
+    """
+    now = timezone.now()
+    candidates = SyncJob.objects.filter(
+        Q(status=SyncJob.Status.QUEUED, run_after__lte=now)
+        | Q(status=SyncJob.Status.RUNNING, locked_until__lt=now)
+    ).order_by("-priority", "run_after", "created_at").values_list("pk", "status", "locked_until")[:10]
+
+    for pk, job_status, locked_until in candidates:
+        claimed = SyncJob.objects.filter(pk=pk, status=job_status, locked_until=locked_until).update(
+            status=SyncJob.Status.RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=settings.XERO_JOB_LEASE),
+            started_at=now,
+            finished_at=None,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return SyncJob.objects.get(pk=pk)
+    return None
+
+
+def renew_lease(job):
+    """
+    Extend the lease of a job its worker is still running.
+
+    Returns:
+        bool: False if the job is no longer held by this worker, e.g. because
+        the lease lapsed and another worker reclaimed it.
+    """
+    return bool(SyncJob.objects.filter(pk=job.pk, status=SyncJob.Status.RUNNING, locked_by=job.locked_by).update(
+        locked_until=timezone.now() + timedelta(seconds=settings.XERO_JOB_LEASE)
+    ))
+
+
+def _heartbeat(job, stop):
+    try:
+        while not stop.wait(settings.XERO_JOB_HEARTBEAT):
+            if not renew_lease(job):
+                logger.warning("Sync job %s lost its lease to another worker", job.pk)
+                return
+    finally:
+        connections.close_all()
+
+
+@contextmanager
+def lease_heartbeat(job):
+    """
+    Renew the job's lease every ``XERO_JOB_HEARTBEAT`` seconds from a
+    background thread, so a sync running longer than ``XERO_JOB_LEASE`` is
+    not reclaimed while its worker is alive.
+    """
+    stop = threading.Event()
+    thread = threading.Thread(target=_heartbeat, args=(job, stop), name=f"job-{job.pk}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """
+    Run a claimed job and record its outcome.
+
+    Failed jobs are requeued with exponential backoff until they run out of
+    attempts; permanent errors such as a missing token fail immediately. Jobs
+    stopped by Xero's rate limits are requeued for when capacity frees up,
+    without using an attempt, as are jobs refused by an open circuit breaker
+    and jobs whose sync is still being run by another caller.
+    """
+    handler = JOB_HANDLERS[job.kind]
+    try:
+        with lease_heartbeat(job):
+            result = handler(job.params)
+    except (RateLimitedError, CircuitOpenError, SyncInProgressError) as exc:
+        logger.info("Sync job %s deferred (%s), retrying in %.0fs", job.pk, exc, exc.retry_after)
+        job.status = SyncJob.Status.QUEUED
+        job.error = str(exc)
+        job.attempts -= 1
+        job.locked_until = None
+        job.run_after = timezone.now() + timedelta(seconds=exc.retry_after)
+        job.save(update_fields=["status", "error", "attempts", "locked_until", "run_after"])
+        return job
+    except Exception as exc:
+        logger.exception("Sync job %s failed", job.pk)
+        job.error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+        job.locked_until = None
+        if isinstance(exc, PERMANENT_ERRORS) or job.attempts >= job.max_attempts:
+            job.status = SyncJob.Status.FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = SyncJob.Status.QUEUED
+            delay = settings.XERO_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+        job.save(update_fields=["status", "error", "locked_until", "finished_at", "run_after"])
+        return job
+
+    job.status = SyncJob.Status.SUCCEEDED
+    job.result = result
+    job.error = ""
+    job.locked_until = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "result", "error", "locked_until", "finished_at"])
+    return job
+
+
+def run_next_job(worker_id):
+    """
+    Claim and run one job. Returns the job, or None if the queue was empty.
+    """
+    job = claim_job(worker_id)
+    if job is not None:
+        run_job(job)
+    return job
@@ -0,0 +1,110 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _Buffer:
+    """
+    Text buffer over an iterator of byte chunks, refilled on demand.
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self):
+        """
+        Append the next chunk, dropping text that has been consumed. Returns
+        False once the input is exhausted.
+        """
+        if self.exhausted:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            self.text = self.text[self.pos:] + self.utf8.decode(b"", final=True)
+        else:
+            self.text = self.text[self.pos:] + self.utf8.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character, or "" at the end.
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON stream, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Decode the next complete JSON value, reading more input as needed.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number can stop at a chunk boundary and still decode.
+            if end == len(self.text) and not self.exhausted and self.text[self.pos] not in "{[\"":
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array_items(chunks, key):
+    """
+    Yield the items of the array under ``key`` in a JSON object, parsing the
+    input incrementally.
+
+    Only one item, plus the unread part of the current chunk, is held in
+    memory at a time, so arbitrarily large arrays can be consumed with flat
+    memory use. Other members of the object are decoded and discarded.
+
+    Args:
+        chunks: An iterable of UTF-8 encoded byte chunks, e.g.
+            ``response.iter_content(chunk_size)``.
+        key: The top-level key holding the array.
+
+    Raises:
+        ValueError: The input is not a JSON object, or is truncated.
+    """
+    buffer = _Buffer(chunks)
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        name = buffer.value()
+        buffer.expect(":")
+        if name == key and buffer.peek() == "[":
+            buffer.expect("[")
+            if buffer.peek() == "]":
+                buffer.expect("]")
+            else:
+                while True:
+                    yield buffer.value()
+                    if buffer.expect(",]") == "]":
+                        break
+        else:
+            buffer.value()
+        if buffer.expect(",}") == "}":
+            return
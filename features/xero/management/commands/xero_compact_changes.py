@@ -0,0 +1,17 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from features.xero.changes import compact_changes
+
+
+class Command(BaseCommand):
+    help = "Compact the Chart of Accounts change log and drop entries past the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days", type=int, default=None, help="Days entries are kept (XERO_CHANGES_RETENTION_DAYS)."
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(compact_changes(options["retention_days"]), indent=2))
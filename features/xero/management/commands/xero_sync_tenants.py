@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from features.xero.exceptions import NoTokenError
+from features.xero.sync import sync_all_tenants
+
+
+class Command(BaseCommand):
+    help = "Sync the Chart of Accounts of every connected Xero tenant concurrently."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Tenants synced at once (XERO_FANOUT_WORKERS).")
+        parser.add_argument("--full", action="store_true", help="Force a full reconcile for every tenant.")
+
+    def handle(self, *args, **options):
+        try:
+            results = sync_all_tenants(full=options["full"], max_workers=options["workers"])
+        except NoTokenError:
+            raise CommandError("No Xero tenants are connected.")
+
+        self.stdout.write(json.dumps(results, indent=2))
+        failed = [tenant_id for tenant_id, result in results.items() if "error" in result]
+        if failed:
+            raise CommandError(f"Sync failed for {len(failed)} of {len(results)} tenants.")
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from features.xero.jobs import run_next_job
+
+
+class Command(BaseCommand):
+    help = "Run background workers that process queued Xero sync jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Number of worker processes.")
+        parser.add_argument("--threads", type=int, default=1, help="Worker threads per process.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--burst", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        if options["workers"] <= 1:
+            run_process(options)
+            return
+
+        # Child processes must not inherit the parent's database connections.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=run_process, args=(options,), daemon=True)
+            for _ in range(options["workers"])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop_children(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        # Installed after the children have started, so they don't inherit it:
+        # a SIGTERM to the parent is passed on to every child, each of which
+        # finishes its current job and exits.
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGTERM, stop_children)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            stop_children()
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+
+
+def run_process(options):
+    stop = threading.Event()
+    previous_handler = None
+    if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGTERM, lambda *args: stop.set())
+
+    worker_ids = [f"{socket.gethostname()}:{os.getpid()}:{i}" for i in range(options["threads"])]
+    threads = [threading.Thread(target=work, args=(worker_id, options, stop)) for worker_id in worker_ids[1:]]
+    for thread in threads:
+        thread.start()
+    try:
+        work(worker_ids[0], options, stop)
+    except KeyboardInterrupt:
+        stop.set()
+    finally:
+        for thread in threads:
+            thread.join()
+        if previous_handler is not None:
+            signal.signal(signal.SIGTERM, previous_handler)
+
+
+def work(worker_id, options, stop):
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            job = run_next_job(worker_id)
+            if job is None:
+                if options["burst"]:
+                    break
+                stop.wait(options["poll_interval"])
+    finally:
+        connections.close_all()
@@ -0,0 +1,106 @@
+import re
+import time
+from urllib.parse import urlsplit
+
+from features.common.metrics import REGISTRY
+
+# Syncs and their stages run from milliseconds to minutes for large charts.
+SYNC_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+_ID_SEGMENT = re.compile(r"/[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}(?=/|$)")
+
+xero_request_duration = REGISTRY.histogram(
+    "xero_api_request_duration_seconds",
+    "Latency of calls to the Xero APIs, including retries, by endpoint and final status.",
+    ["method", "endpoint", "status"],
+)
+token_refreshes = REGISTRY.counter(
+    "xero_token_refreshes_total",
+    "Access token refresh requests sent to Xero, by outcome.",
+    ["outcome"],
+)
+sync_duration = REGISTRY.histogram(
+    "xero_sync_duration_seconds",
+    "Duration of syncs, by mode (buffered, stream, async or paged) and outcome.",
+    ["mode", "outcome"],
+    buckets=SYNC_BUCKETS,
+)
+sync_stage_duration = REGISTRY.histogram(
+    "xero_sync_stage_duration_seconds",
+    "Time spent in each stage of a sync: fetch (paged), parse, write, parse_and_write (streaming) and serialize.",
+    ["stage"],
+    buckets=SYNC_BUCKETS,
+)
+sync_rows = REGISTRY.counter(
+    "xero_sync_rows_total",
+    "Rows processed by syncs, by outcome.",
+    ["outcome"],
+)
+sync_flights = REGISTRY.counter(
+    "xero_sync_flights_total",
+    "Sync requests, by whether they ran the sync or shared the result of a concurrent or recent one.",
+    ["entity", "outcome"],
+)
+circuit_breaker_transitions = REGISTRY.counter(
+    "xero_circuit_breaker_transitions_total",
+    "Circuit breaker state changes, by Xero endpoint and new state (open, half_open or closed).",
+    ["endpoint", "state"],
+)
+circuit_breaker_rejections = REGISTRY.counter(
+    "xero_circuit_breaker_rejections_total",
+    "Xero calls refused without being sent because the endpoint's circuit breaker was open.",
+    ["endpoint"],
+)
+webhook_events = REGISTRY.counter(
+    "xero_webhook_events_total",
+    "Events received from Xero webhooks, by category.",
+    ["category"],
+)
+
+
+def endpoint_label(url):
+    """
+    Return the path of a Xero URL with ids replaced, e.g. ``api.xro/2.0/Accounts/{id}``.
+    """
+    return _ID_SEGMENT.sub("/{id}", urlsplit(url).path).strip("/")
+
+
+def observe_request(method, url, status, seconds):
+    xero_request_duration.observe(seconds, method=method.upper(), endpoint=endpoint_label(url), status=status)
+
+
+def record_sync_rows(result):
+    summary = result.summary()
+    for outcome in ("created", "updated", "unchanged", "deleted"):
+        sync_rows.inc(summary[outcome], outcome=outcome)
+
+
+class SyncTimer:
+    """
+    Record the duration, outcome and row counts of the sync run in a ``with`` block.
+
+    Example:
+        with SyncTimer("buffered") as timer:
+            return timer.done(run_sync())
+    """
+    def __init__(self, mode):
+        self.mode = mode
+        self.result = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def done(self, result):
+        self.result = result
+        return result
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None or self.result is None:
+            outcome = "error"
+        elif self.result.not_modified:
+            outcome = "not_modified"
+        else:
+            outcome = "ok"
+            record_sync_rows(self.result)
+        sync_duration.observe(time.perf_counter() - self.started, mode=self.mode, outcome=outcome)
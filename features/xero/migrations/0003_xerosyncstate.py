@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0002_alter_chartofaccount_options"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="XeroSyncState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("entity", models.CharField(default="Accounts", max_length=50)),
+                ("watermark", models.DateTimeField(blank=True, null=True)),
+                ("last_full_sync_at", models.DateTimeField(blank=True, null=True)),
+                ("last_sync_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "token",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sync_states",
+                        to="xero.xerotoken",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Xero Sync State",
+                "verbose_name_plural": "Xero Sync States",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("token", "entity"), name="unique_sync_state_per_entity"
+                    )
+                ],
+            },
+        ),
+    ]
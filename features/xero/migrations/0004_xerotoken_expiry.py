@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0003_xerosyncstate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="xerotoken",
+            name="expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="xerotoken",
+            name="refresh_lock_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="xerotoken",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
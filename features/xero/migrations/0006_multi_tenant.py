@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0005_syncjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chartofaccount",
+            name="tenant_id",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="xerotoken",
+            name="tenant_id",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="xerotoken",
+            name="tenant_name",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name="chartofaccount",
+            name="code",
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name="chartofaccount",
+            constraint=models.UniqueConstraint(
+                fields=("tenant_id", "code"), name="unique_account_code_per_tenant"
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0006_multi_tenant"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="chartofaccount",
+            options={
+                "ordering": ["name", "account_id"],
+                "verbose_name": "Chart of Account",
+                "verbose_name_plural": "Chart of Accounts",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["name", "account_id"], name="account_name_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["tenant_id", "name", "account_id"],
+                name="account_tenant_keyset_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:38
+
+from django.db import migrations, models
+
+
+def create_accounts_generation(apps, schema_editor):
+    SyncGeneration = apps.get_model("xero", "SyncGeneration")
+    SyncGeneration.objects.get_or_create(name="accounts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0007_account_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncGeneration",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+                ("changed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Sync Generation",
+                "verbose_name_plural": "Sync Generations",
+            },
+        ),
+        migrations.RunPython(create_accounts_generation, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0008_syncgeneration"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["type", "status", "name", "account_id"],
+                name="account_type_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["currency_code", "type", "name", "account_id"],
+                name="account_currency_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["class_type", "name", "account_id"],
+                name="account_class_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["tax_type", "name", "account_id"], name="account_tax_type_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["reporting_code", "name", "account_id"],
+                name="account_reporting_code_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0009_account_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="XeroRateLimit",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("tokens", models.FloatField()),
+                ("refilled_at", models.DateTimeField()),
+                ("day_remaining", models.IntegerField(blank=True, null=True)),
+                ("blocked_until", models.DateTimeField(blank=True, null=True)),
+                ("in_flight", models.PositiveIntegerField(default=0)),
+                ("in_flight_until", models.DateTimeField(blank=True, null=True)),
+                ("version", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Xero Rate Limit",
+                "verbose_name_plural": "Xero Rate Limits",
+            },
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.1.7 on 2026-10-16 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0010_xeroratelimit"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Contact",
+            fields=[
+                ("contact_id", models.UUIDField(primary_key=True, serialize=False)),
+                ("tenant_id", models.CharField(blank=True, default="", max_length=64)),
+                ("name", models.CharField(max_length=255)),
+                (
+                    "contact_number",
+                    models.CharField(blank=True, max_length=50, null=True),
+                ),
+                (
+                    "account_number",
+                    models.CharField(blank=True, max_length=50, null=True),
+                ),
+                (
+                    "contact_status",
+                    models.CharField(blank=True, max_length=20, null=True),
+                ),
+                ("first_name", models.CharField(blank=True, max_length=255, null=True)),
+                ("last_name", models.CharField(blank=True, max_length=255, null=True)),
+                (
+                    "email_address",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("tax_number", models.CharField(blank=True, max_length=50, null=True)),
+                (
+                    "default_currency",
+                    models.CharField(blank=True, max_length=10, null=True),
+                ),
+                ("is_supplier", models.BooleanField(default=False)),
+                ("is_customer", models.BooleanField(default=False)),
+                ("updated_date_utc", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Contact",
+                "verbose_name_plural": "Contacts",
+                "ordering": ["name", "contact_id"],
+                "indexes": [
+                    models.Index(
+                        fields=["tenant_id", "name", "contact_id"],
+                        name="contact_tenant_name_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="Invoice",
+            fields=[
+                ("invoice_id", models.UUIDField(primary_key=True, serialize=False)),
+                ("tenant_id", models.CharField(blank=True, default="", max_length=64)),
+                ("type", models.CharField(max_length=20)),
+                (
+                    "invoice_number",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("reference", models.CharField(blank=True, max_length=255, null=True)),
+                ("contact_id", models.UUIDField(blank=True, null=True)),
+                ("status", models.CharField(blank=True, max_length=20, null=True)),
+                ("date", models.DateField(blank=True, null=True)),
+                ("due_date", models.DateField(blank=True, null=True)),
+                (
+                    "currency_code",
+                    models.CharField(blank=True, max_length=10, null=True),
+                ),
+                (
+                    "sub_total",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=18, null=True
+                    ),
+                ),
+                (
+                    "total_tax",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=18, null=True
+                    ),
+                ),
+                (
+                    "total",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=18, null=True
+                    ),
+                ),
+                (
+                    "amount_due",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=18, null=True
+                    ),
+                ),
+                (
+                    "amount_paid",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=18, null=True
+                    ),
+                ),
+                ("updated_date_utc", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Invoice",
+                "verbose_name_plural": "Invoices",
+                "ordering": ["-date", "invoice_id"],
+                "indexes": [
+                    models.Index(
+                        fields=["tenant_id", "-date", "invoice_id"],
+                        name="invoice_tenant_date_idx",
+                    ),
+                    models.Index(fields=["contact_id"], name="invoice_contact_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-16 23:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0011_contact_invoice"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="XeroWebhookEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tenant_id", models.CharField(max_length=64)),
+                ("category", models.CharField(max_length=20)),
+                ("event_type", models.CharField(max_length=20)),
+                ("resource_id", models.UUIDField()),
+                ("event_date", models.DateTimeField()),
+                (
+                    "received_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Xero Webhook Event",
+                "verbose_name_plural": "Xero Webhook Events",
+                "indexes": [
+                    models.Index(
+                        fields=["processed_at", "id"], name="webhook_event_pending_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "tenant_id",
+                            "category",
+                            "resource_id",
+                            "event_type",
+                            "event_date",
+                        ),
+                        name="unique_webhook_event",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-16 23:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0012_xerowebhookevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChartOfAccountChange",
+            fields=[
+                ("seq", models.BigAutoField(primary_key=True, serialize=False)),
+                ("account_id", models.UUIDField()),
+                ("tenant_id", models.CharField(blank=True, default="", max_length=64)),
+                (
+                    "operation",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("updated", "Updated"),
+                            ("deleted", "Deleted"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("changed_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "Chart of Account Change",
+                "verbose_name_plural": "Chart of Account Changes",
+                "ordering": ["seq"],
+                "indexes": [
+                    models.Index(
+                        fields=["tenant_id", "seq"], name="account_change_tenant_idx"
+                    ),
+                    models.Index(
+                        fields=["account_id", "seq"], name="account_change_account_idx"
+                    ),
+                    models.Index(fields=["changed_at"], name="account_change_time_idx"),
+                ],
+            },
+        ),
+    ]
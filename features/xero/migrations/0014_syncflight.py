@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-16 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0013_chartofaccountchange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncFlight",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=150, primary_key=True, serialize=False),
+                ),
+                ("locked_by", models.CharField(blank=True, max_length=100)),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("version", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Sync Flight",
+                "verbose_name_plural": "Sync Flights",
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.7 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0014_syncflight"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="chartofaccount",
+            name="account_type_status_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="chartofaccount",
+            name="account_currency_type_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="chartofaccount",
+            name="account_class_type_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="chartofaccount",
+            name="account_tax_type_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="chartofaccount",
+            name="account_reporting_code_idx",
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["tenant_id", "type", "name", "account_id"],
+                name="account_tenant_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["tenant_id", "currency_code", "type", "name", "account_id"],
+                name="account_tenant_currency_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["tenant_id", "class_type", "name", "account_id"],
+                name="account_tenant_class_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["tenant_id", "tax_type", "name", "account_id"],
+                name="account_tenant_tax_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["tenant_id", "reporting_code", "name", "account_id"],
+                name="account_tenant_reporting_idx",
+            ),
+        ),
+    ]
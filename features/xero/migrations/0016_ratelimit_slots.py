@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-16 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0015_tenant_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="xeroratelimit",
+            name="in_flight",
+        ),
+        migrations.RemoveField(
+            model_name="xeroratelimit",
+            name="in_flight_until",
+        ),
+        migrations.CreateModel(
+            name="XeroRateLimitSlot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=100)),
+                ("expires_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Xero Rate Limit Slot",
+                "verbose_name_plural": "Xero Rate Limit Slots",
+                "indexes": [
+                    models.Index(
+                        fields=["key", "expires_at"], name="ratelimit_slot_key_idx"
+                    )
+                ],
+            },
+        ),
+    ]
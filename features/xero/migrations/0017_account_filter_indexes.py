@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-17 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xero", "0016_ratelimit_slots"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["type", "name", "account_id"], name="account_type_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["currency_code", "type", "name", "account_id"],
+                name="account_currency_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["class_type", "name", "account_id"], name="account_class_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["tax_type", "name", "account_id"], name="account_tax_type_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["reporting_code", "name", "account_id"],
+                name="account_reporting_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["tenant_id", "status", "name", "account_id"],
+                name="account_tenant_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chartofaccount",
+            index=models.Index(
+                fields=["status", "name", "account_id"], name="account_status_idx"
+            ),
+        ),
+    ]
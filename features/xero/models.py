@@ -1,9 +1,19 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 class XeroToken(models.Model):
+    tenant_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    tenant_name = models.CharField(max_length=255, blank=True)
     access_token = models.TextField()
     refresh_token = models.TextField()
     expires_in = models.IntegerField()
+    expires_at = models.DateTimeField(null=True, blank=True)
+    refresh_lock_until = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"Token expires in {self.expires_in} seconds"
@@ -14,7 +24,8 @@ class XeroToken(models.Model):
 
 class ChartOfAccount(models.Model):
     account_id = models.UUIDField(primary_key=True)
-    code = models.CharField(max_length=50, unique=True)
+    tenant_id = models.CharField(max_length=64, blank=True, default="")
+    code = models.CharField(max_length=50)
     name = models.CharField(max_length=255)
     type = models.CharField(max_length=100)
     bank_account_number = models.CharField(max_length=50, null=True, blank=True)
@@ -39,4 +50,260 @@ class ChartOfAccount(models.Model):
     class Meta:
         verbose_name = "Chart of Account"
         verbose_name_plural = "Chart of Accounts"
-        ordering = ["name"]
\ No newline at end of file
+        ordering = ["name", "account_id"]
+        constraints = [
+            models.UniqueConstraint(fields=["tenant_id", "code"], name="unique_account_code_per_tenant"),
+        ]
+        indexes = [
+            # Keyset pagination of the accounts list, with and without a tenant filter.
+            models.Index(fields=["name", "account_id"], name="account_name_keyset_idx"),
+            models.Index(fields=["tenant_id", "name", "account_id"], name="account_tenant_keyset_idx"),
+            # Attribute filters, ending in the keyset order: "EXPENSE accounts"
+            # (optionally only the active ones), "BANK accounts in NZD",
+            # "accounts in class ASSET", "archived accounts". Each has a
+            # tenant-scoped index and one for lists across every tenant.
+            models.Index(fields=["tenant_id", "type", "name", "account_id"], name="account_tenant_type_idx"),
+            models.Index(fields=["type", "name", "account_id"], name="account_type_idx"),
+            models.Index(
+                fields=["tenant_id", "currency_code", "type", "name", "account_id"], name="account_tenant_currency_idx"
+            ),
+            models.Index(fields=["currency_code", "type", "name", "account_id"], name="account_currency_idx"),
+            models.Index(fields=["tenant_id", "class_type", "name", "account_id"], name="account_tenant_class_idx"),
+            models.Index(fields=["class_type", "name", "account_id"], name="account_class_idx"),
+            models.Index(fields=["tenant_id", "tax_type", "name", "account_id"], name="account_tenant_tax_type_idx"),
+            models.Index(fields=["tax_type", "name", "account_id"], name="account_tax_type_idx"),
+            models.Index(
+                fields=["tenant_id", "reporting_code", "name", "account_id"], name="account_tenant_reporting_idx"
+            ),
+            models.Index(fields=["reporting_code", "name", "account_id"], name="account_reporting_idx"),
+            models.Index(fields=["tenant_id", "status", "name", "account_id"], name="account_tenant_status_idx"),
+            models.Index(fields=["status", "name", "account_id"], name="account_status_idx"),
+        ]
+
+class Contact(models.Model):
+    contact_id = models.UUIDField(primary_key=True)
+    tenant_id = models.CharField(max_length=64, blank=True, default="")
+    name = models.CharField(max_length=255)
+    contact_number = models.CharField(max_length=50, null=True, blank=True)
+    account_number = models.CharField(max_length=50, null=True, blank=True)
+    contact_status = models.CharField(max_length=20, null=True, blank=True)
+    first_name = models.CharField(max_length=255, null=True, blank=True)
+    last_name = models.CharField(max_length=255, null=True, blank=True)
+    email_address = models.CharField(max_length=255, null=True, blank=True)
+    tax_number = models.CharField(max_length=50, null=True, blank=True)
+    default_currency = models.CharField(max_length=10, null=True, blank=True)
+    is_supplier = models.BooleanField(default=False)
+    is_customer = models.BooleanField(default=False)
+    updated_date_utc = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Contact"
+        verbose_name_plural = "Contacts"
+        ordering = ["name", "contact_id"]
+        indexes = [
+            models.Index(fields=["tenant_id", "name", "contact_id"], name="contact_tenant_name_idx"),
+        ]
+
+class Invoice(models.Model):
+    invoice_id = models.UUIDField(primary_key=True)
+    tenant_id = models.CharField(max_length=64, blank=True, default="")
+    type = models.CharField(max_length=20)
+    invoice_number = models.CharField(max_length=255, null=True, blank=True)
+    reference = models.CharField(max_length=255, null=True, blank=True)
+    # Not a foreign key: invoices may be synced before their contacts.
+    contact_id = models.UUIDField(null=True, blank=True)
+    status = models.CharField(max_length=20, null=True, blank=True)
+    date = models.DateField(null=True, blank=True)
+    due_date = models.DateField(null=True, blank=True)
+    currency_code = models.CharField(max_length=10, null=True, blank=True)
+    sub_total = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    total_tax = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    total = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    amount_due = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    amount_paid = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    updated_date_utc = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.type} {self.invoice_number or self.invoice_id}"
+
+    class Meta:
+        verbose_name = "Invoice"
+        verbose_name_plural = "Invoices"
+        ordering = ["-date", "invoice_id"]
+        indexes = [
+            models.Index(fields=["tenant_id", "-date", "invoice_id"], name="invoice_tenant_date_idx"),
+            models.Index(fields=["contact_id"], name="invoice_contact_idx"),
+        ]
+
+class XeroSyncState(models.Model):
+    token = models.ForeignKey(XeroToken, on_delete=models.CASCADE, related_name="sync_states")
+    entity = models.CharField(max_length=50, default="Accounts")
+    watermark = models.DateTimeField(null=True, blank=True)
+    last_full_sync_at = models.DateTimeField(null=True, blank=True)
+    last_sync_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.entity} synced up to {self.watermark}"
+
+    def is_full_sync_due(self):
+        if self.watermark is None or self.last_full_sync_at is None:
+            return True
+        interval = timedelta(seconds=settings.XERO_FULL_SYNC_INTERVAL)
+        return timezone.now() - self.last_full_sync_at >= interval
+
+    class Meta:
+        verbose_name = "Xero Sync State"
+        verbose_name_plural = "Xero Sync States"
+        constraints = [
+            models.UniqueConstraint(fields=["token", "entity"], name="unique_sync_state_per_entity"),
+        ]
+
+class SyncJob(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    priority = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+    class Meta:
+        verbose_name = "Sync Job"
+        verbose_name_plural = "Sync Jobs"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "-priority", "run_after"], name="syncjob_claim_idx"),
+        ]
+
+class SyncGeneration(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} generation {self.value}"
+
+    class Meta:
+        verbose_name = "Sync Generation"
+        verbose_name_plural = "Sync Generations"
+
+class XeroRateLimit(models.Model):
+    key = models.CharField(max_length=100, primary_key=True)
+    tokens = models.FloatField()
+    refilled_at = models.DateTimeField()
+    day_remaining = models.IntegerField(null=True, blank=True)
+    blocked_until = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} rate limit ({self.tokens:.1f} calls left)"
+
+    class Meta:
+        verbose_name = "Xero Rate Limit"
+        verbose_name_plural = "Xero Rate Limits"
+
+class XeroRateLimitSlot(models.Model):
+    key = models.CharField(max_length=100)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key} slot until {self.expires_at}"
+
+    class Meta:
+        verbose_name = "Xero Rate Limit Slot"
+        verbose_name_plural = "Xero Rate Limit Slots"
+        indexes = [
+            models.Index(fields=["key", "expires_at"], name="ratelimit_slot_key_idx"),
+        ]
+
+class XeroWebhookEvent(models.Model):
+    tenant_id = models.CharField(max_length=64)
+    category = models.CharField(max_length=20)
+    event_type = models.CharField(max_length=20)
+    resource_id = models.UUIDField()
+    event_date = models.DateTimeField()
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.category} {self.event_type} {self.resource_id}"
+
+    class Meta:
+        verbose_name = "Xero Webhook Event"
+        verbose_name_plural = "Xero Webhook Events"
+        constraints = [
+            # Xero redelivers events it did not get a 200 for.
+            models.UniqueConstraint(
+                fields=["tenant_id", "category", "resource_id", "event_type", "event_date"],
+                name="unique_webhook_event",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["processed_at", "id"], name="webhook_event_pending_idx"),
+        ]
+
+class ChartOfAccountChange(models.Model):
+    class Operation(models.TextChoices):
+        CREATED = "created", "Created"
+        UPDATED = "updated", "Updated"
+        DELETED = "deleted", "Deleted"
+
+    seq = models.BigAutoField(primary_key=True)
+    account_id = models.UUIDField()
+    tenant_id = models.CharField(max_length=64, blank=True, default="")
+    operation = models.CharField(max_length=10, choices=Operation.choices)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"#{self.seq} {self.operation} {self.account_id}"
+
+    class Meta:
+        verbose_name = "Chart of Account Change"
+        verbose_name_plural = "Chart of Account Changes"
+        ordering = ["seq"]
+        indexes = [
+            # Reading the feed of one tenant, and compacting an account's entries.
+            models.Index(fields=["tenant_id", "seq"], name="account_change_tenant_idx"),
+            models.Index(fields=["account_id", "seq"], name="account_change_account_idx"),
+            models.Index(fields=["changed_at"], name="account_change_time_idx"),
+        ]
+
+class SyncFlight(models.Model):
+    """
+    The latest run of a sync, keyed by entity and tenant, shared by every
+    worker so that concurrent requests for the same sync run it once.
+    """
+    key = models.CharField(max_length=150, primary_key=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} sync flight"
+
+    class Meta:
+        verbose_name = "Sync Flight"
+        verbose_name_plural = "Sync Flights"
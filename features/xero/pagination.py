@@ -0,0 +1,145 @@
+import json
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class AccountPageSizeMixin:
+    """
+    Let clients pick the page size with ``?page_size=``, capped at
+    ``XERO_ACCOUNTS_MAX_PAGE_SIZE``.
+    """
+    page_size_query_param = "page_size"
+
+    @property
+    def max_page_size(self):
+        return settings.XERO_ACCOUNTS_MAX_PAGE_SIZE
+
+
+class AccountPageNumberPagination(AccountPageSizeMixin, PageNumberPagination):
+    """
+    Classic ``?page=N`` pagination, kept for existing clients.
+    """
+
+
+class AccountKeysetPagination(AccountPageSizeMixin, BasePagination):
+    """
+    Keyset pagination over a stable ``(name, account_id)`` ordering.
+
+    The cursor holds the sort key of the row at the edge of the current page,
+    and the next page is read with a range condition on that key. Served by
+    the ``(name, account_id)`` index, so every page costs the same however
+    deep it is, and no ``COUNT(*)`` is run.
+
+    Unlike DRF's ``CursorPagination``, which positions on the first ordering
+    field and uses an offset to step over ties, the cursor covers the full
+    key, so duplicate names (common across tenants) cost nothing extra.
+    Pages may hold model instances or ``values()`` dicts.
+    """
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+    ordering = ("name", "account_id")
+    page_size = api_settings.PAGE_SIZE
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse = False
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            reverse, name, account_id = cursor
+            if reverse:
+                # ``name <= x`` bounds the index scan; the OR only breaks ties.
+                queryset = queryset.filter(
+                    Q(name__lt=name) | Q(account_id__lt=account_id), name__lte=name
+                ).order_by(*[f"-{field}" for field in self.ordering])
+            else:
+                queryset = queryset.filter(
+                    Q(name__gt=name) | Q(account_id__gt=account_id), name__gte=name
+                ).order_by(*self.ordering)
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def encode_cursor(self, reverse, account):
+        if isinstance(account, dict):
+            name, account_id = account["name"], account["account_id"]
+        else:
+            name, account_id = account.name, account.account_id
+        key = [int(reverse), name, str(account_id)]
+        token = urlsafe_b64encode(json.dumps(key).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            reverse, name, account_id = json.loads(urlsafe_b64decode(token.encode()))
+            if not isinstance(name, str):
+                raise ValueError(name)
+            account_id = uuid.UUID(account_id)
+        except (TypeError, ValueError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), name, account_id
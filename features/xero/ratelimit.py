@@ -0,0 +1,269 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .breaker import remaining_budget
+from .client import _parse_retry_after
+from .exceptions import RateLimitedError
+from .models import XeroRateLimit, XeroRateLimitSlot
+
+APP_KEY = "app"
+
+# Seconds between checks for a free concurrency slot.
+SLOT_POLL_INTERVAL = 0.05
+# Attempts at the compare-and-set update before backing off briefly.
+CAS_ATTEMPTS = 5
+
+
+@dataclass(frozen=True)
+class Limits:
+    capacity: int
+    period: float
+    concurrent: int | None
+
+    @property
+    def rate(self):
+        return self.capacity / self.period
+
+
+def tenant_key(tenant_id):
+    return f"tenant:{tenant_id or ''}"
+
+
+def limits_for(key):
+    """
+    Return the configured limits of a bucket.
+    """
+    if key == APP_KEY:
+        return Limits(settings.XERO_RATE_LIMIT_APP_PER_MINUTE, settings.XERO_RATE_LIMIT_PERIOD, None)
+    return Limits(
+        settings.XERO_RATE_LIMIT_PER_MINUTE, settings.XERO_RATE_LIMIT_PERIOD, settings.XERO_RATE_LIMIT_CONCURRENT
+    )
+
+
+def _load_buckets(keys, now):
+    """
+    Return the buckets for ``keys``, creating full ones on first use.
+    """
+    buckets = XeroRateLimit.objects.in_bulk(keys)
+    missing = [key for key in keys if key not in buckets]
+    if missing:
+        XeroRateLimit.objects.bulk_create(
+            [XeroRateLimit(key=key, tokens=limits_for(key).capacity, refilled_at=now) for key in missing],
+            ignore_conflicts=True,
+        )
+        buckets = XeroRateLimit.objects.in_bulk(keys)
+    return [buckets[key] for key in keys]
+
+
+def _available(bucket, limits, now):
+    elapsed = max((now - bucket.refilled_at).total_seconds(), 0)
+    return min(limits.capacity, bucket.tokens + elapsed * limits.rate)
+
+
+def _in_flight(key, now):
+    return XeroRateLimitSlot.objects.filter(key=key, expires_at__gte=now).count()
+
+
+def _wait(bucket, limits, now):
+    """
+    Return how many seconds a call must wait for this bucket, 0 if it may go now.
+    """
+    if bucket.blocked_until is not None and bucket.blocked_until > now:
+        return (bucket.blocked_until - now).total_seconds()
+    if limits.concurrent is not None and _in_flight(bucket.key, now) >= limits.concurrent:
+        return SLOT_POLL_INTERVAL
+    tokens = _available(bucket, limits, now)
+    if tokens < 1:
+        return (1 - tokens) / limits.rate
+    return 0
+
+
+def try_acquire(tenant_id):
+    """
+    Take one call from the tenant's and the app's buckets if both allow it.
+
+    Buckets live in the database so every worker process draws from the same
+    budget. Each is updated with a compare-and-set on its version, and both
+    are taken in one transaction, so a call is only counted when it can go.
+
+    A call under the tenant's concurrency cap also holds a slot: a row of its
+    own that lapses after ``XERO_RATE_LIMIT_SLOT_LEASE`` seconds, so a slot
+    whose worker died frees up on time however busy the tenant is.
+
+    Returns:
+        tuple: 0 and the slot to hand to ``release()`` (None without a cap)
+        when the call was admitted, otherwise the seconds to wait before
+        trying again and None.
+    """
+    key = tenant_key(tenant_id)
+    for _ in range(CAS_ATTEMPTS):
+        now = timezone.now()
+        with transaction.atomic():
+            buckets = _load_buckets([key, APP_KEY], now)
+            wait = max(_wait(bucket, limits_for(bucket.key), now) for bucket in buckets)
+            if wait:
+                return wait, None
+            if all(_take(bucket, now) for bucket in buckets):
+                if limits_for(key).concurrent is None:
+                    return 0, None
+                expires_at = now + timedelta(seconds=settings.XERO_RATE_LIMIT_SLOT_LEASE)
+                return 0, XeroRateLimitSlot.objects.create(key=key, expires_at=expires_at).pk
+            transaction.set_rollback(True)
+    return SLOT_POLL_INTERVAL, None
+
+
+def _take(bucket, now):
+    # The version bump also orders slot holders: a call that counted the
+    # slots before another took one fails here and retries.
+    changes = {
+        "tokens": _available(bucket, limits_for(bucket.key), now) - 1,
+        "refilled_at": now,
+        "version": F("version") + 1,
+    }
+    return XeroRateLimit.objects.filter(key=bucket.key, version=bucket.version).update(**changes)
+
+
+def release(tenant_id, slot):
+    """
+    Give back a concurrency slot once its call has returned, clearing the
+    tenant's lapsed slots on the way.
+    """
+    if slot is None:
+        return
+    XeroRateLimitSlot.objects.filter(Q(pk=slot) | Q(key=tenant_key(tenant_id), expires_at__lt=timezone.now())).delete()
+
+
+def _deadline():
+    wait = settings.XERO_RATE_LIMIT_MAX_WAIT
+    remaining = remaining_budget()
+    if remaining is not None:
+        wait = min(wait, max(remaining, 0))
+    return time.monotonic() + wait
+
+
+def acquire(tenant_id):
+    """
+    Block until a call to Xero on behalf of ``tenant_id`` is allowed.
+
+    Returns:
+        The concurrency slot taken, to hand to ``release()`` once the call
+        has returned.
+
+    Raises:
+        RateLimitedError: No capacity frees up within ``XERO_RATE_LIMIT_MAX_WAIT``,
+            or within what is left of the request's latency budget.
+    """
+    deadline = _deadline()
+    while True:
+        wait, slot = try_acquire(tenant_id)
+        if not wait:
+            return slot
+        if time.monotonic() + wait > deadline:
+            raise RateLimitedError(wait)
+        time.sleep(wait)
+
+
+async def aacquire(tenant_id):
+    """
+    Async version of ``acquire``; waits without blocking the event loop.
+    """
+    deadline = _deadline()
+    while True:
+        wait, slot = await sync_to_async(try_acquire)(tenant_id)
+        if not wait:
+            return slot
+        if time.monotonic() + wait > deadline:
+            raise RateLimitedError(wait)
+        await asyncio.sleep(wait)
+
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    if not isinstance(value, str):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def record_response(tenant_id, response):
+    """
+    Bring the shared buckets in line with the limits Xero reports.
+
+    ``X-MinLimit-Remaining``, ``X-AppMinLimit-Remaining`` and
+    ``X-DayLimit-Remaining`` cap the local token counts, since other
+    deployments may be spending the same budget. A 429 blocks the bucket
+    named by ``X-Rate-Limit-Problem`` for its ``Retry-After``.
+
+    Returns:
+        float or None: For a 429, the seconds to wait before retrying.
+    """
+    headers = response.headers
+    now = timezone.now()
+    key = tenant_key(tenant_id)
+
+    minute = _int_header(headers, "X-MinLimit-Remaining")
+    if minute is not None:
+        XeroRateLimit.objects.filter(key=key).update(
+            tokens=Least(F("tokens"), Value(float(minute))), version=F("version") + 1
+        )
+    app_minute = _int_header(headers, "X-AppMinLimit-Remaining")
+    if app_minute is not None:
+        XeroRateLimit.objects.filter(key=APP_KEY).update(
+            tokens=Least(F("tokens"), Value(float(app_minute))), version=F("version") + 1
+        )
+    day = _int_header(headers, "X-DayLimit-Remaining")
+    if day is not None:
+        changes = {"day_remaining": day, "version": F("version") + 1}
+        if day <= 0 and response.status_code != 429:
+            changes["blocked_until"] = now + timedelta(seconds=settings.XERO_RATE_LIMIT_DAY_RETRY)
+        XeroRateLimit.objects.filter(key=key).update(**changes)
+
+    if response.status_code != 429:
+        return None
+
+    retry_after = headers.get("Retry-After")
+    retry_after = _parse_retry_after(retry_after) if isinstance(retry_after, str) else None
+    if retry_after is None:
+        retry_after = settings.XERO_RATE_LIMIT_PERIOD
+    problem = headers.get("X-Rate-Limit-Problem")
+    problem = problem.lower() if isinstance(problem, str) else ""
+    blocked_until = now + timedelta(seconds=retry_after)
+    changes = {"blocked_until": blocked_until, "version": F("version") + 1}
+    if problem != "concurrent":
+        # Refill only starts once the block is over.
+        changes.update(tokens=0, refilled_at=blocked_until)
+    XeroRateLimit.objects.filter(key=APP_KEY if problem.startswith("app") else key).update(**changes)
+    return retry_after
+
+
+def check_response(tenant_id, response):
+    """
+    Apply the limits reported on a response, raising instead of returning a 429.
+
+    Raises:
+        RateLimitedError: Xero answered 429 even after the client's own retries.
+    """
+    retry_after = record_response(tenant_id, response)
+    if retry_after is not None:
+        response.close()
+        raise RateLimitedError(retry_after)
+    return response
+
+
+def reset_rate_limits():
+    """
+    Forget all recorded rate-limit state, e.g. between tests.
+    """
+    XeroRateLimit.objects.all().delete()
+    XeroRateLimitSlot.objects.all().delete()
@@ -1,7 +1,197 @@
-from rest_framework import serializers
-from features.xero.models import ChartOfAccount
+from operator import attrgetter
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from features.xero.models import ChartOfAccount, SyncJob
 
 class ChartOfAccountSerializer(serializers.ModelSerializer):
+    """
+    Pass ``fields`` to only output some of the fields.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = ChartOfAccount
         fields = '__all__'
+
+class ValuesSerializer:
+    """
+    Read-only fast path that reproduces a ModelSerializer's output.
+
+    Instead of building a model instance and running every field's
+    ``to_representation`` per row, rows are read with ``.values()`` and only
+    the fields whose representation differs from the database value (UUIDs,
+    datetimes) are converted, using a field map compiled from the
+    ModelSerializer once per batch. The resulting dicts are equal to the
+    ModelSerializer's data, field order included.
+
+    Args:
+        serializer_class: A ModelSerializer with plain model fields. Fields
+            with a different ``source`` are not supported.
+        only: Limit the output to these fields; see ``restrict()``.
+    """
+    # Field subsets kept by restrict(), per serializer.
+    max_subsets = 64
+
+    def __init__(self, serializer_class, only=None):
+        self.serializer_class = serializer_class
+        self.only = only
+        self._subsets = {}
+
+    @cached_property
+    def fields(self):
+        fields = self.serializer_class().fields
+        for name, field in fields.items():
+            if field.source != name:
+                raise ValueError(f"{self.serializer_class.__name__}.{name} has a custom source")
+        if self.only is not None:
+            fields = {name: field for name, field in fields.items() if name in self.only}
+        return fields
+
+    @cached_property
+    def field_names(self):
+        return tuple(self.fields)
+
+    def converters(self):
+        """
+        Compile the field map for the active time zone.
+        """
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        converters = ((name, _fast_representation(field, tz)) for name, field in self.fields.items())
+        return tuple((name, convert) for name, convert in converters if convert is not None)
+
+    def restrict(self, names):
+        """
+        Return a serializer for only some of the fields, in declared order.
+
+        Its ``values()`` reads only those columns, so a sparse fieldset
+        shrinks the query as well as the payload.
+
+        Raises:
+            ValueError: ``names`` includes unknown fields.
+        """
+        names = frozenset(names)
+        unknown = names - set(self.field_names)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        if names == set(self.field_names):
+            return self
+        subset = self._subsets.get(names)
+        if subset is None:
+            subset = ValuesSerializer(self.serializer_class, names)
+            if len(self._subsets) < self.max_subsets:
+                self._subsets[names] = subset
+        return subset
+
+    def values(self, queryset, *extra):
+        """
+        Return ``queryset`` as a values queryset with the serializer's fields,
+        plus any ``extra`` columns the caller needs, e.g. for a cursor.
+        """
+        return queryset.values(*self.field_names, *(name for name in extra if name not in self.field_names))
+
+    def to_representation(self, row, converters=None):
+        for name, convert in converters or self.converters():
+            value = row[name]
+            if value is not None:
+                row[name] = convert(value)
+        return row
+
+    def serialize_rows(self, rows):
+        """
+        Serialize rows from ``values()``. The row dicts are converted in place.
+        """
+        converters = self.converters()
+        return [self.to_representation(row, converters) for row in rows]
+
+    def serialize_objects(self, objects):
+        """
+        Serialize model instances that are already in memory.
+        """
+        names, converters = self.field_names, self.converters()
+        get = attrgetter(*names) if len(names) > 1 else lambda obj: (getattr(obj, names[0]),)
+        return [self.to_representation(dict(zip(names, get(obj))), converters) for obj in objects]
+
+
+def _fast_representation(field, tz):
+    """
+    Return a cheaper equivalent of ``field.to_representation`` for database
+    values, or None when the database value is already its representation.
+    """
+    field_type = type(field)
+    if field_type in (serializers.CharField, serializers.BooleanField, serializers.IntegerField):
+        return None
+    if field_type is serializers.UUIDField and field.uuid_format == "hex_verbose":
+        return str
+    if field_type is serializers.DateTimeField and tz is not None and getattr(field, "timezone", None) is None:
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if output_format is not None and output_format.lower() == ISO_8601:
+            # Same as DateTimeField.enforce_timezone for the aware datetimes
+            # Django returns when USE_TZ is on, minus the per-row time zone lookup.
+            def to_iso_8601(value):
+                if value.tzinfo is None:
+                    return field.to_representation(value)
+                value = value.astimezone(tz).isoformat()
+                return value[:-6] + "Z" if value.endswith("+00:00") else value
+            return to_iso_8601
+    return field.to_representation
+
+
+account_values_serializer = ValuesSerializer(ChartOfAccountSerializer)
+
+
+def parse_fields(value, serializer=account_values_serializer):
+    """
+    Turn a ``?fields=code,name`` value into the serializer for those fields.
+
+    Returns ``serializer`` itself when no value is given.
+
+    Raises:
+        ValueError: The value names no field, or unknown ones.
+    """
+    if value is None:
+        return serializer
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    if not names:
+        raise ValueError("fields must name at least one field")
+    return serializer.restrict(names)
+
+class SyncJobSerializer(serializers.ModelSerializer):
+    queued_seconds = serializers.SerializerMethodField()
+    run_seconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SyncJob
+        fields = [
+            "id",
+            "kind",
+            "params",
+            "priority",
+            "status",
+            "attempts",
+            "max_attempts",
+            "error",
+            "result",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "queued_seconds",
+            "run_seconds",
+        ]
+
+    def get_queued_seconds(self, job):
+        if job.started_at is None:
+            return None
+        return (job.started_at - job.created_at).total_seconds()
+
+    def get_run_seconds(self, job):
+        if job.started_at is None or job.finished_at is None:
+            return None
+        return (job.finished_at - job.started_at).total_seconds()
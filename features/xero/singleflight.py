@@ -0,0 +1,173 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .breaker import remaining_budget
+from .exceptions import SyncInProgressError
+from .metrics import sync_flights
+from .models import SyncFlight
+
+# Seconds between checks of a flight run by another process.
+POLL_INTERVAL = 0.1
+
+# Threads of this process take turns here to check and claim a flight.
+_locks = defaultdict(threading.Lock)
+_locks_guard = threading.Lock()
+
+
+def _lock(key):
+    with _locks_guard:
+        return _locks[key]
+
+
+def _owner():
+    # Unique per call: coroutines of one event loop share a thread.
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:16]}"
+
+
+def run_once(entity, tenant_id, run, accept=None, fresh_for=None, wait=None):
+    """
+    Run a sync unless the same sync is running or has just finished.
+
+    Calls are keyed by entity and tenant. The first caller takes a lease on
+    the SyncFlight row with a conditional UPDATE, runs ``run`` and stores
+    what it returns. Callers arriving meanwhile, in any process, wait and
+    return that result instead of running the sync again, as do callers
+    arriving within ``fresh_for`` seconds after it finished. If the sync
+    fails nothing is stored, and one of the waiting callers runs it next.
+
+    Args:
+        entity: The entity synced, e.g. ``"Accounts"``.
+        tenant_id: The tenant synced.
+        run: Runs the sync and returns a JSON-serializable result.
+        accept: Called with a stored result; return False when it does not
+            answer this call, e.g. an incremental sync for a full one.
+        fresh_for: Defaults to ``XERO_SYNC_FRESH_SECONDS``.
+        wait: Seconds to wait for another caller's sync; defaults to
+            ``XERO_SYNC_FLIGHT_WAIT``, cut to the request's latency budget.
+
+    Returns:
+        tuple: The result, and whether it came from another call.
+
+    Raises:
+        SyncInProgressError: The running sync did not finish within ``wait``.
+    """
+    key, since, deadline = _flight(entity, tenant_id, fresh_for, wait)
+    while True:
+        claimed, value = _claim(entity, key, since, accept)
+        if claimed:
+            return _run(key, value, run), False
+        if claimed is None:
+            return value, True
+        if time.monotonic() > deadline:
+            raise SyncInProgressError(retry_after=value)
+        time.sleep(POLL_INTERVAL)
+
+
+async def arun_once(entity, tenant_id, run, accept=None, fresh_for=None, wait=None):
+    """
+    Async version of ``run_once``, for a coroutine function ``run``.
+
+    The flight row is read and written through ``sync_to_async``; waiting
+    for another caller's sync and running ``run`` both stay on the event
+    loop, so a waiting request holds no thread.
+    """
+    key, since, deadline = _flight(entity, tenant_id, fresh_for, wait)
+    while True:
+        claimed, value = await sync_to_async(_claim)(entity, key, since, accept)
+        if claimed:
+            try:
+                result = await run()
+            except BaseException:
+                await sync_to_async(_release)(key, value)
+                raise
+            await sync_to_async(_store)(key, value, result)
+            return result, False
+        if claimed is None:
+            return value, True
+        if time.monotonic() > deadline:
+            raise SyncInProgressError(retry_after=value)
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+def _flight(entity, tenant_id, fresh_for, wait):
+    fresh_for = settings.XERO_SYNC_FRESH_SECONDS if fresh_for is None else fresh_for
+    wait = settings.XERO_SYNC_FLIGHT_WAIT if wait is None else wait
+    remaining = remaining_budget()
+    if remaining is not None:
+        wait = min(wait, remaining)
+    since = timezone.now() - timedelta(seconds=fresh_for)
+    return f"{entity}:{tenant_id}", since, time.monotonic() + wait
+
+
+def _claim(entity, key, since, accept):
+    """
+    Share a stored result or take the lease on the flight.
+
+    Returns:
+        tuple: ``(None, result)`` for a result to share, ``(True, owner)``
+        when the lease was taken, or ``(False, retry_after)`` while another
+        caller holds it.
+    """
+    # Threads of this process check and claim the flight one at a time; the
+    # sync itself runs after the lock is released, so that waiters keep
+    # polling and give up once their wait has passed.
+    with _lock(key):
+        flight = SyncFlight.objects.filter(key=key).first()
+        if flight is None:
+            flight = SyncFlight(key=key)
+            SyncFlight.objects.bulk_create([flight], ignore_conflicts=True)
+        if (
+            flight.result is not None
+            and flight.finished_at >= since
+            and (accept is None or accept(flight.result))
+        ):
+            sync_flights.inc(entity=entity, outcome="shared")
+            return None, flight.result
+
+        owner, now = _owner(), timezone.now()
+        claimed = SyncFlight.objects.filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now), key=key, version=flight.version
+        ).update(
+            locked_by=owner,
+            locked_until=now + timedelta(seconds=settings.XERO_SYNC_FLIGHT_LEASE),
+            started_at=now,
+            version=F("version") + 1,
+        )
+    if claimed:
+        sync_flights.inc(entity=entity, outcome="ran")
+        return True, owner
+    remaining = (flight.locked_until - now).total_seconds() if flight.locked_until else 0
+    return False, max(remaining, 1)
+
+
+def _run(key, owner, run):
+    try:
+        result = run()
+    except BaseException:
+        _release(key, owner)
+        raise
+    _store(key, owner, result)
+    return result
+
+
+# Only the caller still holding the lease writes, so a sync that outlived it
+# cannot overwrite the flight of the caller that took over.
+def _release(key, owner):
+    SyncFlight.objects.filter(key=key, locked_by=owner).update(locked_by="", locked_until=None)
+
+
+def _store(key, owner, result):
+    SyncFlight.objects.filter(key=key, locked_by=owner).update(
+        result=result, finished_at=timezone.now(), locked_by="", locked_until=None, version=F("version") + 1
+    )
@@ -0,0 +1,254 @@
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .caching import ACCOUNTS, get_generation
+from .exports import export_rows
+from .models import ChartOfAccount
+from .renderers import FastJSONRenderer
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# File in XERO_SNAPSHOT_DIR naming the current snapshot file.
+POINTER = "accounts.current"
+
+# Snapshot files kept on disk, so a process that has just read the pointer
+# can still open the file it names after a newer one is published.
+KEEP = 2
+
+# Content codings a snapshot is stored in, in order of preference.
+ENCODINGS = ("br", "gzip")
+
+# Bytes of a snapshot sent per chunk of a response.
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    An immutable, serialized copy of the Chart of Accounts.
+
+    Attributes:
+        generation: The accounts sync generation the snapshot was built from.
+        digest: SHA-256 of the JSON body, in hex.
+        count: The number of accounts.
+        built_at: When the snapshot was built, in ISO 8601.
+        parts: The body per content coding (``identity``, ``gzip`` and, when
+            brotli is installed, ``br``), as views of the memory-mapped file.
+    """
+    generation: int
+    digest: str
+    count: int
+    built_at: str
+    parts: dict
+
+    def etag(self, encoding):
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.digest[:32]}{suffix}"'
+
+    def iter_part(self, encoding, chunk_size=None):
+        """
+        Yield the body in one coding as slices of the mapped file, so a
+        response never holds more than one chunk of it in memory.
+        """
+        part = self.parts[encoding]
+        chunk_size = chunk_size or CHUNK_SIZE
+        for start in range(0, len(part), chunk_size):
+            yield part[start:start + chunk_size]
+
+    async def aiter_part(self, encoding, chunk_size=None):
+        """
+        Async counterpart of ``iter_part`` for responses served over ASGI,
+        which would otherwise read a sync iterator into a list first.
+        """
+        for chunk in self.iter_part(encoding, chunk_size):
+            yield chunk
+
+
+def negotiate_encoding(accept_encoding, available):
+    """
+    Pick the preferred coding in ``available`` that an ``Accept-Encoding``
+    header allows, or ``identity``.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, *params = (part.strip() for part in item.split(";"))
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.lower()] = weight
+    for encoding in ENCODINGS:
+        if encoding in available and weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def _directory():
+    return Path(settings.XERO_SNAPSHOT_DIR)
+
+
+def _write_atomic(path, chunks):
+    """
+    Write ``chunks`` to a temporary file next to ``path`` and rename it into
+    place, so readers see either the old or the new file, never a partial one.
+    """
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _generation_of(name):
+    return int(name.split("-")[1])
+
+
+def _published_generation(directory):
+    try:
+        return _generation_of((directory / POINTER).read_text())
+    except (FileNotFoundError, IndexError, ValueError):
+        return -1
+
+
+def build_snapshot():
+    """
+    Serialize every account and publish the result as the current snapshot.
+
+    The JSON body is built once, compressed once per coding, and written
+    with a header giving each part's offset to a new file, named after the
+    generation and digest. The pointer file is then replaced to name it.
+    An older generation never replaces a newer one.
+
+    Returns:
+        Snapshot: The current snapshot after publishing.
+    """
+    generation = get_generation(ACCOUNTS).value
+    rows = list(export_rows(ChartOfAccount.objects.order_by("name", "account_id")))
+    body = FastJSONRenderer().render(rows)
+    parts = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        parts["br"] = brotli.compress(body)
+    digest = hashlib.sha256(body).hexdigest()
+
+    offsets, offset = {}, 0
+    for encoding, part in parts.items():
+        offsets[encoding] = [offset, len(part)]
+        offset += len(part)
+    header = json.dumps({
+        "generation": generation,
+        "digest": digest,
+        "count": len(rows),
+        "built_at": timezone.now().isoformat(),
+        "parts": offsets,
+    }).encode()
+
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"accounts-{generation}-{digest[:12]}.snap"
+    _write_atomic(directory / name, [header, b"\n", *parts.values()])
+    if _published_generation(directory) <= generation:
+        _write_atomic(directory / POINTER, [name.encode()])
+    _remove_old_snapshots(directory)
+    return load_snapshot()
+
+
+def _remove_old_snapshots(directory):
+    files = sorted(directory.glob("accounts-*.snap"), key=lambda path: path.stat().st_mtime_ns, reverse=True)
+    for path in files[KEEP:]:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _map(path):
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    end = mapped.find(b"\n")
+    header = json.loads(mapped[:end])
+    view = memoryview(mapped)[end + 1:]
+    return Snapshot(
+        generation=header["generation"],
+        digest=header["digest"],
+        count=header["count"],
+        built_at=header["built_at"],
+        parts={encoding: view[start:start + length] for encoding, (start, length) in header["parts"].items()},
+    )
+
+
+# The snapshot mapped by this process, with the pointer file's identity.
+_current = None
+_load_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+
+def load_snapshot():
+    """
+    Return the published snapshot, or None if none has been built yet.
+
+    The pointer file is checked on every call, which costs one ``stat``; the
+    file it names is only mapped again when the pointer has been replaced.
+    """
+    global _current
+    pointer = _directory() / POINTER
+    for _ in range(2):
+        try:
+            stat = pointer.stat()
+        except FileNotFoundError:
+            return None
+        key = (str(pointer), stat.st_ino, stat.st_mtime_ns)
+        current = _current
+        if current is not None and current[0] == key:
+            return current[1]
+        with _load_lock:
+            try:
+                snapshot = _map(pointer.parent / pointer.read_text())
+            except FileNotFoundError:
+                # The pointer moved on and the file it named was removed.
+                continue
+            _current = (key, snapshot)
+            return snapshot
+    return None
+
+
+def get_snapshot():
+    """
+    Return a snapshot of the current accounts generation.
+
+    Syncs only bump the generation; the first request that finds the
+    snapshot missing or behind it builds a new one, once per process, and
+    every process on the host then maps the published file.
+    """
+    generation = get_generation(ACCOUNTS).value
+    snapshot = load_snapshot()
+    if snapshot is None or snapshot.generation < generation:
+        with _build_lock:
+            snapshot = load_snapshot()
+            if snapshot is None or snapshot.generation < generation:
+                snapshot = build_snapshot()
+    return snapshot
+
@@ -0,0 +1,600 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .caching import ACCOUNTS, bump_generation
+from .changes import AccountChanges, Operation
+from .client import get_async_client, get_client
+from .entities import ACCOUNTS as ACCOUNTS_SPEC, parse_xero_datetime
+from .exceptions import NoTokenError, XeroAPIError, XeroUnauthorizedError
+from .jsonstream import iter_array_items
+from .metrics import SyncTimer, sync_stage_duration
+from .models import ChartOfAccount, XeroSyncState, XeroToken
+from .singleflight import arun_once, run_once
+from .tokens import aget_access_token, axero_get, get_access_token, xero_get
+
+logger = logging.getLogger(__name__)
+
+XERO_ACCOUNTS_PATH = ACCOUNTS_SPEC.path
+
+SYNC_FIELDS = list(ACCOUNTS_SPEC.fields)
+
+BATCH_SIZE = 500
+
+
+def account_values(account):
+    """
+    Convert a single Xero account payload into ChartOfAccount field values.
+    """
+    return ACCOUNTS_SPEC.values(account)
+
+
+@dataclass
+class SyncResult:
+    """
+    Outcome of an upsert, with the affected rows in payload order.
+    """
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    deleted: int = 0
+    accounts: list = field(default_factory=list)
+    not_modified: bool = False
+
+    @property
+    def changed(self):
+        return len(self.created) + len(self.updated) + self.deleted
+
+    def record(self, outcome, account):
+        getattr(self, outcome).append(account)
+        self.accounts.append(account)
+
+    def summary(self):
+        return {
+            "created": len(self.created),
+            "updated": len(self.updated),
+            "unchanged": len(self.unchanged),
+            "deleted": self.deleted,
+            "not_modified": self.not_modified,
+        }
+
+
+@dataclass
+class SyncSummary:
+    """
+    Outcome of an upsert as counts only, for syncs that must not keep every
+    row in memory. Has the same ``changed`` and ``summary()`` as SyncResult.
+    """
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    not_modified: bool = False
+
+    @property
+    def changed(self):
+        return self.created + self.updated + self.deleted
+
+    def record(self, outcome, account):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def summary(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "deleted": self.deleted,
+            "not_modified": self.not_modified,
+        }
+
+
+def _park_codes(accounts):
+    """
+    Move the given accounts onto unique placeholder codes.
+
+    Used before the real update so that codes swapped between accounts
+    never collide with the ``code`` unique constraint mid-statement.
+    """
+    for account in accounts:
+        account.code = f"~{account.account_id}"
+    ChartOfAccount.objects.bulk_update(accounts, ["code"], batch_size=BATCH_SIZE)
+
+
+def _stale_holders(codes, incoming, tenant_id):
+    """
+    Return the rows outside the payload that hold one of the given codes.
+    """
+    stale = []
+    for start in range(0, len(codes), BATCH_SIZE):
+        holders = ChartOfAccount.objects.filter(
+            tenant_id=tenant_id, code__in=codes[start:start + BATCH_SIZE]
+        ).only("account_id", "code")
+        stale.extend(account for account in holders if account.account_id not in incoming)
+    return stale
+
+
+def _delete_accounts(account_ids, changes):
+    account_ids = list(account_ids)
+    changes.record(Operation.DELETED, account_ids)
+    for start in range(0, len(account_ids), BATCH_SIZE):
+        ChartOfAccount.objects.filter(account_id__in=account_ids[start:start + BATCH_SIZE]).delete()
+    return len(account_ids)
+
+
+def _prune_missing(incoming, tenant_id, changes):
+    """
+    Delete every local account of the tenant that is not present in the payload.
+    """
+    accounts = ChartOfAccount.objects.filter(tenant_id=tenant_id).values_list("account_id", flat=True)
+    missing = [account_id for account_id in accounts.iterator() if account_id not in incoming]
+    return _delete_accounts(missing, changes)
+
+
+def upsert_accounts(payload, prune=False, tenant_id=""):
+    """
+    Write a batch of Xero accounts to the database in a single transaction.
+
+    Existing rows are loaded with one query, the payload is split into
+    inserts and updates, and only rows whose values actually changed are
+    written back using ``bulk_create``/``bulk_update``. Rows outside the
+    payload that still hold a code now owned by another account are stale
+    (Xero codes are unique) and are removed.
+
+    Args:
+        payload: An iterable of account dicts as returned by Xero.
+        prune: Delete local accounts missing from the payload. Only safe
+            when the payload is the full chart.
+        tenant_id: The Xero tenant the accounts belong to.
+
+    Returns:
+        SyncResult: The created, updated and unchanged accounts.
+    """
+    incoming = {}
+    for account in payload:
+        incoming[uuid.UUID(str(account["AccountID"]))] = account_values(account)
+
+    result = SyncResult()
+    if not incoming and not prune:
+        return result
+
+    changes = AccountChanges()
+
+    def delete_holders(stale):
+        result.deleted += _delete_accounts((account.account_id for account in stale), changes)
+
+    with transaction.atomic():
+        if prune:
+            result.deleted = _prune_missing(incoming, tenant_id, changes)
+
+        _write_batch(incoming, tenant_id, result, delete_holders, changes)
+
+        if result.changed:
+            bump_generation(ACCOUNTS)
+            changes.save(tenant_id)
+
+    return result
+
+
+def upsert_account_stream(accounts, prune=False, tenant_id="", batch_size=BATCH_SIZE, keep_accounts=False):
+    """
+    Write an iterable of Xero accounts to the database in fixed-size batches.
+
+    Meant for accounts parsed incrementally from a large response: only one
+    batch of payload dicts and model instances is alive at a time, plus the
+    set of account ids seen so far, which pruning needs. All batches share
+    one transaction, so readers never see a half-written chart.
+
+    A row holding a code claimed in one batch may still show up in a later
+    batch, so instead of being deleted straight away it is moved onto a
+    placeholder code and only deleted at the end if it never appeared.
+
+    Args:
+        accounts: An iterable of account dicts as returned by Xero.
+        prune: Delete local accounts missing from the payload.
+        tenant_id: The Xero tenant the accounts belong to.
+        batch_size: Accounts written per batch.
+        keep_accounts: Return a SyncResult holding every row instead of a
+            SyncSummary with counts only.
+
+    Returns:
+        SyncResult or SyncSummary: The outcome of the sync.
+    """
+    result = SyncResult() if keep_accounts else SyncSummary()
+    changes = AccountChanges()
+    seen, parked = set(), set()
+
+    def park_holders(stale):
+        _park_codes(stale)
+        parked.update(account.account_id for account in stale)
+
+    with transaction.atomic():
+        for batch in _batches(accounts, batch_size):
+            incoming = {uuid.UUID(str(account["AccountID"])): account_values(account) for account in batch}
+            seen.update(incoming)
+            _write_batch(incoming, tenant_id, result, park_holders, changes)
+
+        if prune:
+            result.deleted = _prune_missing(seen, tenant_id, changes)
+        else:
+            result.deleted += _delete_accounts(parked - seen, changes)
+
+        if result.changed:
+            bump_generation(ACCOUNTS)
+            changes.save(tenant_id)
+
+    return result
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write_batch(incoming, tenant_id, result, release_codes, changes):
+    """
+    Insert and update one batch of accounts, recording each in ``result`` and
+    the rows written in ``changes``.
+
+    Rows outside the batch that hold a code the batch claims are handed to
+    ``release_codes``, which must delete them or move them off the code
+    before the batch is written.
+
+    Existing rows are looked up by id regardless of tenant: rows synced before
+    tenants were recorded carry an empty ``tenant_id`` and are adopted by the
+    tenant that syncs them instead of colliding on the primary key.
+    """
+    existing = ChartOfAccount.objects.in_bulk(list(incoming))
+
+    to_create, to_update, recoded, moved = [], [], [], []
+    for account_id, values in incoming.items():
+        obj = existing.get(account_id)
+        if obj is None:
+            obj = ChartOfAccount(account_id=account_id, tenant_id=tenant_id, **values)
+            to_create.append(obj)
+            result.record("created", obj)
+        else:
+            changed = [name for name, value in values.items() if getattr(obj, name) != value]
+            if obj.tenant_id != tenant_id:
+                moved.append(obj)
+                changed.append("tenant_id")
+            if changed:
+                if "code" in changed or "tenant_id" in changed:
+                    recoded.append(obj)
+                to_update.append((obj, values))
+                result.record("updated", obj)
+            else:
+                result.record("unchanged", obj)
+
+    recoded_ids = {obj.account_id for obj in recoded}
+    claimed_codes = [values["code"] for obj, values in to_update if obj.account_id in recoded_ids]
+    claimed_codes += [obj.code for obj in to_create]
+    stale = _stale_holders(claimed_codes, incoming, tenant_id)
+    if stale:
+        release_codes(stale)
+
+    if recoded:
+        _park_codes(recoded)
+
+    changes.record(Operation.UPDATED, [obj.account_id for obj, _ in to_update])
+    changes.record(Operation.CREATED, [obj.account_id for obj in to_create])
+
+    if to_update:
+        for obj, values in to_update:
+            for name, value in values.items():
+                setattr(obj, name, value)
+            obj.tenant_id = tenant_id
+        fields = [*SYNC_FIELDS, "tenant_id"] if moved else SYNC_FIELDS
+        ChartOfAccount.objects.bulk_update(
+            [obj for obj, _ in to_update], fields, batch_size=BATCH_SIZE
+        )
+
+    if to_create:
+        ChartOfAccount.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+
+
+def latest_update(payload):
+    """
+    Return the most recent ``UpdatedDateUTC`` in a payload, or None.
+    """
+    dates = [parse_xero_datetime(account.get("UpdatedDateUTC")) for account in payload]
+    dates = [date for date in dates if date is not None]
+    return max(dates, default=None)
+
+
+def prepare_sync(token, full=False, entity=ACCOUNTS_SPEC.name):
+    """
+    Decide between an incremental and a full sync of an entity and build the
+    request headers.
+
+    Returns:
+        tuple: The XeroSyncState, whether this is a full sync, and the headers.
+    """
+    state, _ = XeroSyncState.objects.get_or_create(token_id=token.pk, entity=entity)
+    full_sync = full or state.is_full_sync_due()
+
+    headers = {"Accept": "application/json"}
+    if not full_sync:
+        headers["If-Modified-Since"] = state.watermark.strftime("%Y-%m-%dT%H:%M:%S")
+    return state, full_sync, headers
+
+
+def check_response_status(status_code):
+    """
+    Raise for error statuses. Returns True when Xero answered 304.
+    """
+    if status_code == 401:
+        raise XeroUnauthorizedError()
+    if status_code == 304:
+        return True
+    if status_code != 200:
+        raise XeroAPIError(status_code)
+    return False
+
+
+def save_sync_state(state, full_sync, latest):
+    now = timezone.now()
+    state.watermark = max(filter(None, [state.watermark, latest]), default=None)
+    state.last_sync_at = now
+    if full_sync:
+        state.last_full_sync_at = now
+    state.save()
+
+
+def apply_accounts_response(state, full_sync, status_code, load_json, tenant_id=""):
+    """
+    Write a Xero Accounts response to the database and advance the watermark.
+
+    ``load_json`` is only called once the status shows there is a body to
+    parse, so 304 replies skip parsing entirely.
+    """
+    if check_response_status(status_code):
+        return SyncResult(not_modified=True)
+
+    with sync_stage_duration.time(stage="parse"):
+        accounts = load_json().get("Accounts", [])
+    if not accounts and not full_sync:
+        return SyncResult(not_modified=True)
+
+    with sync_stage_duration.time(stage="write"):
+        result = upsert_accounts(accounts, prune=full_sync, tenant_id=tenant_id)
+    save_sync_state(state, full_sync, latest_update(accounts))
+    return result
+
+
+def apply_accounts_stream(state, full_sync, status_code, iter_chunks, tenant_id="", keep_accounts=False):
+    """
+    Streaming version of ``apply_accounts_response``.
+
+    The ``Accounts`` array is parsed incrementally from the body chunks and
+    written in batches with ``upsert_account_stream``, so the decoded chart
+    is never held in memory as a whole, nor the raw body when the chunks
+    are read from the network.
+
+    Args:
+        status_code: The status of the Xero response.
+        iter_chunks: Returns the response body as an iterable of bytes;
+            only called once the status shows there is a body.
+        keep_accounts: Return every row (SyncResult) instead of counts.
+
+    Returns:
+        SyncSummary or SyncResult: The outcome of the sync.
+    """
+    if check_response_status(status_code):
+        return SyncSummary(not_modified=True)
+
+    seen = {"count": 0, "latest": None}
+
+    def tracked(accounts):
+        for account in accounts:
+            seen["count"] += 1
+            updated = parse_xero_datetime(account.get("UpdatedDateUTC"))
+            if updated is not None and (seen["latest"] is None or updated > seen["latest"]):
+                seen["latest"] = updated
+            yield account
+
+    with sync_stage_duration.time(stage="parse_and_write"):
+        result = upsert_account_stream(
+            tracked(iter_array_items(iter_chunks(), "Accounts")),
+            prune=full_sync,
+            tenant_id=tenant_id,
+            keep_accounts=keep_accounts,
+        )
+
+    if not seen["count"] and not full_sync:
+        result.not_modified = True
+        return result
+
+    save_sync_state(state, full_sync, seen["latest"])
+    return result
+
+
+def sync_chart_of_accounts(full=False, tenant_id=None, stream=False, keep_accounts=True):
+    """
+    Fetch the Chart of Accounts from Xero and write it to the database.
+
+    Once a sync has completed, later syncs are incremental: the stored watermark
+    is sent as ``If-Modified-Since`` so that only changed accounts are fetched.
+    A full reconcile, which also removes accounts deleted in Xero, runs every
+    ``XERO_FULL_SYNC_INTERVAL`` seconds or when ``full`` is set.
+
+    Args:
+        full: Force a full reconcile.
+        tenant_id: The Xero tenant to sync. Defaults to the first stored connection.
+        stream: Parse the response incrementally and write it in batches, so
+            memory use stays flat however large the chart is.
+        keep_accounts: In streaming mode, keep every written row in the
+            result. Without it only counts are returned.
+
+    Returns:
+        SyncResult or SyncSummary: The accounts written, or only their counts
+        when streaming without ``keep_accounts``. ``not_modified`` is set when
+        Xero reported no changes and nothing was written.
+
+    Raises:
+        NoTokenError: No Xero token has been stored for the tenant.
+        TokenRefreshError: The access token expired and could not be refreshed.
+        XeroUnauthorizedError: Xero rejected the access token.
+        XeroAPIError: Xero answered with an unexpected status.
+        ValueError: A streamed response body is not valid JSON.
+    """
+    with SyncTimer("stream" if stream else "buffered") as timer:
+        token = get_access_token(tenant_id)
+        state, full_sync, headers = prepare_sync(token, full)
+        url = get_client().api_url(XERO_ACCOUNTS_PATH)
+        if stream:
+            response = xero_get(url, headers=headers, tenant_id=token.tenant_id, stream=True)
+            try:
+                return timer.done(apply_accounts_stream(
+                    state,
+                    full_sync,
+                    response.status_code,
+                    lambda: response.iter_content(chunk_size=settings.XERO_STREAM_CHUNK_SIZE),
+                    tenant_id=token.tenant_id or "",
+                    keep_accounts=keep_accounts,
+                ))
+            finally:
+                response.close()
+
+        response = xero_get(url, headers=headers, tenant_id=token.tenant_id)
+        return timer.done(apply_accounts_response(
+            state, full_sync, response.status_code, response.json, tenant_id=token.tenant_id or ""
+        ))
+
+
+def _flight_result(full, keep_accounts, ran):
+    result = {"full": full, "summary": ran.summary()}
+    if keep_accounts:
+        result["account_ids"] = [str(account.account_id) for account in ran.accounts]
+    return result
+
+
+def _answers(full, keep_accounts):
+    def accept(result):
+        return (result["full"] or not full) and ("account_ids" in result or not keep_accounts)
+    return accept
+
+
+def sync_chart_of_accounts_once(full=False, tenant_id=None, stream=False, keep_accounts=True):
+    """
+    Sync the Chart of Accounts, sharing the Xero fetch with concurrent and
+    just-finished syncs of the same tenant (see ``singleflight.run_once``).
+
+    A stored result only answers calls it covers: a full sync is not
+    answered by an incremental one, nor a call that wants the accounts back
+    by a sync that did not keep them.
+
+    Returns:
+        tuple: The shared result, a dict with the sync ``summary``, whether
+        it was ``full`` and, when the accounts were kept, their
+        ``account_ids`` in payload order; and the SyncResult or SyncSummary
+        when this call ran the sync itself, else None.
+    """
+    tenant = get_access_token(tenant_id).tenant_id or ""
+    ran = None
+
+    def run():
+        nonlocal ran
+        ran = sync_chart_of_accounts(full=full, tenant_id=tenant_id, stream=stream, keep_accounts=keep_accounts)
+        return _flight_result(full, keep_accounts, ran)
+
+    result, _ = run_once(ACCOUNTS_SPEC.name, tenant, run, _answers(full, keep_accounts))
+    return result, ran
+
+
+async def async_sync_chart_of_accounts(full=False, tenant_id=None, stream=False, keep_accounts=True):
+    """
+    Async version of ``sync_chart_of_accounts``.
+
+    The Xero call is made with the async client; database work runs in a
+    worker thread through ``sync_to_async``. With ``stream`` the body is
+    still read whole by the client, but parsed and written in batches.
+    """
+    with SyncTimer("async") as timer:
+        token = await aget_access_token(tenant_id)
+        state, full_sync, headers = await sync_to_async(prepare_sync)(token, full)
+        response = await axero_get(
+            get_async_client().api_url(XERO_ACCOUNTS_PATH), headers=headers, tenant_id=token.tenant_id
+        )
+        if stream:
+            return timer.done(await sync_to_async(apply_accounts_stream)(
+                state,
+                full_sync,
+                response.status_code,
+                lambda: response.iter_bytes(settings.XERO_STREAM_CHUNK_SIZE),
+                tenant_id=token.tenant_id or "",
+                keep_accounts=keep_accounts,
+            ))
+        return timer.done(await sync_to_async(apply_accounts_response)(
+            state, full_sync, response.status_code, response.json, tenant_id=token.tenant_id or ""
+        ))
+
+
+async def async_sync_chart_of_accounts_once(full=False, tenant_id=None, stream=False, keep_accounts=True):
+    """
+    Async version of ``sync_chart_of_accounts_once``, coalesced with the
+    sync version's calls through ``singleflight.arun_once``.
+    """
+    tenant = (await aget_access_token(tenant_id)).tenant_id or ""
+    ran = None
+
+    async def run():
+        nonlocal ran
+        ran = await async_sync_chart_of_accounts(
+            full=full, tenant_id=tenant_id, stream=stream, keep_accounts=keep_accounts
+        )
+        return _flight_result(full, keep_accounts, ran)
+
+    result, _ = await arun_once(ACCOUNTS_SPEC.name, tenant, run, _answers(full, keep_accounts))
+    return result, ran
+
+
+def _sync_tenant(tenant_id, full):
+    try:
+        return sync_chart_of_accounts(full=full, tenant_id=tenant_id, stream=True, keep_accounts=False).summary()
+    except Exception as exc:
+        logger.exception("Chart of Accounts sync failed for tenant %s", tenant_id)
+        return {"error": str(exc) or type(exc).__name__}
+    finally:
+        connections.close_all()
+
+
+def sync_all_tenants(full=False, max_workers=None):
+    """
+    Sync the Chart of Accounts of every connected tenant concurrently.
+
+    Tenants are synced on a thread pool of at most ``XERO_FANOUT_WORKERS``
+    threads, so the total time is bounded by the pool width rather than the
+    number of tenants. A failing tenant does not affect the others; its error
+    is reported in its place.
+
+    Args:
+        full: Force a full reconcile for every tenant.
+        max_workers: Override the pool width.
+
+    Returns:
+        dict: The sync summary, or ``{"error": ...}``, keyed by tenant id.
+    """
+    tenant_ids = list(
+        XeroToken.objects.exclude(tenant_id=None).order_by("pk").values_list("tenant_id", flat=True)
+    )
+    if not tenant_ids:
+        raise NoTokenError()
+
+    max_workers = min(max_workers or settings.XERO_FANOUT_WORKERS, len(tenant_ids))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="xero-sync") as pool:
+        # Each tenant runs in a copy of the caller's context, which carries its latency budget.
+        futures = [pool.submit(copy_context().run, _sync_tenant, tenant_id, full) for tenant_id in tenant_ids]
+        return {tenant_id: future.result() for tenant_id, future in zip(tenant_ids, futures)}
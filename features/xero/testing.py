@@ -0,0 +1,229 @@
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeXeroServer:
+    """
+    Local stand-in for the Xero APIs, served over HTTP on a random port.
+
+    Responses are queued per ``(method, path)`` and served in order; the last
+    queued response for a route keeps being served once the queue drains.
+    Point the app at it with ``override_settings(XERO_API_BASE_URL=server.url,
+    XERO_IDENTITY_BASE_URL=server.url)``.
+
+    Example:
+        with FakeXeroServer() as server:
+            server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": []})
+    """
+    def __init__(self):
+        self.routes = defaultdict(deque)
+        self.paged_routes = {}
+        self.requests = []
+        self.rejected = 0
+        self.per_minute = None
+        self.period = 60.0
+        self.concurrent = None
+        self.error_rate = 0.0
+        self.error_status = 503
+        self._random = random.Random()
+        self._buckets = {}
+        self._in_flight = defaultdict(int)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def add(self, method, path, status=200, json=None, body=b"", headers=None, delay=0):
+        """
+        Queue a response for the given route.
+        """
+        if json is not None:
+            body = _dumps(json)
+        with self._lock:
+            self.routes[(method, path)].append((status, body, headers or {}, delay))
+
+    def add_pages(self, path, key, items, page_size=100, delay=0):
+        """
+        Serve ``items`` from a paged GET endpoint, ``page_size`` at a time.
+
+        Pages are picked by the ``page`` query parameter and carry Xero's
+        ``pagination`` block; a page past the end is empty.
+        """
+        with self._lock:
+            self.paged_routes[("GET", path)] = (key, list(items), page_size, delay)
+
+    def limit(self, per_minute=None, period=60.0, concurrent=None):
+        """
+        Enforce Xero's rate limits per ``Xero-tenant-id``.
+
+        Each tenant gets ``per_minute`` calls, refilled continuously over
+        ``period`` seconds, and at most ``concurrent`` calls in flight.
+        Responses carry ``X-MinLimit-Remaining``; calls over a limit get a 429
+        with ``Retry-After`` and ``X-Rate-Limit-Problem``, and are counted in
+        ``rejected``.
+        """
+        self.per_minute, self.period, self.concurrent = per_minute, period, concurrent
+        return self
+
+    def inject_errors(self, rate, status=503, seed=None):
+        """
+        Answer a random ``rate`` fraction of accounting API calls with ``status``.
+        """
+        self.error_rate, self.error_status = rate, status
+        self._random = random.Random(seed)
+        return self
+
+    def should_fail(self):
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def admit(self, tenant_id):
+        """
+        Return ``(status, body, headers)`` rejecting the call, or ``(None, None, headers)``.
+        """
+        with self._lock:
+            if self.concurrent is not None and self._in_flight[tenant_id] >= self.concurrent:
+                self.rejected += 1
+                return 429, _dumps({"Title": "Too many concurrent requests"}), {
+                    "Retry-After": "1", "X-Rate-Limit-Problem": "concurrent",
+                }
+            headers = {}
+            if self.per_minute is not None:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(tenant_id, (self.per_minute, now))
+                rate = self.per_minute / self.period
+                tokens = min(self.per_minute, tokens + (now - updated) * rate)
+                # Allow for float error between the client's clock and ours.
+                if tokens < 1 - 1e-3:
+                    self._buckets[tenant_id] = (tokens, now)
+                    self.rejected += 1
+                    return 429, _dumps({"Title": "Rate limit exceeded"}), {
+                        "Retry-After": str(math.ceil((1 - tokens) / rate)),
+                        "X-Rate-Limit-Problem": "minute",
+                        "X-MinLimit-Remaining": "0",
+                    }
+                tokens = max(tokens - 1, 0)
+                self._buckets[tenant_id] = (tokens, now)
+                headers["X-MinLimit-Remaining"] = str(math.floor(tokens))
+            self._in_flight[tenant_id] += 1
+            return None, None, headers
+
+    def finish(self, tenant_id):
+        with self._lock:
+            self._in_flight[tenant_id] -= 1
+
+    def requests_for(self, method, path):
+        return [r for r in self.requests if r["method"] == method and r["path"] == path]
+
+    def handle(self, method, path, headers, body, query=""):
+        """
+        Return ``(status, body, headers, delay)`` for a request.
+        """
+        with self._lock:
+            paged = self.paged_routes.get((method, path))
+            if paged is not None:
+                key, items, page_size, delay = paged
+                page = int(parse_qs(query).get("page", ["1"])[0])
+                return 200, _dumps({
+                    "pagination": {
+                        "page": page,
+                        "pageSize": page_size,
+                        "pageCount": math.ceil(len(items) / page_size),
+                        "itemCount": len(items),
+                    },
+                    key: items[(page - 1) * page_size:page * page_size],
+                }), {}, delay
+            queue = self.routes.get((method, path))
+            if not queue:
+                return 404, _dumps({"error": "Not found"}), {}, 0
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; with Nagle's
+            # algorithm the body can wait for a delayed ACK on keep-alive
+            # connections, adding ~40 ms to back-to-back requests.
+            disable_nagle_algorithm = True
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                path = urlsplit(self.path).path
+                fake.requests.append({
+                    "client": self.client_address,
+                    "method": self.command,
+                    "path": path,
+                    "query": urlsplit(self.path).query,
+                    "headers": dict(self.headers),
+                    "body": body,
+                })
+                # Only accounting API calls count against the rate limits.
+                limited = path.startswith("/api.xro/")
+                tenant_id = self.headers.get("Xero-tenant-id", "")
+                status, payload, headers = fake.admit(tenant_id) if limited else (None, None, {})
+                if status is None and limited and fake.should_fail():
+                    fake.finish(tenant_id)
+                    status, payload, headers = fake.error_status, _dumps({"Title": "Injected error"}), {}
+                if status is None:
+                    status, payload, route_headers, delay = fake.handle(
+                        self.command, path, self.headers, body, urlsplit(self.path).query
+                    )
+                    if delay:
+                        time.sleep(delay)
+                    headers = {**route_headers, **headers}
+                    if limited:
+                        # Counted as finished before the reply goes out.
+                        fake.finish(tenant_id)
+                try:
+                    self.send_response(status)
+                    headers = {"Content-Type": "application/json", **headers}
+                    for name, value in headers.items():
+                        self.send_header(name, str(value))
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (e.g. a read timeout) before the reply.
+                    self.close_connection = True
+
+            do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _dumps(data):
+    return json.dumps(data).encode()
@@ -1,8 +1,63 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
-from features.xero.models import ChartOfAccount, XeroToken
-from features.xero.serializers import ChartOfAccountSerializer
-from unittest.mock import patch
+from rest_framework.renderers import JSONRenderer
+from features.xero.jobs import claim_job, enqueue, run_next_job
+from features.xero.caching import ACCOUNTS, bump_generation, forget_generation, page_cache
+from features.xero.changes import compact_changes
+from features.common.metrics import REGISTRY
+from features.common.testing import QueryBudgetMixin
+from features.xero import jobs, metrics as xero_metrics, ratelimit, renderers, singleflight, snapshots
+from features.xero.models import (
+    ChartOfAccount, ChartOfAccountChange, Contact, Invoice, SyncGeneration, SyncJob, XeroRateLimit, XeroRateLimitSlot, XeroToken, XeroSyncState,
+    XeroWebhookEvent, SyncFlight,
+)
+from features.xero.renderers import FastJSONRenderer
+from features.xero.serializers import ChartOfAccountSerializer, account_values_serializer
+from features.xero.exceptions import (
+    CircuitOpenError,
+    LatencyBudgetExceededError,
+    RateLimitedError,
+    SyncInProgressError,
+    XeroAPIError,
+)
+from features.xero.breaker import XeroCall, get_breaker, latency_budget, remaining_budget
+from features.xero.client import AsyncXeroClient, XeroClient, get_client, set_async_client_factory
+from features.xero.testing import FakeXeroServer
+from features.xero.tokens import clear_token_cache, get_access_token, xero_get
+from features.xero.sync import upsert_account_stream, upsert_accounts, parse_xero_datetime
+from features.xero.jsonstream import iter_array_items
+from features.xero.entity_sync import sync_entity
+from features.xero import entity_sync
+from features.xero.webhooks import process_webhook_events
+from asgiref.sync import async_to_sync, sync_to_async
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.utils import ConnectionDoesNotExist
+from django.db.models import F, QuerySet
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, override_settings
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+import asyncio
+import base64
+import csv
+import gzip
+import hashlib
+import hmac
+import httpx
+import io
+import json
+import math
+import os
+import requests
+import signal
+import tempfile
+import threading
+import time
 import uuid
 
 class XeroLoginAPIViewTests(APITestCase):
@@ -27,25 +82,59 @@ class XeroCallbackAPIViewTests(APITestCase):
         """
         self.url = "/api/v1/xero/callback/"
 
-    @patch("features.xero.views.requests.post")
-    def test_get_tokens(self, mock_get):
+    @patch("features.xero.client.XeroClient.get")
+    @patch("features.xero.client.XeroClient.post")
+    def test_get_tokens(self, mock_post, mock_get):
         """
-        Test that the API returns the Xero access token and refresh token.
+        Test that the API exchanges the code and stores one token per connected tenant.
         """
         mock_response = {
             "access_token": "mock_access_token",
             "refresh_token": "mock_refresh_token",
             "expires_in": 3600
         }
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = mock_response
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = mock_response
+        mock_get.return_value.json.return_value = [
+            {"tenantId": "tenant-a", "tenantName": "Org A", "tenantType": "ORGANISATION"},
+            {"tenantId": "tenant-b", "tenantName": "Org B", "tenantType": "ORGANISATION"},
+        ]
 
         response = self.client.get(self.url, {"code": "mock_authorization_code"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["message"], "Xero authentication successful")
+        self.assertEqual([t["tenant_id"] for t in response.data["tenants"]], ["tenant-a", "tenant-b"])
+        self.assertEqual(
+            mock_get.call_args.kwargs["headers"]["Authorization"], "Bearer mock_access_token"
+        )
+        tokens = XeroToken.objects.order_by("tenant_id")
+        self.assertEqual([t.tenant_name for t in tokens], ["Org A", "Org B"])
+        self.assertTrue(all(t.refresh_token == "mock_refresh_token" for t in tokens))
+
+    @patch("features.xero.client.XeroClient.get")
+    @patch("features.xero.client.XeroClient.post")
+    def test_reconnect_replaces_untenanted_token(self, mock_post, mock_get):
+        """
+        Test that a token stored before tenants were tracked is replaced on reconnect.
+        """
+        XeroToken.objects.create(access_token="old", refresh_token="old", expires_in=3600)
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {
+            "access_token": "mock_access_token",
+            "refresh_token": "mock_refresh_token",
+            "expires_in": 3600
+        }
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = [{"tenantId": "tenant-a", "tenantName": "Org A"}]
+
+        response = self.client.get(self.url, {"code": "mock_authorization_code"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(XeroToken.objects.values_list("tenant_id", flat=True)), ["tenant-a"])
 
-    @patch("features.xero.views.requests.post")
+    @patch("features.xero.client.XeroClient.post")
     def test_missing_authorization_code(self, mock_post):
         """
         Test that the API returns an error response when the authorization code is missing.
@@ -69,7 +158,7 @@ class RefreshAccessTokenAPIViewTests(APITestCase):
         )
         self.url = "/api/v1/xero/token/refresh/"
 
-    @patch("requests.post")
+    @patch("features.xero.client.XeroClient.post")
     def test_get(self, mock_post):
         """
         Test that the API returns a 200 status code when accessing the endpoint.
@@ -85,7 +174,8 @@ class RefreshAccessTokenAPIViewTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
     
-    def test_token_refresh_failed(self):
+    @patch("features.xero.client.XeroClient.post")
+    def test_token_refresh_failed(self, mock_post):
         """
         Test that the API returns a 400 status code and an appropriate error message
         when the token is expired and needs to be refreshed.
@@ -93,6 +183,8 @@ class RefreshAccessTokenAPIViewTests(APITestCase):
 
         self.token.expires_in = 0
         self.token.save()
+        mock_post.return_value.status_code = 400
+        mock_post.return_value.json.return_value = {"error": "invalid_grant"}
 
         response = self.client.get(self.url)
 
@@ -112,6 +204,7 @@ class RefreshAccessTokenAPIViewTests(APITestCase):
         self.assertEqual(response.data["error"], "No token found")
 
 
+@override_settings(XERO_SYNC_IN_BACKGROUND=False)
 class UpdateChartOfAccountsAPIViewTests(APITestCase):
     def setUp(self):
         """
@@ -125,7 +218,7 @@ class UpdateChartOfAccountsAPIViewTests(APITestCase):
         )
         self.url = "/api/v1/xero/accounts/update/"
 
-    @patch("requests.get")
+    @patch("features.xero.client.XeroClient.get")
     def test_successful_account_update(self, mock_get):
         """
         Test that the API successfully updates the Chart of Accounts and returns the correct data.
@@ -173,7 +266,7 @@ class UpdateChartOfAccountsAPIViewTests(APITestCase):
         self.assertEqual(account.name, "Cash Account")
         self.assertEqual(account.code, "A001")
 
-    @patch("requests.get")
+    @patch("features.xero.client.XeroClient.get")
     def test_no_token_found(self, mock_get):
         """
         Test that the API returns a 400 status code and an appropriate error message
@@ -186,21 +279,51 @@ class UpdateChartOfAccountsAPIViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data["error"], "No token found")
 
-    @patch("requests.get")
-    def test_token_expired(self, mock_get):
+    @patch("features.xero.client.XeroClient.post")
+    @patch("features.xero.client.XeroClient.get")
+    def test_token_expired(self, mock_get, mock_post):
         """
         Test that the API returns a 401 status code and an appropriate error message
-        when the Xero token is expired.
+        when the Xero token is expired and cannot be refreshed.
         """
         mock_get.return_value.status_code = 401
         mock_get.return_value.json.return_value = {"error": "Unauthorized - Token expired"}
+        mock_post.return_value.status_code = 400
+        mock_post.return_value.json.return_value = {"error": "invalid_grant"}
 
         response = self.client.get(self.url)
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertEqual(response.data["error"], "Unauthorized - Token expired")
+        mock_post.assert_called_once()
+
+    @patch("features.xero.client.XeroClient.post")
+    @patch("features.xero.client.XeroClient.get")
+    def test_unauthorized_refreshes_and_retries(self, mock_get, mock_post):
+        """
+        Test that a 401 from Xero triggers one token refresh and a retry with the new token.
+        """
+        unauthorized = MagicMock(status_code=401)
+        success = MagicMock(status_code=200)
+        success.json.return_value = {"Accounts": []}
+        mock_get.side_effect = [unauthorized, success]
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {
+            "access_token": "new_access_token",
+            "refresh_token": "new_refresh_token",
+            "expires_in": 1800,
+        }
+
+        response = self.client.get(self.url)
 
-    @patch("requests.get")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_post.assert_called_once()
+        self.assertEqual(mock_get.call_args.kwargs["headers"]["Authorization"], "Bearer new_access_token")
+        self.token.refresh_from_db()
+        self.assertEqual(self.token.refresh_token, "new_refresh_token")
+        self.assertEqual(self.token.version, 1)
+
+    @patch("features.xero.client.XeroClient.get")
     def test_empty_account_list(self, mock_get):
         """
         Test that the API returns a 200 status code and an empty list when
@@ -216,7 +339,7 @@ class UpdateChartOfAccountsAPIViewTests(APITestCase):
         self.assertEqual(response.data["message"], "Chart of Accounts retrieved successfully")
         self.assertEqual(len(response.data["data"]), 0)
 
-    @patch("requests.get")
+    @patch("features.xero.client.XeroClient.get")
     def test_create_new_account_on_update(self, mock_get):
         """
         Test that the API creates a new Chart of Account object when the API is called
@@ -263,65 +386,3074 @@ class UpdateChartOfAccountsAPIViewTests(APITestCase):
         self.assertEqual(account.name, "New Account")
         self.assertEqual(account.code, "A002")
 
-class ChartOfAccountsAllAPIViewTests(APITestCase):
+@override_settings(XERO_SYNC_IN_BACKGROUND=False)
+class IncrementalChartOfAccountsSyncTests(APITestCase):
     def setUp(self):
         """
-        Create a Chart of Account for test data. This is needed because the API
-        requires a Chart of Account to exist in order to retrieve it.
+        Set up the test with a token whose accounts were fully synced an hour ago.
         """
-        ChartOfAccount.objects.create(
-            account_id="ca8ebab9-93ee-4ac1-b81a-cd52ac995f64",
-            code="A001",
-            name="Cash Account",
-            type="Asset",
-            status="Active",
-            currency_code="USD"
+        self.token = XeroToken.objects.create(
+            access_token="valid_access_token",
+            refresh_token="valid_refresh_token",
+            expires_in=3600,
         )
+        self.account_id = uuid.uuid4()
+        upsert_accounts([make_account(self.account_id, "100", "Rent")])
+        self.state = XeroSyncState.objects.create(
+            token=self.token,
+            watermark=parse_xero_datetime("2025-01-01T00:00:00Z"),
+            last_full_sync_at=timezone.now() - timedelta(hours=1),
+        )
+        self.url = "/api/v1/xero/accounts/update/"
 
-    def test_get(self):
+    @patch("features.xero.client.XeroClient.get")
+    def test_sends_watermark(self, mock_get):
         """
-        Test that the API returns a 200 status code when accessing the endpoint.
+        Test that an incremental sync sends the watermark as If-Modified-Since
+        and advances it to the newest UpdatedDateUTC in the payload.
         """
-        response = self.client.get("/api/v1/xero/accounts/all/")
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            "Accounts": [make_account(self.account_id, "100", "Office Rent", UpdatedDateUTC="2025-02-01T00:00:00Z")]
+        }
+
+        response = self.client.get(self.url)
+
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_get.call_args.kwargs["headers"]["If-Modified-Since"], "2025-01-01T00:00:00")
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.watermark, parse_xero_datetime("2025-02-01T00:00:00Z"))
 
-    def test_empty(self):
+    @override_settings(XERO_RATE_LIMIT_ENABLED=False)
+    @patch("features.xero.client.XeroClient.get")
+    def test_not_modified_short_circuits(self, mock_get):
         """
-        Test that the API returns an empty list when there are no Chart of Accounts.
+        Test that a 304 from Xero returns immediately without touching the accounts.
         """
-        ChartOfAccount.objects.all().delete()
-        response = self.client.get("/api/v1/xero/accounts/all/")
-        self.assertEqual(len(response.data["results"]), 0)
-    
-    def test_non_empty(self):
+        mock_get.return_value.status_code = 304
+
+        # Four of these read and lease the sync flight record.
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "Chart of Accounts is up to date")
+        mock_get.return_value.json.assert_not_called()
+
+    @patch("features.xero.client.XeroClient.get")
+    def test_full_reconcile_removes_deleted_accounts(self, mock_get):
         """
-        Test that the API returns the correct data when there are Chart of Accounts.
+        Test that a full reconcile omits If-Modified-Since and deletes accounts
+        that no longer exist in Xero.
         """
-        response = self.client.get("/api/v1/xero/accounts/all/")
+        self.state.last_full_sync_at = timezone.now() - timedelta(days=2)
+        self.state.save()
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"Accounts": [make_account(uuid.uuid4(), "200", "Power")]}
+
+        response = self.client.get(self.url)
+
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("If-Modified-Since", mock_get.call_args.kwargs["headers"])
+        self.assertFalse(ChartOfAccount.objects.filter(account_id=self.account_id).exists())
+        self.state.refresh_from_db()
+        self.assertGreater(self.state.last_full_sync_at, timezone.now() - timedelta(minutes=1))
 
-        accounts = ChartOfAccount.objects.all()
-        expected_data = ChartOfAccountSerializer(accounts, many=True).data
-        self.assertEqual(response.data["results"], expected_data)
+class AccessTokenCacheTests(APITestCase):
+    def setUp(self):
+        """
+        Set up the test by storing a token that is valid for another hour.
+        """
+        self.token = XeroToken.objects.create(
+            access_token="valid_access_token",
+            refresh_token="valid_refresh_token",
+            expires_in=3600,
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        self.refreshed = {
+            "access_token": "new_access_token",
+            "refresh_token": "new_refresh_token",
+            "expires_in": 1800,
+        }
 
-    def test_pagination(self):
+    def test_cached_token_skips_database(self):
         """
-        Test that the API supports pagination when there are more than 10 accounts.
+        Test that once loaded, the access token is served without a query.
         """
-        for i in range(4, 25):
-            ChartOfAccount.objects.create(
-                account_id=uuid.uuid4(),
-                code=f"A001{i}",
-                name=f"Cash Account {i}",
-                type="Asset",
-                status="Active",
-                currency_code="USD"
+        get_access_token()
+
+        with self.assertNumQueries(0):
+            token = get_access_token()
+
+        self.assertEqual(token.access_token, "valid_access_token")
+
+    @patch("features.xero.client.XeroClient.post")
+    def test_proactive_refresh_before_expiry(self, mock_post):
+        """
+        Test that a token about to expire is refreshed before it is used.
+        """
+        self.token.expires_at = timezone.now() + timedelta(seconds=30)
+        self.token.save()
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = self.refreshed
+
+        token = get_access_token()
+
+        self.assertEqual(token.access_token, "new_access_token")
+        self.token.refresh_from_db()
+        self.assertIsNone(self.token.refresh_lock_until)
+        self.assertGreater(self.token.expires_at, timezone.now() + timedelta(minutes=29))
+
+    @patch("features.xero.tokens.time.sleep")
+    @patch("features.xero.client.XeroClient.post")
+    def test_waits_for_refresh_by_another_worker(self, mock_post, mock_sleep):
+        """
+        Test that while another worker holds the refresh lease, the token it
+        publishes is reused instead of refreshing a second time.
+        """
+        XeroToken.objects.filter(pk=self.token.pk).update(
+            expires_at=timezone.now() + timedelta(seconds=30),
+            refresh_lock_until=timezone.now() + timedelta(seconds=30),
+        )
+
+        def other_worker_finishes(seconds):
+            XeroToken.objects.filter(pk=self.token.pk).update(
+                access_token="other_access_token",
+                expires_at=timezone.now() + timedelta(hours=1),
+                refresh_lock_until=None,
+                version=F("version") + 1,
             )
-        
-        response = self.client.get("/api/v1/xero/accounts/all/")
+        mock_sleep.side_effect = other_worker_finishes
+
+        token = get_access_token()
+
+        self.assertEqual(token.access_token, "other_access_token")
+        mock_post.assert_not_called()
+
+    @patch("features.xero.client.XeroClient.post")
+    def test_stale_token_already_replaced(self, mock_post):
+        """
+        Test that a forced refresh is skipped when the rejected token was
+        already replaced by another worker.
+        """
+        stale = get_access_token()
+        XeroToken.objects.filter(pk=self.token.pk).update(access_token="other_access_token", version=F("version") + 1)
+        clear_token_cache()
+
+        token = get_access_token(force_refresh=True, stale=stale)
+
+        self.assertEqual(token.access_token, "other_access_token")
+        mock_post.assert_not_called()
+
+@override_settings(XERO_SYNC_IN_BACKGROUND=False)
+class MultiTenantSyncTests(APITestCase):
+    def setUp(self):
+        """
+        Set up the test with two tenants connected through one authorization.
+        """
+        clear_page_cache()
+        for tenant_id in ("tenant-a", "tenant-b"):
+            XeroToken.objects.create(
+                tenant_id=tenant_id,
+                tenant_name=f"Org {tenant_id[-1].upper()}",
+                access_token="valid_access_token",
+                refresh_token="shared_refresh_token",
+                expires_in=3600,
+                expires_at=timezone.now() + timedelta(hours=1),
+            )
+        self.url = "/api/v1/xero/accounts/update/"
+
+    @patch("features.xero.client.XeroClient.get")
+    def test_accounts_are_synced_per_tenant(self, mock_get):
+        """
+        Test that each tenant is synced with its Xero-tenant-id header and that
+        the same account code may exist in both tenants.
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.side_effect = [
+            {"Accounts": [make_account(uuid.uuid4(), "100", "Rent")]},
+            {"Accounts": [make_account(uuid.uuid4(), "100", "Rent")]},
+        ]
+
+        for tenant_id in ("tenant-a", "tenant-b"):
+            response = self.client.get(self.url, {"tenant_id": tenant_id})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        tenant_headers = [call.kwargs["headers"]["Xero-tenant-id"] for call in mock_get.call_args_list]
+        self.assertEqual(tenant_headers, ["tenant-a", "tenant-b"])
+        self.assertEqual(ChartOfAccount.objects.filter(code="100").count(), 2)
+
+        response = self.client.get("/api/v1/xero/accounts/all/", {"tenant_id": "tenant-b"})
+        self.assertEqual([a["tenant_id"] for a in response.data["results"]], ["tenant-b"])
+
+    @patch("features.xero.client.XeroClient.post")
+    def test_refresh_updates_every_tenant_sharing_the_token(self, mock_post):
+        """
+        Test that refreshing one tenant rotates the refresh token of every
+        tenant from the same authorization.
+        """
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {
+            "access_token": "new_access_token",
+            "refresh_token": "new_refresh_token",
+            "expires_in": 1800,
+        }
+
+        response = self.client.get("/api/v1/xero/token/refresh/", {"tenant_id": "tenant-a"})
+
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(XeroToken.objects.values_list("refresh_token", flat=True)), {"new_refresh_token"})
+        self.assertEqual(get_access_token("tenant-b").access_token, "new_access_token")
 
-        self.assertIn("next", response.data)
-        self.assertIn("previous", response.data)
-        self.assertGreater(len(response.data["results"]), 0)
-        self.assertLessEqual(len(response.data["results"]), 10)
+    @patch("features.xero.sync.sync_chart_of_accounts")
+    def test_fan_out_runs_tenants_concurrently(self, mock_sync):
+        """
+        Test that the fan-out sync overlaps tenants on the pool and isolates a
+        failing tenant from the others.
+        """
+        for i in range(4):
+            XeroToken.objects.create(tenant_id=f"tenant-{i}", access_token="a", refresh_token="r", expires_in=3600)
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow_sync(full, tenant_id, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.2)
+            with lock:
+                active[0] -= 1
+            if tenant_id == "tenant-b":
+                raise XeroAPIError(500)
+            return MagicMock(summary=lambda: {"created": 1})
+        mock_sync.side_effect = slow_sync
+
+        with override_settings(XERO_FANOUT_WORKERS=3), self.assertLogs("features.xero.sync", "ERROR"):
+            response = self.client.get(self.url, {"tenant_id": "all"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["tenants"]
+        self.assertEqual(len(results), 6)
+        self.assertIn("error", results["tenant-b"])
+        self.assertEqual(results["tenant-a"], {"created": 1})
+        self.assertEqual(peak[0], 3)
+
+    def test_sync_adopts_accounts_stored_before_tenants(self):
+        """
+        Test that accounts synced before tenants were recorded are moved to
+        the tenant that syncs them instead of colliding on the primary key.
+        """
+        legacy_id, other_id = uuid.uuid4(), uuid.uuid4()
+        ChartOfAccount.objects.create(account_id=legacy_id, code="200", name="Sales", type="REVENUE")
+        ChartOfAccount.objects.create(account_id=other_id, code="300", name="Other", type="REVENUE")
+
+        result = upsert_accounts([make_account(legacy_id, "200", "Sales")], tenant_id="tenant-a")
+        upsert_account_stream([make_account(other_id, "300", "Other")], tenant_id="tenant-b")
+
+        self.assertEqual(result.summary()["updated"], 1)
+        self.assertEqual(
+            dict(ChartOfAccount.objects.values_list("account_id", "tenant_id")),
+            {legacy_id: "tenant-a", other_id: "tenant-b"},
+        )
+
+@override_settings(XERO_SYNC_IN_BACKGROUND=True, XERO_JOB_RETRY_DELAY=0)
+class SyncJobTests(APITestCase):
+    def setUp(self):
+        """
+        Set up the test with a stored token and the update endpoint URL.
+        """
+        self.token = XeroToken.objects.create(
+            access_token="valid_access_token",
+            refresh_token="valid_refresh_token",
+            expires_in=3600,
+        )
+        self.url = "/api/v1/xero/accounts/update/"
+
+    def test_update_enqueues_job(self):
+        """
+        Test that the update endpoint queues a job and returns 202 with its id.
+        """
+        response = self.client.get(self.url, {"full": "true"})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = SyncJob.objects.get(pk=response.data["job_id"])
+        self.assertEqual(job.status, SyncJob.Status.QUEUED)
+        self.assertEqual(job.params, {"full": True})
+        self.assertEqual(response.data["status_url"], f"/api/v1/xero/jobs/{job.pk}/")
+
+    def test_identical_queued_jobs_are_reused(self):
+        """
+        Test that repeated requests while a job is waiting share that job.
+        """
+        first = self.client.get(self.url)
+        second = self.client.get(self.url, {"priority": "5"})
+
+        self.assertEqual(first.data["job_id"], second.data["job_id"])
+        self.assertEqual(SyncJob.objects.get().priority, 5)
+
+    @patch("features.xero.client.XeroClient.get")
+    def test_worker_runs_job(self, mock_get):
+        """
+        Test that the worker command runs queued jobs and records the result and timings.
+        """
+        payload = {"Accounts": [make_account(uuid.uuid4(), "100", "Rent")]}
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_content.return_value = [json.dumps(payload).encode()]
+        job_id = self.client.get(self.url).data["job_id"]
+
+        call_command("xero_worker", "--burst")
+
+        response = self.client.get(f"/api/v1/xero/jobs/{job_id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], SyncJob.Status.SUCCEEDED)
+        self.assertEqual(response.data["attempts"], 1)
+        self.assertEqual(response.data["result"]["created"], 1)
+        self.assertIsNotNone(response.data["run_seconds"])
+        self.assertTrue(ChartOfAccount.objects.filter(code="100").exists())
+
+    @patch("features.xero.client.XeroClient.get")
+    def test_failed_job_is_retried(self, mock_get):
+        """
+        Test that a transient failure requeues the job until attempts run out.
+        """
+        mock_get.return_value.status_code = 503
+        job = enqueue("accounts")
+
+        with self.assertLogs("features.xero.jobs", level="ERROR"):
+            run_next_job("test-worker")
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.Status.QUEUED)
+        self.assertIn("503", job.error)
+
+        with self.assertLogs("features.xero.jobs", level="ERROR"):
+            call_command("xero_worker", "--burst")
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.Status.FAILED)
+        self.assertEqual(job.attempts, job.max_attempts)
+
+    def test_permanent_failure_is_not_retried(self):
+        """
+        Test that a job fails immediately when there is no token to sync with.
+        """
+        XeroToken.objects.all().delete()
+        job = enqueue("accounts")
+
+        with self.assertLogs("features.xero.jobs", level="ERROR"):
+            run_next_job("test-worker")
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.Status.FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_claims_by_priority_and_reclaims_expired_leases(self):
+        """
+        Test that higher priority jobs are claimed first and that jobs left
+        running by a dead worker are picked up again.
+        """
+        low = enqueue("accounts")
+        high = enqueue("accounts", {"full": True}, priority=10)
+
+        self.assertEqual(claim_job("worker-1").pk, high.pk)
+        self.assertEqual(claim_job("worker-2").pk, low.pk)
+        self.assertIsNone(claim_job("worker-3"))
+
+        SyncJob.objects.filter(pk=high.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = claim_job("worker-3")
+        self.assertEqual(reclaimed.pk, high.pk)
+        self.assertEqual(reclaimed.locked_by, "worker-3")
+        self.assertEqual(reclaimed.attempts, 2)
+
+    def test_lease_is_renewed_by_its_worker_only(self):
+        """
+        Test that renewing a lease extends it while the worker holds the job,
+        and fails once another worker has reclaimed it.
+        """
+        enqueue("accounts")
+        job = claim_job("worker-1")
+        SyncJob.objects.filter(pk=job.pk).update(locked_until=timezone.now())
+
+        self.assertTrue(jobs.renew_lease(job))
+        job.refresh_from_db()
+        self.assertGreater(job.locked_until, timezone.now() + timedelta(seconds=settings.XERO_JOB_LEASE - 5))
+
+        SyncJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        claim_job("worker-2")
+        self.assertFalse(jobs.renew_lease(job))
+
+    @override_settings(XERO_JOB_HEARTBEAT=0.05)
+    def test_long_job_keeps_renewing_its_lease(self):
+        """
+        Test that a job running past several heartbeats has its lease renewed
+        in the background, and that renewals stop when it finishes.
+        """
+        enqueue("accounts")
+        job = claim_job("worker-1")
+
+        def slow_sync(params):
+            time.sleep(0.3)
+            return {}
+
+        with patch.dict(jobs.JOB_HANDLERS, {"accounts": slow_sync}), patch.object(jobs, "renew_lease") as mock_renew:
+            jobs.run_job(job)
+            renewals = mock_renew.call_count
+            time.sleep(0.1)
+
+        self.assertEqual(job.status, SyncJob.Status.SUCCEEDED)
+        self.assertGreaterEqual(renewals, 3)
+        self.assertEqual(mock_renew.call_count, renewals)
+
+    @patch("features.xero.management.commands.xero_worker.multiprocessing.Process")
+    def test_sigterm_is_forwarded_to_worker_processes(self, mock_process):
+        """
+        Test that a SIGTERM sent to the parent of several worker processes
+        is passed on to each child still running.
+        """
+        children = [MagicMock(), MagicMock()]
+        mock_process.side_effect = children
+        children[0].join.side_effect = lambda: signal.raise_signal(signal.SIGTERM)
+        previous_handler = signal.getsignal(signal.SIGTERM)
+
+        call_command("xero_worker", "--workers", "2")
+
+        for child in children:
+            child.start.assert_called_once()
+            child.terminate.assert_called_once()
+        self.assertIs(signal.getsignal(signal.SIGTERM), previous_handler)
+
+    @patch("features.xero.client.XeroClient.get")
+    def test_job_shares_a_just_finished_sync(self, mock_get):
+        """
+        Test that a job queued right after an inline sync of the same tenant
+        returns that sync's summary instead of calling Xero again.
+        """
+        payload = {"Accounts": [make_account(uuid.uuid4(), "100", "Rent")]}
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_content.side_effect = lambda *args, **kwargs: iter([json.dumps(payload).encode()])
+        self.client.get(self.url, {"wait": "true", "stream": "true"})
+        job = enqueue("accounts")
+
+        run_next_job("test-worker")
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.Status.SUCCEEDED)
+        self.assertEqual(job.result["created"], 1)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @override_settings(XERO_SYNC_FLIGHT_WAIT=0)
+    @patch("features.xero.client.XeroClient.get")
+    def test_job_is_deferred_while_the_sync_runs_elsewhere(self, mock_get):
+        """
+        Test that a job whose sync is already running elsewhere is requeued
+        for when it should be done, without using an attempt.
+        """
+        SyncFlight.objects.create(
+            key="Accounts:", locked_by="other-worker", locked_until=timezone.now() + timedelta(seconds=60)
+        )
+        job = enqueue("accounts")
+
+        run_next_job("test-worker")
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.Status.QUEUED)
+        self.assertEqual(job.attempts, 0)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=30))
+        mock_get.assert_not_called()
+
+class AsyncViewsTests(APITestCase):
+    def setUp(self):
+        """
+        Route the async Xero client through a mock transport that serves
+        queued responses.
+        """
+        self.responses = {}
+        self.seen = []
+
+        def handler(request):
+            self.seen.append(request)
+            queue = self.responses[(request.method, request.url.path)]
+            return queue.pop(0) if len(queue) > 1 else queue[0]
+
+        set_async_client_factory(lambda: AsyncXeroClient(
+            api_base_url="https://xero.test",
+            identity_base_url="https://xero.test",
+            transport=httpx.MockTransport(handler),
+        ))
+        self.addCleanup(set_async_client_factory, None)
+
+    def queue(self, method, path, status_code=200, json=None):
+        self.responses.setdefault((method, path), []).append(httpx.Response(status_code, json=json))
+
+    async def test_callback_stores_token(self):
+        """
+        Test that the async callback exchanges the code and stores the tokens.
+        """
+        self.queue("POST", "/connect/token", json={
+            "access_token": "mock_access_token",
+            "refresh_token": "mock_refresh_token",
+            "expires_in": 1800,
+        })
+        self.queue("GET", "/connections", json=[{"tenantId": "tenant-a", "tenantName": "Org A"}])
+
+        response = await self.async_client.get("/api/v1/xero/async/callback/", {"code": "mock_authorization_code"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token = await XeroToken.objects.aget(tenant_id="tenant-a")
+        self.assertEqual(token.access_token, "mock_access_token")
+        self.assertIsNotNone(token.expires_at)
+
+    async def test_refresh_without_token(self):
+        """
+        Test that the async refresh endpoint reports a missing token.
+        """
+        response = await self.async_client.get("/api/v1/xero/async/token/refresh/")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["error"], "No token found")
+
+    async def test_accounts_update_refreshes_on_unauthorized(self):
+        """
+        Test that the async update retries once with a refreshed token after a
+        401 and writes the returned accounts.
+        """
+        await XeroToken.objects.acreate(
+            access_token="valid_access_token",
+            refresh_token="valid_refresh_token",
+            expires_in=3600,
+        )
+        self.queue("GET", "/api.xro/2.0/Accounts", status_code=401)
+        self.queue("GET", "/api.xro/2.0/Accounts", json={"Accounts": [make_account(uuid.uuid4(), "100", "Rent")]})
+        self.queue("POST", "/connect/token", json={
+            "access_token": "new_access_token",
+            "refresh_token": "new_refresh_token",
+            "expires_in": 1800,
+        })
+
+        response = await self.async_client.get("/api/v1/xero/async/accounts/update/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["data"][0]["code"], "100")
+        self.assertEqual(self.seen[-1].headers["Authorization"], "Bearer new_access_token")
+        self.assertTrue(await ChartOfAccount.objects.filter(code="100").aexists())
+
+    async def test_accounts_update_options(self):
+        """
+        Test that the async update takes the sync view's ``?stream=`` and
+        ``?fields=`` options.
+        """
+        await XeroToken.objects.acreate(access_token="valid_access_token", refresh_token="r", expires_in=3600)
+        self.queue("GET", "/api.xro/2.0/Accounts", json={"Accounts": [make_account(uuid.uuid4(), "100", "Rent")]})
+
+        with override_settings(XERO_SYNC_FRESH_SECONDS=0):
+            streamed = await self.async_client.get("/api/v1/xero/async/accounts/update/", {"stream": "true"})
+            fields = await self.async_client.get(
+                "/api/v1/xero/async/accounts/update/", {"full": "true", "fields": "code,name"}
+            )
+
+        self.assertEqual(streamed.json()["summary"]["created"], 1)
+        self.assertNotIn("data", streamed.json())
+        self.assertEqual(fields.json()["data"], [{"code": "100", "name": "Rent"}])
+        response = await self.async_client.get("/api/v1/xero/async/accounts/update/", {"fields": ","})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_concurrent_updates_share_one_call(self):
+        """
+        Test that concurrent async updates of one tenant share a single Xero
+        call, as sync view requests do.
+        """
+        await XeroToken.objects.acreate(access_token="valid_access_token", refresh_token="r", expires_in=3600)
+        self.queue("GET", "/api.xro/2.0/Accounts", json={"Accounts": [make_account(uuid.uuid4(), "100", "Rent")]})
+
+        responses = await asyncio.gather(
+            *(self.async_client.get("/api/v1/xero/async/accounts/update/") for _ in range(5))
+        )
+
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_200_OK] * 5)
+        self.assertEqual({response.json()["data"][0]["code"] for response in responses}, {"100"})
+        self.assertEqual(len(self.seen), 1)
+
+    async def test_updates_overlap_their_xero_calls(self):
+        """
+        Test that async updates of different tenants wait on Xero together,
+        so that N of them take about one Xero latency rather than N.
+        """
+        latency, tenants = 0.3, [f"tenant-{i}" for i in range(5)]
+        for tenant in tenants:
+            await XeroToken.objects.acreate(
+                tenant_id=tenant, access_token="valid_access_token", refresh_token="r", expires_in=3600
+            )
+        in_flight, peak = 0, 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(latency)
+            in_flight -= 1
+            return httpx.Response(200, json={"Accounts": []})
+
+        set_async_client_factory(lambda: AsyncXeroClient(
+            api_base_url="https://xero.test", transport=httpx.MockTransport(handler)
+        ))
+
+        started = time.monotonic()
+        responses = await asyncio.gather(*(
+            self.async_client.get("/api/v1/xero/async/accounts/update/", {"tenant_id": tenant, "full": "true"})
+            for tenant in tenants
+        ))
+
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_200_OK] * len(tenants))
+        self.assertEqual(peak, len(tenants))
+        self.assertLess(time.monotonic() - started, 2 * latency)
+
+class ChartOfAccountsAllAPIViewTests(APITestCase):
+    def setUp(self):
+        """
+        Create a Chart of Account for test data. This is needed because the API
+        requires a Chart of Account to exist in order to retrieve it.
+        """
+        clear_page_cache()
+        ChartOfAccount.objects.create(
+            account_id="ca8ebab9-93ee-4ac1-b81a-cd52ac995f64",
+            code="A001",
+            name="Cash Account",
+            type="Asset",
+            status="Active",
+            currency_code="USD"
+        )
+
+    def test_get(self):
+        """
+        Test that the API returns a 200 status code when accessing the endpoint.
+        """
+        response = self.client.get("/api/v1/xero/accounts/all/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_empty(self):
+        """
+        Test that the API returns an empty list when there are no Chart of Accounts.
+        """
+        ChartOfAccount.objects.all().delete()
+        response = self.client.get("/api/v1/xero/accounts/all/")
+        self.assertEqual(len(response.data["results"]), 0)
+    
+    def test_non_empty(self):
+        """
+        Test that the API returns the correct data when there are Chart of Accounts.
+        """
+        response = self.client.get("/api/v1/xero/accounts/all/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        accounts = ChartOfAccount.objects.all()
+        expected_data = ChartOfAccountSerializer(accounts, many=True).data
+        self.assertEqual(response.data["results"], expected_data)
+
+    def test_pagination(self):
+        """
+        Test that the API supports pagination when there are more than 10 accounts.
+        """
+        for i in range(4, 25):
+            ChartOfAccount.objects.create(
+                account_id=uuid.uuid4(),
+                code=f"A001{i}",
+                name=f"Cash Account {i}",
+                type="Asset",
+                status="Active",
+                currency_code="USD"
+            )
+        
+        response = self.client.get("/api/v1/xero/accounts/all/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertIn("next", response.data)
+        self.assertIn("previous", response.data)
+        self.assertGreater(len(response.data["results"]), 0)
+        self.assertLessEqual(len(response.data["results"]), 10)
+
+    def test_page_number_pagination(self):
+        """
+        Test that ?page=N still returns numbered pages with a total count.
+        """
+        response = self.client.get("/api/v1/xero/accounts/all/", {"page": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+
+class AccountKeysetPaginationTests(APITestCase):
+    def setUp(self):
+        """
+        Create 25 accounts across two tenants, with duplicate names so that
+        the account id has to break ties.
+        """
+        clear_page_cache()
+        for i in range(25):
+            ChartOfAccount.objects.create(
+                account_id=uuid.uuid4(),
+                tenant_id=f"tenant-{i % 2}",
+                code=f"{i:03}",
+                name=f"Account {i // 2:02}",
+                type="EXPENSE",
+            )
+        self.url = "/api/v1/xero/accounts/all/"
+        self.expected = list(ChartOfAccount.objects.order_by("name", "account_id").values_list("account_id", flat=True))
+
+    def crawl(self, url, params=None):
+        pages = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            url, params = response.data["next"], None
+        return pages
+
+    def test_crawl_returns_every_account_once_in_order(self):
+        """
+        Test that following the next links visits every account exactly once,
+        in (name, account_id) order.
+        """
+        pages = self.crawl(self.url, {"page_size": 4})
+
+        self.assertEqual(len(pages), 7)
+        seen = [uuid.UUID(a["account_id"]) for page in pages for a in page["results"]]
+        self.assertEqual(seen, self.expected)
+        self.assertNotIn("count", pages[0])
+
+    def test_previous_link_returns_the_previous_page(self):
+        """
+        Test that the previous link of the second page returns the first page.
+        """
+        first = self.client.get(self.url, {"page_size": 5}).data
+        second = self.client.get(first["next"]).data
+
+        previous = self.client.get(second["previous"]).data
+
+        self.assertEqual(previous["results"], first["results"])
+        self.assertIsNotNone(previous["next"])
+
+    def test_deep_pages_run_one_query(self):
+        """
+        Test that a deep page is read with a single query and no COUNT(*).
+        """
+        pages = self.crawl(self.url, {"page_size": 3})
+        page_cache().clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(pages[-2]["next"])
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("COUNT(", queries[0]["sql"].upper())
+        self.assertNotIn("OFFSET", queries[0]["sql"].upper())
+
+    @override_settings(XERO_ACCOUNTS_MAX_PAGE_SIZE=8)
+    def test_page_size_is_capped(self):
+        """
+        Test that the requested page size is capped at XERO_ACCOUNTS_MAX_PAGE_SIZE.
+        """
+        response = self.client.get(self.url, {"page_size": 1000})
+
+        self.assertEqual(len(response.data["results"]), 8)
+
+    def test_invalid_cursor(self):
+        """
+        Test that a malformed cursor returns 404.
+        """
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tenant_filter(self):
+        """
+        Test that keyset pages combine with the tenant filter.
+        """
+        pages = self.crawl(self.url, {"tenant_id": "tenant-1", "page_size": 5})
+
+        tenants = {a["tenant_id"] for page in pages for a in page["results"]}
+        self.assertEqual(tenants, {"tenant-1"})
+        self.assertEqual(sum(len(page["results"]) for page in pages), 12)
+
+class AccountListCachingTests(APITestCase):
+    def setUp(self):
+        """
+        Sync two accounts so that the accounts generation has been bumped.
+        """
+        clear_page_cache()
+        with self.captureOnCommitCallbacks(execute=True):
+            upsert_accounts([make_account(uuid.uuid4(), "100", "Rent"), make_account(uuid.uuid4(), "200", "Sales")])
+        self.url = "/api/v1/xero/accounts/all/"
+
+    def test_response_carries_validators(self):
+        """
+        Test that the list carries an ETag and Last-Modified from the sync generation.
+        """
+        response = self.client.get(self.url)
+
+        generation = SyncGeneration.objects.get(name="accounts")
+        self.assertEqual(response["ETag"], f'"accounts-{generation.value}"')
+        self.assertIn("Last-Modified", response)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_unchanged_client_gets_304(self):
+        """
+        Test that a client sending the current ETag gets a 304 without any query.
+        """
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_repeat_requests_are_served_from_cache(self):
+        """
+        Test that a page rendered once is served again without querying the
+        accounts table, and that each query string is cached separately.
+        """
+        first = self.client.get(self.url, {"page_size": 1})
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {"page_size": 1})
+        other = self.client.get(self.url, {"page_size": 2})
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(len(other.data["results"]), 2)
+
+    def test_sync_with_changes_invalidates(self):
+        """
+        Test that a sync which changes accounts moves the ETag on and serves
+        fresh data, while a sync without changes keeps the cached page.
+        """
+        first = self.client.get(self.url)
+        account_id = first.data["results"][0]["account_id"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            upsert_accounts([make_account(account_id, "100", "Rent")])
+        self.assertEqual(self.client.get(self.url)["ETag"], first["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            upsert_accounts([make_account(account_id, "100", "Office Rent")])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertIn("Office Rent", [a["name"] for a in response.data["results"]])
+
+class AccountFilterTests(APITestCase):
+    def setUp(self):
+        """
+        Create a small chart with a mix of types, statuses and currencies.
+        """
+        clear_page_cache()
+        rows = [
+            ("100", "Rent", "EXPENSE", "ACTIVE", "EXPENSE", "NZD", False),
+            ("101", "Travel", "EXPENSE", "ARCHIVED", "EXPENSE", "NZD", False),
+            ("200", "Sales", "REVENUE", "ACTIVE", "REVENUE", "NZD", False),
+            ("090", "Business Bank", "BANK", "ACTIVE", "ASSET", "NZD", True),
+            ("091", "USD Bank", "BANK", "ACTIVE", "ASSET", "USD", True),
+        ]
+        for code, name, type_, status_, class_type, currency, payments in rows:
+            ChartOfAccount.objects.create(
+                account_id=uuid.uuid4(),
+                code=code,
+                name=name,
+                type=type_,
+                status=status_,
+                class_type=class_type,
+                currency_code=currency,
+                enable_payments_to_account=payments,
+            )
+        self.url = "/api/v1/xero/accounts/all/"
+
+    def names(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [a["name"] for a in response.data["results"]]
+
+    def test_filters(self):
+        """
+        Test that attribute, multi-value and boolean filters select the right accounts.
+        """
+        self.assertEqual(self.names(type="EXPENSE", status="ACTIVE"), ["Rent"])
+        self.assertEqual(self.names(type="BANK", currency_code="USD"), ["USD Bank"])
+        self.assertEqual(self.names(class_type="ASSET,REVENUE"), ["Business Bank", "Sales", "USD Bank"])
+        self.assertEqual(self.names(enable_payments_to_account="true", currency_code="NZD"), ["Business Bank"])
+
+    def test_invalid_boolean(self):
+        """
+        Test that a boolean filter that is not true or false is rejected.
+        """
+        response = self.client.get(self.url, {"has_attachments": "maybe"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite syntax")
+    def test_filtered_queries_use_an_index(self):
+        """
+        Test that the query behind each common filter is answered from an
+        index, including the page ordering, rather than by a table scan,
+        both on a tenant's accounts and across every tenant. The unfiltered
+        list walks the keyset index in order instead of sorting.
+        """
+        cases = [
+            ({"type": "EXPENSE"}, "type_idx"),
+            ({"type": "EXPENSE", "status": "ACTIVE"}, "(type|status)_idx"),
+            ({"type": "BANK", "currency_code": "NZD"}, "currency_idx"),
+            ({"class_type": "ASSET"}, "class_idx"),
+            ({"tax_type": "INPUT"}, "tax_type_idx"),
+            ({"reporting_code": "EXP"}, "reporting_idx"),
+            ({"status": "ARCHIVED"}, "status_idx"),
+        ]
+        cases = [
+            *(({"tenant_id": "tenant-a", **params}, f"account_tenant_{index}") for params, index in cases),
+            ({"tenant_id": "tenant-a"}, "account_tenant_keyset_idx"),
+            *((params, f"account_{index}") for params, index in cases),
+            ({}, "account_name_keyset_idx"),
+        ]
+        for params, index in cases:
+            with self.subTest(params=params):
+                page_cache().clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(self.url, params)
+                sql = [q["sql"] for q in queries if "xero_chartofaccount" in q["sql"]][-1]
+
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                    plan = " ".join(row[-1] for row in cursor.fetchall())
+
+                self.assertRegex(plan, rf"USING INDEX {index}\b")
+                self.assertNotRegex(plan, r"SCAN xero_chartofaccount(?! USING INDEX)")
+                self.assertNotIn("TEMP B-TREE", plan)
+
+class FastSerializationTests(APITestCase):
+    def setUp(self):
+        """
+        Create accounts that exercise every kind of field value: non-ASCII
+        and JavaScript line terminators, NULLs, booleans and datetimes with
+        and without microseconds.
+        """
+        ChartOfAccount.objects.create(
+            account_id=uuid.uuid4(),
+            code="100",
+            name="Caf\u00e9 \u2028 \"Rent\" \\ \t",
+            type="EXPENSE",
+            description="\u65e5\u672c \u2029 \U0001F600 \x01",
+            enable_payments_to_account=True,
+            updated_date_utc=timezone.now(),
+        )
+        ChartOfAccount.objects.create(
+            account_id=uuid.uuid4(),
+            code="200",
+            name="Sales",
+            type="REVENUE",
+            updated_date_utc=timezone.now().replace(microsecond=0),
+        )
+        ChartOfAccount.objects.create(account_id=uuid.uuid4(), code="300", name="Bank", type="BANK")
+
+    def test_values_path_matches_model_serializer(self):
+        """
+        Test that rows serialized from values() equal the ModelSerializer data,
+        in the same field order.
+        """
+        queryset = ChartOfAccount.objects.all()
+
+        expected = ChartOfAccountSerializer(queryset, many=True).data
+        rows = account_values_serializer.serialize_rows(account_values_serializer.values(queryset))
+        objects = account_values_serializer.serialize_objects(queryset)
+
+        self.assertEqual([list(row.items()) for row in rows], [list(row.items()) for row in expected])
+        self.assertEqual(objects, rows)
+
+    def test_fast_renderer_output_is_byte_identical(self):
+        """
+        Test that the fast path renders exactly the bytes of the
+        ModelSerializer and JSONRenderer path.
+        """
+        queryset = ChartOfAccount.objects.all()
+        expected = JSONRenderer().render({"results": ChartOfAccountSerializer(queryset, many=True).data})
+
+        rows = account_values_serializer.serialize_rows(account_values_serializer.values(queryset))
+        with patch.object(renderers.orjson, "dumps", wraps=renderers.orjson.dumps) as dumps:
+            rendered = FastJSONRenderer().render({"results": rows})
+
+        dumps.assert_called_once()
+        self.assertEqual(rendered, expected)
+
+    def test_fast_renderer_escapes_line_terminators(self):
+        """
+        Test that orjson output escapes U+2028 and U+2029 like JSONRenderer,
+        and encodes dates, UUIDs and decimals the same way.
+        """
+        data = {
+            "name": "Line\u2028Paragraph\u2029",
+            "id": uuid.UUID(int=1),
+            "updated": datetime(2025, 1, 1, tzinfo=UTC),
+            "amount": Decimal("1.50"),
+        }
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_missing_orjson_falls_back(self):
+        """
+        Test that JSONRenderer renders the response when orjson is not installed.
+        """
+        data = {"results": [{"name": "Rent"}]}
+
+        with patch.object(renderers, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indented_output_falls_back(self):
+        """
+        Test that an indented response is rendered by JSONRenderer.
+        """
+        data = {"results": [{"name": "Rent"}]}
+        media_type = "application/json; indent=4"
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type)
+        )
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        """
+        Set up the test with five accounts.
+        """
+        clear_page_cache()
+        upsert_accounts([make_account(uuid.uuid4(), f"{i}00", f"Account {i}", Description="x" * 100) for i in range(5)])
+        self.url = "/api/v1/xero/accounts/all/"
+
+    def test_list_reads_only_selected_columns(self):
+        """
+        Test that ?fields= trims every row and the query to the fields asked
+        for, while the cursor links keep working.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"fields": "code,name", "page_size": 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([list(row) for row in response.data["results"]], [["code", "name"]] * 3)
+        select = next(query["sql"] for query in queries if "xero_chartofaccount" in query["sql"])
+        self.assertNotIn("description", select)
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual([row["name"] for row in response.data["results"]], ["Account 3", "Account 4"])
+        self.assertEqual([list(row) for row in response.data["results"]], [["code", "name"]] * 2)
+
+    def test_numbered_pages_and_model_serializer(self):
+        """
+        Test that ?fields= works with numbered pages and on the
+        ModelSerializer path.
+        """
+        response = self.client.get(self.url, {"fields": "account_id", "page": 1})
+        self.assertEqual(response.data["count"], 5)
+        self.assertEqual({tuple(row) for row in response.data["results"]}, {("account_id",)})
+
+        clear_page_cache()
+        with patch("features.xero.views.ChartOfAccountsAllAPIView.values_serializer", None):
+            response = self.client.get(self.url, {"fields": "name,code"})
+        self.assertEqual([list(row) for row in response.data["results"]], [["code", "name"]] * 5)
+
+    def test_unknown_fields_are_rejected(self):
+        """
+        Test that unknown or empty field lists get a 400 naming the problem.
+        """
+        response = self.client.get(self.url, {"fields": "code,colour"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "Unknown fields: colour")
+
+        response = self.client.get(self.url, {"fields": ","})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(XERO_SYNC_IN_BACKGROUND=False)
+    @patch("features.xero.client.XeroClient.get")
+    def test_update_response_fields(self, mock_get):
+        """
+        Test that the update returns only the fields asked for, and rejects
+        unknown ones before calling Xero.
+        """
+        XeroToken.objects.create(access_token="valid_access_token", refresh_token="r", expires_in=3600)
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"Accounts": [make_account(uuid.uuid4(), "900", "Water")]}
+
+        response = self.client.get("/api/v1/xero/accounts/update/", {"fields": "code"})
+        self.assertEqual(response.data["data"], [{"code": "900"}])
+
+        mock_get.reset_mock()
+        response = self.client.get("/api/v1/xero/accounts/update/", {"fields": "colour"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_get.assert_not_called()
+
+@override_settings(XERO_SYNC_IN_BACKGROUND=False)
+class SyncCoalescingTests(APITestCase):
+    def setUp(self):
+        """
+        Store a token and serve two accounts from a mocked Xero.
+        """
+        XeroToken.objects.create(tenant_id="tenant-1", access_token="a", refresh_token="r", expires_in=3600)
+        self.accounts = [make_account(uuid.uuid4(), "100", "Sales"), make_account(uuid.uuid4(), "200", "Rent")]
+        patcher = patch("features.xero.client.XeroClient.get")
+        self.mock_get = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_get.return_value.status_code = 200
+        self.mock_get.return_value.json.return_value = {"Accounts": self.accounts}
+        self.mock_get.return_value.iter_content.side_effect = lambda *args, **kwargs: iter(
+            [json.dumps({"Accounts": self.accounts}).encode()]
+        )
+        self.url = "/api/v1/xero/accounts/update/"
+
+    def test_recent_result_is_shared(self):
+        """
+        Test that a request right after a sync gets its accounts without
+        calling Xero, in the fields it asks for.
+        """
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        third = self.client.get(self.url, {"fields": "code"})
+
+        self.assertEqual(self.mock_get.call_count, 1)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(third.data["data"], [{"code": "100"}, {"code": "200"}])
+        self.assertEqual(SyncFlight.objects.get().key, "Accounts:tenant-1")
+
+    def test_result_only_shared_when_it_covers_the_request(self):
+        """
+        Test that a full sync is not answered by an incremental one, nor a
+        request for the accounts by a sync that only counted them.
+        """
+        self.client.get(self.url, {"stream": "true"})
+        self.client.get(self.url)
+        self.client.get(self.url, {"full": "true"})
+        self.client.get(self.url, {"full": "true", "stream": "true"})
+
+        self.assertEqual(self.mock_get.call_count, 3)
+
+    @override_settings(XERO_SYNC_FRESH_SECONDS=0)
+    def test_sequential_requests_sync_again(self):
+        """
+        Test that without a freshness window only concurrent requests share a sync.
+        """
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        self.assertEqual(self.mock_get.call_count, 2)
+
+    @override_settings(XERO_SYNC_FLIGHT_WAIT=0)
+    def test_running_sync_times_out(self):
+        """
+        Test that a request waiting too long for another worker's sync gets
+        a 503 with the time left on that sync's lease.
+        """
+        SyncFlight.objects.create(
+            key="Accounts:tenant-1", locked_by="other", locked_until=timezone.now() + timedelta(seconds=30)
+        )
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn(response["Retry-After"], {"30", "29"})
+        self.mock_get.assert_not_called()
+
+    def test_failed_sync_is_not_shared(self):
+        """
+        Test that a failed sync releases the flight and stores no result.
+        """
+        self.mock_get.return_value.status_code = 500
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_502_BAD_GATEWAY)
+        self.mock_get.return_value.status_code = 200
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data["data"]), 2)
+        self.assertEqual(self.mock_get.call_count, 2)
+
+@override_settings(XERO_EXPORT_CHUNK_SIZE=7)
+class ChartOfAccountsExportTests(APITestCase):
+    def setUp(self):
+        """
+        Create enough accounts to span several export chunks.
+        """
+        for i in range(30):
+            ChartOfAccount.objects.create(
+                account_id=uuid.uuid4(),
+                code=f"{i:03}",
+                name=f"Account {i:02}",
+                type="BANK" if i % 3 == 0 else "EXPENSE",
+                enable_payments_to_account=i % 3 == 0,
+                updated_date_utc=timezone.now(),
+            )
+        self.url = "/api/v1/xero/accounts/export/"
+
+    def expected(self, queryset):
+        return [dict(row) for row in ChartOfAccountSerializer(queryset, many=True).data]
+
+    def test_ndjson_export(self):
+        """
+        Test that the default export streams one JSON object per account,
+        matching the serializer output.
+        """
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 2)
+        rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+        self.assertEqual(rows, self.expected(ChartOfAccount.objects.all()))
+
+    def test_csv_export_with_filter(self):
+        """
+        Test that the CSV export has a header row and honours the list filters.
+        """
+        response = self.client.get(self.url, {"export_format": "csv", "type": "BANK"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('filename="chart-of-accounts.csv"', response["Content-Disposition"])
+        reader = csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode()))
+        rows = list(reader)
+        self.assertEqual(reader.fieldnames[:3], ["account_id", "tenant_id", "code"])
+        self.assertEqual(len(rows), 10)
+        self.assertEqual({row["type"] for row in rows}, {"BANK"})
+        self.assertEqual({row["enable_payments_to_account"] for row in rows}, {"true"})
+        self.assertEqual({row["description"] for row in rows}, {""})
+
+    def test_gzip_export(self):
+        """
+        Test that the export is gzipped when the client accepts it.
+        """
+        plain = b"".join(self.client.get(self.url).streaming_content)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), plain)
+
+    def test_rows_are_read_in_chunks(self):
+        """
+        Test that the export reads the table through a chunked iterator
+        rather than loading the whole queryset.
+        """
+        with patch("django.db.models.query.QuerySet.iterator", autospec=True, side_effect=QuerySet.iterator) as iterator:
+            list(self.client.get(self.url).streaming_content)
+
+        self.assertEqual(iterator.call_args.kwargs["chunk_size"], 7)
+
+    def test_unknown_format(self):
+        """
+        Test that an unknown export format is rejected.
+        """
+        response = self.client.get(self.url, {"export_format": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def clear_page_cache():
+    """
+    Drop cached account pages and generations left over from earlier tests,
+    whose database changes were rolled back.
+    """
+    page_cache().clear()
+    forget_generation()
+
+
+def make_account(account_id, code, name, **extra):
+    """
+    Build a minimal Xero account payload for the sync tests.
+    """
+    return {
+        "AccountID": str(account_id),
+        "Code": code,
+        "Name": name,
+        "Type": "EXPENSE",
+        "Status": "ACTIVE",
+        "UpdatedDateUTC": "/Date(1735689600000+0000)/",
+        **extra,
+    }
+
+class UpsertAccountsTests(APITestCase):
+    def setUp(self):
+        """
+        Set up the test by syncing two accounts into the database.
+        """
+        self.first_id = uuid.uuid4()
+        self.second_id = uuid.uuid4()
+        upsert_accounts([
+            make_account(self.first_id, "100", "Rent"),
+            make_account(self.second_id, "200", "Power"),
+        ])
+
+    def test_unchanged_accounts_are_not_written(self):
+        """
+        Test that re-syncing an identical payload only loads the existing rows.
+        """
+        with self.assertNumQueries(3):
+            result = upsert_accounts([
+                make_account(self.first_id, "100", "Rent"),
+                make_account(self.second_id, "200", "Power"),
+            ])
+
+        self.assertEqual(len(result.unchanged), 2)
+        self.assertEqual(result.changed, 0)
+
+    def test_created_and_updated_accounts(self):
+        """
+        Test that new accounts are inserted and changed accounts are updated.
+        """
+        new_id = uuid.uuid4()
+        result = upsert_accounts([
+            make_account(self.first_id, "100", "Office Rent"),
+            make_account(self.second_id, "200", "Power"),
+            make_account(new_id, "300", "Water"),
+        ])
+
+        self.assertEqual([a.account_id for a in result.created], [new_id])
+        self.assertEqual([a.account_id for a in result.updated], [self.first_id])
+        self.assertEqual(ChartOfAccount.objects.get(account_id=self.first_id).name, "Office Rent")
+        self.assertEqual(ChartOfAccount.objects.count(), 3)
+
+    def test_swapped_codes(self):
+        """
+        Test that two accounts can exchange codes without violating the unique constraint.
+        """
+        upsert_accounts([
+            make_account(self.first_id, "200", "Rent"),
+            make_account(self.second_id, "100", "Power"),
+        ])
+
+        self.assertEqual(ChartOfAccount.objects.get(account_id=self.first_id).code, "200")
+        self.assertEqual(ChartOfAccount.objects.get(account_id=self.second_id).code, "100")
+
+    def test_code_taken_from_stale_account(self):
+        """
+        Test that a new account can claim a code still held by a stale local
+        row, and that the removed row is counted as deleted.
+        """
+        new_id = uuid.uuid4()
+        result = upsert_accounts([make_account(new_id, "100", "Rent")])
+
+        self.assertEqual(result.summary()["deleted"], 1)
+        self.assertFalse(ChartOfAccount.objects.filter(account_id=self.first_id).exists())
+        self.assertEqual(ChartOfAccount.objects.get(code="100").account_id, new_id)
+
+    def test_inserts_are_batched(self):
+        """
+        Test that inserting many accounts costs a handful of batched queries
+        rather than one per account.
+        """
+        payload = [make_account(uuid.uuid4(), f"9{i:03}", f"Account {i}") for i in range(200)]
+        with CaptureQueriesContext(connection) as queries:
+            result = upsert_accounts(payload)
+
+        self.assertEqual(len(result.created), 200)
+        account_queries = [q for q in queries if "xero_chartofaccount" in q["sql"]]
+        self.assertLess(len(account_queries), 10)
+
+    def test_parses_microsoft_json_dates(self):
+        """
+        Test that Xero's /Date(...)/ timestamps are stored as datetimes.
+        """
+        account = ChartOfAccount.objects.get(account_id=self.first_id)
+        self.assertEqual(account.updated_date_utc.isoformat(), "2025-01-01T00:00:00+00:00")
+
+@override_settings(XERO_SYNC_IN_BACKGROUND=False)
+class StreamingSyncTests(APITestCase):
+    def setUp(self):
+        """
+        Set up the test with a token and two synced accounts.
+        """
+        XeroToken.objects.create(access_token="valid_access_token", refresh_token="r", expires_in=3600)
+        self.first_id = uuid.uuid4()
+        self.second_id = uuid.uuid4()
+        upsert_accounts([
+            make_account(self.first_id, "100", "Rent"),
+            make_account(self.second_id, "200", "Power"),
+        ])
+        self.url = "/api/v1/xero/accounts/update/"
+
+    def chunks(self, payload, size):
+        body = json.dumps(payload).encode()
+        return [body[start:start + size] for start in range(0, len(body), size)]
+
+    def test_parser_handles_any_chunking(self):
+        """
+        Test that array items are decoded identically however the body is split,
+        including splits inside strings, numbers and multi-byte characters.
+        """
+        payload = {
+            "Id": "abc",
+            "Status": "OK",
+            "Accounts": [
+                {"Name": "Caf\u00e9 \u2014 \u00fcber", "Amount": 12345.678, "Nested": {"List": [1, 2, {"x": None}]}},
+                {"Name": "Quote \" and \\ slash", "Amount": -7, "Flag": True},
+                12345,
+            ],
+            "Trailer": [1, 2, 3],
+        }
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        for size in (1, 2, 3, 7, 64, len(body)):
+            with self.subTest(size=size):
+                chunks = [body[start:start + size] for start in range(0, len(body), size)]
+                self.assertEqual(list(iter_array_items(chunks, "Accounts")), payload["Accounts"])
+
+    def test_parser_edge_cases(self):
+        """
+        Test empty and missing arrays, and that truncated bodies are rejected.
+        """
+        self.assertEqual(list(iter_array_items([b'{"Accounts": []}'], "Accounts")), [])
+        self.assertEqual(list(iter_array_items([b'{"Other": [1]}'], "Accounts")), [])
+        self.assertEqual(list(iter_array_items([b"{}"], "Accounts")), [])
+        with self.assertRaises(ValueError):
+            list(iter_array_items([b'{"Accounts": [{"Name": "Ren'], "Accounts"))
+        with self.assertRaises(ValueError):
+            list(iter_array_items([b"[1, 2]"], "Accounts"))
+
+    def test_stream_upsert_counts(self):
+        """
+        Test that a streamed upsert written in several batches returns counts only.
+        """
+        new_ids = [uuid.uuid4() for _ in range(5)]
+        accounts = [
+            make_account(self.first_id, "100", "Office Rent"),
+            make_account(self.second_id, "200", "Power"),
+            *[make_account(account_id, f"3{i:02}", f"New {i}") for i, account_id in enumerate(new_ids)],
+        ]
+
+        result = upsert_account_stream(iter(accounts), batch_size=2)
+
+        self.assertEqual(
+            result.summary(),
+            {"created": 5, "updated": 1, "unchanged": 1, "deleted": 0, "not_modified": False},
+        )
+        self.assertEqual(ChartOfAccount.objects.count(), 7)
+        self.assertEqual(ChartOfAccount.objects.get(account_id=self.first_id).name, "Office Rent")
+
+    def test_code_moves_across_batches(self):
+        """
+        Test that a code claimed in one batch by a row that reappears in a later
+        batch is handed over rather than deleted.
+        """
+        new_id = uuid.uuid4()
+        accounts = [
+            make_account(new_id, "100", "Rent"),
+            make_account(self.second_id, "200", "Power"),
+            make_account(self.first_id, "150", "Old Rent"),
+        ]
+
+        result = upsert_account_stream(accounts, batch_size=1)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(ChartOfAccount.objects.get(account_id=self.first_id).code, "150")
+        self.assertEqual(ChartOfAccount.objects.get(code="100").account_id, new_id)
+        self.assertEqual(ChartOfAccount.objects.count(), 3)
+
+    def test_parked_holder_missing_from_stream_is_deleted(self):
+        """
+        Test that a row whose code was claimed and which never shows up is
+        removed and counted as deleted.
+        """
+        new_id = uuid.uuid4()
+        result = upsert_account_stream([make_account(new_id, "100", "Rent")], batch_size=1)
+
+        self.assertEqual(result.deleted, 1)
+        self.assertFalse(ChartOfAccount.objects.filter(account_id=self.first_id).exists())
+        self.assertEqual(ChartOfAccount.objects.get(code="100").account_id, new_id)
+
+    def test_stream_prune(self):
+        """
+        Test that a full streamed sync deletes accounts missing from the payload.
+        """
+        result = upsert_account_stream([make_account(self.first_id, "100", "Rent")], prune=True)
+
+        self.assertEqual(result.deleted, 1)
+        self.assertEqual(list(ChartOfAccount.objects.values_list("account_id", flat=True)), [self.first_id])
+
+    @patch("features.xero.client.XeroClient.get")
+    def test_streaming_update_returns_summary(self, mock_get):
+        """
+        Test that ``?stream=true`` reads the body in chunks and answers with counts.
+        """
+        payload = {"Accounts": [make_account(self.first_id, "100", "Office Rent"), make_account(uuid.uuid4(), "300", "Water")]}
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_content.return_value = self.chunks(payload, 5)
+
+        response = self.client.get(self.url, {"stream": "true", "full": "true"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["summary"],
+            {"created": 1, "updated": 1, "unchanged": 0, "deleted": 1, "not_modified": False},
+        )
+        self.assertNotIn("data", response.data)
+        self.assertTrue(mock_get.call_args.kwargs["stream"])
+        mock_get.return_value.close.assert_called()
+        self.assertIsNotNone(XeroSyncState.objects.get().last_full_sync_at)
+
+    @patch("features.xero.client.XeroClient.get")
+    def test_streaming_update_can_echo_accounts(self, mock_get):
+        """
+        Test that ``?echo=true`` keeps the written accounts in a streamed response.
+        """
+        payload = {"Accounts": [make_account(self.first_id, "100", "Office Rent")]}
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_content.return_value = self.chunks(payload, 7)
+
+        response = self.client.get(self.url, {"stream": "true", "echo": "true"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([account["name"] for account in response.data["data"]], ["Office Rent"])
+
+    @patch("features.xero.client.XeroClient.get")
+    def test_streaming_update_error_status(self, mock_get):
+        """
+        Test that an error status is reported without reading the body.
+        """
+        mock_get.return_value.status_code = 500
+
+        response = self.client.get(self.url, {"stream": "true"})
+
+        self.assertEqual(response.status_code, status.HTTP_502_BAD_GATEWAY)
+        mock_get.return_value.iter_content.assert_not_called()
+        mock_get.return_value.close.assert_called()
+
+
+@override_settings(XERO_HTTP_BACKOFF_FACTOR=0, XERO_HTTP_BACKOFF_JITTER=0)
+class XeroClientTests(SimpleTestCase):
+    def setUp(self):
+        """
+        Start a local stand-in Xero server and point a client at it.
+        """
+        self.server = FakeXeroServer().start()
+        self.addCleanup(self.server.stop)
+        self.client = XeroClient(api_base_url=self.server.url, identity_base_url=self.server.url)
+        self.addCleanup(self.client.close)
+
+    def test_retries_server_errors(self):
+        """
+        Test that a GET is retried after a 503 and the eventual success is returned.
+        """
+        self.server.add("GET", "/api.xro/2.0/Accounts", status=503)
+        self.server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": []})
+
+        response = self.client.get(self.client.api_url("api.xro/2.0/Accounts"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_long_retry_after_is_not_waited_on(self):
+        """
+        Test that a 429 with a Retry-After beyond the configured maximum is
+        returned immediately instead of being retried.
+        """
+        self.server.add("GET", "/api.xro/2.0/Accounts", status=429, headers={"Retry-After": "3600"})
+
+        response = self.client.get(self.client.api_url("api.xro/2.0/Accounts"))
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_injected_errors_are_retried(self):
+        """
+        Test that the stand-in server's injected 503s are absorbed by the client retries.
+        """
+        self.server.inject_errors(0.5, seed=1)
+        self.server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": []})
+
+        responses = [self.client.get(self.client.api_url("api.xro/2.0/Accounts")) for _ in range(5)]
+
+        self.assertEqual([r.status_code for r in responses], [200] * 5)
+        self.assertGreater(len(self.server.requests), 5)
+
+    def test_post_is_not_retried(self):
+        """
+        Test that non-idempotent token requests are never replayed.
+        """
+        self.server.add("POST", "/connect/token", status=503)
+
+        response = self.client.post(self.client.identity_url("connect/token"), data={"grant_type": "refresh_token"})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_read_timeout(self):
+        """
+        Test that a stalled upstream raises a timeout instead of blocking forever.
+        """
+        self.server.add("GET", "/api.xro/2.0/Accounts", json={}, delay=0.5)
+        client = XeroClient(api_base_url=self.server.url, read_timeout=0.1, max_retries=0)
+        self.addCleanup(client.close)
+
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            client.get(client.api_url("api.xro/2.0/Accounts"))
+
+    def test_connection_is_reused(self):
+        """
+        Test that consecutive calls share one pooled connection.
+        """
+        self.server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": []})
+
+        self.client.get(self.client.api_url("api.xro/2.0/Accounts"))
+        self.client.get(self.client.api_url("api.xro/2.0/Accounts"))
+
+        self.assertEqual(len({r["client"] for r in self.server.requests}), 1)
+
+    def test_views_use_stand_in_server(self):
+        """
+        Test that overriding the base URLs routes the shared client to the stand-in server.
+        """
+        self.server.add("POST", "/connect/token", json={"error": "invalid_grant"})
+
+        with override_settings(XERO_API_BASE_URL=self.server.url, XERO_IDENTITY_BASE_URL=self.server.url):
+            self.assertEqual(get_client().identity_url("connect/token"), f"{self.server.url}/connect/token")
+            get_client().post(get_client().identity_url("connect/token"))
+
+        self.assertEqual(len(self.server.requests_for("POST", "/connect/token")), 1)
+        self.assertTrue(get_client().identity_url("connect/token").startswith("https://identity.xero.com"))
+
+@override_settings(
+    XERO_HTTP_BACKOFF_FACTOR=0,
+    XERO_HTTP_BACKOFF_JITTER=0,
+    XERO_RATE_LIMIT_PER_MINUTE=3,
+    XERO_RATE_LIMIT_PERIOD=0.3,
+    XERO_RATE_LIMIT_CONCURRENT=2,
+)
+class RateLimitTests(APITestCase):
+    def setUp(self):
+        """
+        Start a stand-in Xero server that enforces rate limits, and store a token for one tenant.
+        """
+        self.server = FakeXeroServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(
+            XERO_API_BASE_URL=self.server.url, XERO_IDENTITY_BASE_URL=self.server.url
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        XeroToken.objects.create(
+            tenant_id="tenant-1", access_token="valid_access_token", refresh_token="r", expires_in=3600
+        )
+        self.accounts_url = get_client().api_url("api.xro/2.0/Accounts")
+
+    def test_calls_are_paced_instead_of_rejected(self):
+        """
+        Test that a burst beyond the per-minute limit is delayed by the
+        scheduler so the server never has to reject a call.
+        """
+        self.server.limit(per_minute=3, period=0.3)
+        self.server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": []})
+
+        started = time.monotonic()
+        responses = [xero_get(self.accounts_url, tenant_id="tenant-1") for _ in range(6)]
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([r.status_code for r in responses], [200] * 6)
+        self.assertEqual(self.server.rejected, 0)
+        # Three calls go straight away, the next three wait a tenth of a second each.
+        self.assertGreaterEqual(elapsed, 0.25)
+
+    def test_remaining_header_caps_local_budget(self):
+        """
+        Test that X-MinLimit-Remaining lowers the shared bucket when other
+        clients have been spending the same limit.
+        """
+        self.server.add(
+            "GET", "/api.xro/2.0/Accounts", json={"Accounts": []},
+            headers={"X-MinLimit-Remaining": "0", "X-DayLimit-Remaining": "4321"},
+        )
+
+        xero_get(self.accounts_url, tenant_id="tenant-1")
+
+        bucket = XeroRateLimit.objects.get(key="tenant:tenant-1")
+        self.assertEqual(bucket.tokens, 0)
+        self.assertEqual(bucket.day_remaining, 4321)
+        self.assertFalse(XeroRateLimitSlot.objects.exists())
+        self.assertGreater(ratelimit.try_acquire("tenant-1")[0], 0)
+
+    def test_concurrency_cap(self):
+        """
+        Test that at most XERO_RATE_LIMIT_CONCURRENT calls hold a slot at once.
+        """
+        wait, slot = ratelimit.try_acquire("tenant-1")
+        self.assertEqual(wait, 0)
+        self.assertEqual(ratelimit.try_acquire("tenant-1")[0], 0)
+        self.assertEqual(ratelimit.try_acquire("tenant-1"), (ratelimit.SLOT_POLL_INTERVAL, None))
+
+        ratelimit.release("tenant-1", slot)
+
+        self.assertEqual(ratelimit.try_acquire("tenant-1")[0], 0)
+
+    @override_settings(XERO_RATE_LIMIT_SLOT_LEASE=1)
+    def test_leaked_slot_expires_under_steady_traffic(self):
+        """
+        Test that a slot never released frees up once its own lease runs
+        out, even while other calls keep taking and releasing slots.
+        """
+        self.assertEqual(ratelimit.try_acquire("tenant-1")[0], 0)
+
+        deadline = time.monotonic() + 1.3
+        while time.monotonic() < deadline:
+            wait, slot = ratelimit.try_acquire("tenant-1")
+            self.assertEqual(wait, 0)
+            ratelimit.release("tenant-1", slot)
+            time.sleep(0.15)
+
+        self.assertEqual(ratelimit.try_acquire("tenant-1")[0], 0)
+        self.assertEqual(ratelimit.try_acquire("tenant-1")[0], 0)
+        self.assertEqual(XeroRateLimitSlot.objects.filter(expires_at__gte=timezone.now()).count(), 2)
+
+    def test_long_retry_after_blocks_every_worker(self):
+        """
+        Test that a 429 Xero could not retry past is raised, and that later
+        calls wait on the shared block instead of reaching Xero.
+        """
+        self.server.add(
+            "GET", "/api.xro/2.0/Accounts", status=429,
+            headers={"Retry-After": "3600", "X-Rate-Limit-Problem": "day"},
+        )
+
+        with self.assertRaises(RateLimitedError) as raised:
+            xero_get(self.accounts_url, tenant_id="tenant-1")
+        self.assertEqual(raised.exception.retry_after, 3600)
+
+        with self.assertRaises(RateLimitedError):
+            xero_get(self.accounts_url, tenant_id="tenant-1")
+        self.assertEqual(len(self.server.requests_for("GET", "/api.xro/2.0/Accounts")), 1)
+
+    @override_settings(XERO_SYNC_IN_BACKGROUND=False)
+    def test_update_view_reports_retry_after(self):
+        """
+        Test that an inline sync stopped by the rate limits answers 503 with Retry-After.
+        """
+        XeroRateLimit.objects.create(
+            key="tenant:tenant-1", tokens=0, refilled_at=timezone.now(),
+            blocked_until=timezone.now() + timedelta(minutes=5),
+        )
+
+        response = self.client.get("/api/v1/xero/accounts/update/", {"tenant_id": "tenant-1"})
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertGreater(int(response["Retry-After"]), 250)
+
+    def test_rate_limited_job_is_requeued_without_using_an_attempt(self):
+        """
+        Test that a job stopped by the rate limits waits for capacity rather than failing.
+        """
+        XeroRateLimit.objects.create(
+            key="tenant:tenant-1", tokens=0, refilled_at=timezone.now(),
+            blocked_until=timezone.now() + timedelta(minutes=5),
+        )
+        job = enqueue("accounts", {"tenant_id": "tenant-1"})
+
+        run_next_job("worker-1")
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.Status.QUEUED)
+        self.assertEqual(job.attempts, 0)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(minutes=4))
+
+@override_settings(
+    XERO_SYNC_IN_BACKGROUND=False,
+    XERO_HTTP_MAX_RETRIES=0,
+    XERO_BREAKER_MIN_CALLS=3,
+    XERO_BREAKER_FAILURE_RATE=0.5,
+    XERO_BREAKER_OPEN_SECONDS=30,
+)
+class CircuitBreakerTests(APITestCase):
+    def setUp(self):
+        """
+        Start a stand-in Xero server and store a token for one tenant.
+        """
+        self.server = FakeXeroServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(
+            XERO_API_BASE_URL=self.server.url, XERO_IDENTITY_BASE_URL=self.server.url
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        XeroToken.objects.create(
+            tenant_id="tenant-1", access_token="valid_access_token", refresh_token="r", expires_in=3600
+        )
+        self.accounts_url = get_client().api_url("api.xro/2.0/Accounts")
+
+    def open_breaker(self):
+        for _ in range(3):
+            self.server.add("GET", "/api.xro/2.0/Accounts", status=503)
+            get_client().get(self.accounts_url)
+
+    def test_opens_after_failures(self):
+        """
+        Test that once enough calls failed, further calls are refused without
+        reaching Xero, while other endpoints are still called.
+        """
+        self.open_breaker()
+
+        with self.assertRaises(CircuitOpenError) as raised:
+            get_client().get(self.accounts_url)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertGreater(raised.exception.retry_after, 29)
+
+        self.server.add("GET", "/api.xro/2.0/Contacts", json={"Contacts": []})
+        self.assertEqual(get_client().get(get_client().api_url("api.xro/2.0/Contacts")).status_code, 200)
+
+    @override_settings(XERO_BREAKER_SLOW_CALL=0.01)
+    def test_slow_calls_count_as_failures(self):
+        """
+        Test that calls slower than XERO_BREAKER_SLOW_CALL open the breaker
+        even though they succeed.
+        """
+        for _ in range(3):
+            self.server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": []}, delay=0.05)
+            self.assertEqual(get_client().get(self.accounts_url).status_code, 200)
+
+        with self.assertRaises(CircuitOpenError):
+            get_client().get(self.accounts_url)
+
+    def test_half_open_probe(self):
+        """
+        Test that after the open period one probe is let through at a time,
+        and that a failed probe reopens the breaker and a good one closes it.
+        """
+        self.open_breaker()
+        breaker = get_breaker(self.accounts_url)
+
+        breaker.open_until = 0
+        self.assertTrue(breaker.before_call())
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record(True, probe=True)
+        self.assertEqual(breaker.state, "open")
+
+        breaker.open_until = 0
+        self.server.routes.clear()
+        self.server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": []})
+        self.assertEqual(get_client().get(self.accounts_url).status_code, 200)
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(get_client().get(self.accounts_url).status_code, 200)
+
+    def test_update_is_degraded_while_open(self):
+        """
+        Test that the update answers at once with an explicit degraded 503
+        while the breaker is open, the list keeps serving stored accounts, and
+        queued syncs are deferred without using an attempt.
+        """
+        upsert_accounts([make_account(uuid.uuid4(), "100", "Sales")], tenant_id="tenant-1")
+        self.open_breaker()
+
+        response = self.client.get("/api/v1/xero/accounts/update/", {"tenant_id": "tenant-1"})
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertTrue(response.data["degraded"])
+        self.assertIn("Retry-After", response)
+        self.assertEqual(len(self.server.requests), 3)
+
+        response = self.client.get("/api/v1/xero/accounts/all/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([account["code"] for account in response.data["results"]], ["100"])
+
+        enqueue("accounts", {"tenant_id": "tenant-1"})
+        job = run_next_job("worker")
+        self.assertEqual((job.status, job.attempts), (SyncJob.Status.QUEUED, 0))
+
+    @override_settings(XERO_SYNC_LATENCY_BUDGET=0.2)
+    def test_latency_budget(self):
+        """
+        Test that an inline sync stops waiting on Xero when the view's
+        latency budget runs out, and answers with a 504.
+        """
+        self.server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": []}, delay=2)
+
+        started = time.monotonic()
+        response = self.client.get("/api/v1/xero/accounts/update/", {"tenant_id": "tenant-1"})
+
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertIn("latency budget", response.data["error"])
+
+    def test_spent_budget_refuses_calls(self):
+        """
+        Test that a call made after the budget ran out is refused without being sent.
+        """
+        with latency_budget(0.01):
+            time.sleep(0.02)
+            with self.assertRaises(LatencyBudgetExceededError):
+                get_client().get(self.accounts_url)
+            with latency_budget(10):
+                self.assertLess(remaining_budget(), 0)
+        self.assertIsNone(remaining_budget())
+        self.assertEqual(self.server.requests, [])
+
+
+@override_settings(XERO_SYNC_IN_BACKGROUND=False, XERO_HTTP_BACKOFF_FACTOR=0, XERO_HTTP_BACKOFF_JITTER=0)
+class XeroMetricsTests(APITestCase):
+    def setUp(self):
+        """
+        Start a stand-in Xero server, store a token and clear recorded metrics.
+        """
+        self.server = FakeXeroServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(
+            XERO_API_BASE_URL=self.server.url, XERO_IDENTITY_BASE_URL=self.server.url
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        XeroToken.objects.create(access_token="valid_access_token", refresh_token="r", expires_in=3600)
+        REGISTRY.reset()
+
+    def test_sync_is_instrumented(self):
+        """
+        Test that a sync records the Xero call, the rows written, the sync
+        duration and its stages, and that they are exposed on /metrics.
+        """
+        accounts = [make_account(uuid.uuid4(), f"{i}", f"Account {i}") for i in range(3)]
+        self.server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": accounts})
+
+        self.client.get("/api/v1/xero/accounts/update/")
+
+        self.assertEqual(
+            xero_metrics.xero_request_duration.count(method="GET", endpoint="api.xro/2.0/Accounts", status=200), 1
+        )
+        self.assertEqual(xero_metrics.sync_rows.value(outcome="created"), 3)
+        self.assertEqual(xero_metrics.sync_duration.count(mode="buffered", outcome="ok"), 1)
+        for stage in ("parse", "write", "serialize"):
+            self.assertEqual(xero_metrics.sync_stage_duration.count(stage=stage), 1)
+
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('xero_sync_rows_total{outcome="created"} 3.0', body)
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",view="xero-accounts-update",status="200"} 1.0', body
+        )
+
+    def test_failures_are_counted(self):
+        """
+        Test that failed Xero calls and rejected token refreshes are recorded by outcome.
+        """
+        self.server.add("GET", "/api.xro/2.0/Accounts", status=401)
+        self.server.add("POST", "/connect/token", status=400, json={"error": "invalid_grant"})
+
+        self.client.get("/api/v1/xero/accounts/update/")
+
+        self.assertEqual(
+            xero_metrics.xero_request_duration.count(method="GET", endpoint="api.xro/2.0/Accounts", status=401), 1
+        )
+        self.assertEqual(xero_metrics.token_refreshes.value(outcome="rejected"), 1)
+        self.assertEqual(xero_metrics.sync_duration.count(mode="buffered", outcome="error"), 1)
+
+    def test_endpoint_label_hides_ids(self):
+        """
+        Test that ids in Xero URLs do not create a series per record.
+        """
+        url = "https://api.xero.com/api.xro/2.0/Accounts/f33b5b6d-8c40-4502-94b1-bb9acbed4589/Attachments"
+
+        self.assertEqual(xero_metrics.endpoint_label(url), "api.xro/2.0/Accounts/{id}/Attachments")
+
+
+def make_contact(contact_id, name, **extra):
+    """
+    Build a minimal Xero contact payload for the entity sync tests.
+    """
+    return {
+        "ContactID": str(contact_id),
+        "Name": name,
+        "ContactStatus": "ACTIVE",
+        "IsCustomer": True,
+        "UpdatedDateUTC": "/Date(1735689600000+0000)/",
+        **extra,
+    }
+
+@override_settings(XERO_SYNC_IN_BACKGROUND=False, XERO_SYNC_PAGE_SIZE=10)
+class EntitySyncTests(APITestCase):
+    def setUp(self):
+        """
+        Start a stand-in Xero server and store a token for it.
+        """
+        self.server = FakeXeroServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(
+            XERO_API_BASE_URL=self.server.url, XERO_IDENTITY_BASE_URL=self.server.url
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        XeroToken.objects.create(access_token="valid_access_token", refresh_token="r", expires_in=3600)
+        self.path = "/api.xro/2.0/Contacts"
+
+    def pages_requested(self):
+        return [request["query"] for request in self.server.requests_for("GET", self.path)]
+
+    def test_contacts_synced_across_pages(self):
+        """
+        Test that every page is fetched once, in order, and written.
+        """
+        contacts = [make_contact(uuid.uuid4(), f"Contact {i:02}") for i in range(25)]
+        self.server.add_pages(self.path, "Contacts", contacts, page_size=10)
+
+        response = self.client.get("/api/v1/xero/entities/contacts/update/", {"wait": "true"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["summary"]["created"], 25)
+        self.assertEqual(Contact.objects.count(), 25)
+        self.assertEqual(
+            self.pages_requested(),
+            [f"includeArchived=true&pageSize=10&page={page}" for page in (1, 2, 3)],
+        )
+        contact = Contact.objects.get(name="Contact 00")
+        self.assertTrue(contact.is_customer)
+        self.assertFalse(contact.is_supplier)
+
+    def test_short_page_ends_sync_without_pagination(self):
+        """
+        Test that a page shorter than the page size ends the sync when Xero
+        sends no page count, dropping pages requested ahead of it.
+        """
+        self.server.add("GET", self.path, json={"Contacts": [make_contact(uuid.uuid4(), f"A{i}") for i in range(10)]})
+        self.server.add("GET", self.path, json={"Contacts": [make_contact(uuid.uuid4(), "B")]})
+        self.server.add("GET", self.path, json={"Contacts": [make_contact(uuid.uuid4(), "C")]})
+
+        result = sync_entity("Contacts", prefetch=2)
+
+        self.assertEqual(result.created, 11)
+        self.assertFalse(Contact.objects.filter(name="C").exists())
+
+    def test_resync_is_incremental_and_full_sync_prunes(self):
+        """
+        Test that a later sync sends If-Modified-Since, and that a full sync
+        deletes contacts no longer in Xero.
+        """
+        kept, removed = make_contact(uuid.uuid4(), "Kept"), make_contact(uuid.uuid4(), "Removed")
+        self.server.add_pages(self.path, "Contacts", [kept, removed])
+        sync_entity("Contacts")
+
+        self.server.add_pages(self.path, "Contacts", [])
+        result = sync_entity("Contacts")
+        self.assertTrue(result.not_modified)
+        self.assertIn("If-Modified-Since", self.server.requests[-1]["headers"])
+
+        self.server.add_pages(self.path, "Contacts", [kept])
+        result = sync_entity("Contacts", full=True)
+
+        self.assertEqual((result.unchanged, result.deleted), (1, 1))
+        self.assertEqual(list(Contact.objects.values_list("name", flat=True)), ["Kept"])
+        state = XeroSyncState.objects.get(entity="Contacts")
+        self.assertEqual(state.watermark, parse_xero_datetime("2025-01-01T00:00:00Z"))
+
+    def test_invoice_fields(self):
+        """
+        Test that nested ids, dates and amounts are converted for invoices.
+        """
+        contact_id, invoice_id = uuid.uuid4(), uuid.uuid4()
+        self.server.add_pages("/api.xro/2.0/Invoices", "Invoices", [{
+            "InvoiceID": str(invoice_id),
+            "Type": "ACCREC",
+            "InvoiceNumber": "INV-001",
+            "Contact": {"ContactID": str(contact_id), "Name": "Acme"},
+            "Status": "AUTHORISED",
+            "Date": "/Date(1735689600000+0000)/",
+            "DueDate": "2025-01-31T00:00:00",
+            "Total": 115.5,
+            "AmountDue": 115.5,
+            "UpdatedDateUTC": "/Date(1735689600000+0000)/",
+        }])
+
+        sync_entity("Invoices")
+
+        invoice = Invoice.objects.get()
+        self.assertEqual(invoice.pk, invoice_id)
+        self.assertEqual(invoice.contact_id, contact_id)
+        self.assertEqual((invoice.date, invoice.due_date), (date(2025, 1, 1), date(2025, 1, 31)))
+        self.assertEqual(invoice.total, Decimal("115.5"))
+        self.assertIsNone(invoice.amount_paid)
+
+    def test_fetching_overlaps_writing(self):
+        """
+        Test that pages download while earlier pages are written, so the sync
+        takes about the longer of the two rather than their sum.
+        """
+        delay, pages = 0.1, 5
+        contacts = [make_contact(uuid.uuid4(), f"Contact {i:02}") for i in range(10 * pages)]
+        self.server.add_pages(self.path, "Contacts", contacts, page_size=10, delay=delay)
+        write_page = entity_sync.write_page
+
+        def slow_write(*args):
+            time.sleep(delay)
+            return write_page(*args)
+
+        started = time.perf_counter()
+        with patch.object(entity_sync, "write_page", slow_write):
+            sync_entity("Contacts", prefetch=2)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(Contact.objects.count(), 10 * pages)
+        self.assertLess(elapsed, 2 * delay * pages * 0.8)
+
+    def test_prefetched_pages_keep_the_latency_budget(self):
+        """
+        Test that pages requested ahead on the fetch threads have their
+        timeouts cut to the caller's latency budget.
+        """
+        contacts = [make_contact(uuid.uuid4(), f"Contact {i:02}") for i in range(30)]
+        self.server.add_pages(self.path, "Contacts", contacts, page_size=10)
+        timeout, timeouts = XeroCall.timeout, []
+
+        def record(call, requested):
+            timeouts.append(timeout(call, requested))
+            return timeouts[-1]
+
+        with patch.object(XeroCall, "timeout", record), latency_budget(2):
+            sync_entity("Contacts", prefetch=2)
+
+        self.assertEqual(len(timeouts), 3)
+        for connect, read in timeouts:
+            self.assertLessEqual(max(connect, read), 2)
+
+    def test_token_is_refreshed_once(self):
+        """
+        Test that a 401 refreshes the token and repeats the request with it.
+        """
+        self.server.add_pages(self.path, "Contacts", [make_contact(uuid.uuid4(), "A")])
+        self.server.add("POST", "/connect/token", json={
+            "access_token": "new_access_token", "refresh_token": "new_refresh_token", "expires_in": 1800,
+        })
+        original = entity_sync.PageFetcher._request
+        answers = [401]
+
+        def expire_once(fetcher, page, token):
+            if answers:
+                return MagicMock(status_code=answers.pop())
+            return original(fetcher, page, token)
+
+        with patch.object(entity_sync.PageFetcher, "_request", expire_once):
+            result = sync_entity("Contacts")
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(
+            self.server.requests_for("GET", self.path)[-1]["headers"]["Authorization"], "Bearer new_access_token"
+        )
+
+    def test_unknown_entity(self):
+        """
+        Test that syncing an entity without a spec returns 404.
+        """
+        response = self.client.get("/api/v1/xero/entities/widgets/update/", {"wait": "true"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(XERO_SYNC_IN_BACKGROUND=True)
+    def test_background_sync_is_queued(self):
+        """
+        Test that the endpoint queues an entity job that the worker runs.
+        """
+        self.server.add_pages("/api.xro/2.0/Invoices", "Invoices", [])
+
+        response = self.client.get("/api/v1/xero/entities/invoices/update/", {"full": "true"})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = SyncJob.objects.get(pk=response.data["job_id"])
+        self.assertEqual((job.kind, job.params), ("entity", {"entity": "Invoices", "full": True}))
+        call_command("xero_worker", "--burst")
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.Status.SUCCEEDED)
+
+def webhook_event(resource_id, category="CONTACT", tenant_id="tenant-a", event_date="2025-01-01T10:00:00.000"):
+    """
+    Build a Xero webhook event for the webhook tests.
+    """
+    return {
+        "resourceUrl": f"https://api.xero.com/api.xro/2.0/{category.title()}s/{resource_id}",
+        "resourceId": str(resource_id),
+        "eventDateUtc": event_date,
+        "eventType": "UPDATE",
+        "eventCategory": category,
+        "tenantId": tenant_id,
+        "tenantType": "ORGANISATION",
+    }
+
+@override_settings(XERO_WEBHOOK_KEY="webhook-key", XERO_WEBHOOK_COALESCE_SECONDS=0)
+class WebhookTests(APITestCase):
+    def setUp(self):
+        """
+        Start a stand-in Xero server and connect one tenant to it.
+        """
+        self.server = FakeXeroServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(
+            XERO_API_BASE_URL=self.server.url, XERO_IDENTITY_BASE_URL=self.server.url
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        XeroToken.objects.create(
+            tenant_id="tenant-a", access_token="valid_access_token", refresh_token="r", expires_in=3600
+        )
+        self.url = "/api/v1/xero/webhooks/"
+
+    def deliver(self, events, key="webhook-key"):
+        body = json.dumps({"events": events, "firstEventSequence": 1, "lastEventSequence": len(events)}).encode()
+        signature = base64.b64encode(hmac.new(key.encode(), body, hashlib.sha256).digest()).decode()
+        return self.client.generic(
+            "POST", self.url, body, content_type="application/json", HTTP_X_XERO_SIGNATURE=signature
+        )
+
+    def test_intent_to_receive(self):
+        """
+        Test that a correctly signed empty delivery gets 200 and a badly
+        signed one 401, as Xero's intent-to-receive check expects.
+        """
+        self.assertEqual(self.deliver([]).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.deliver([], key="wrong").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(SyncJob.objects.exists())
+
+    @override_settings(XERO_WEBHOOK_KEY="")
+    def test_rejected_without_key(self):
+        """
+        Test that deliveries are rejected while no webhook key is configured.
+        """
+        response = self.deliver([webhook_event(uuid.uuid4())], key="")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_events_are_stored_once_and_coalesced_into_one_job(self):
+        """
+        Test that redelivered events are not stored twice and that
+        deliveries share one queued job.
+        """
+        event = webhook_event(uuid.uuid4())
+
+        self.assertEqual(self.deliver([event]).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.deliver([event, webhook_event(uuid.uuid4())]).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(XeroWebhookEvent.objects.count(), 2)
+        job = SyncJob.objects.get()
+        self.assertEqual(job.kind, "webhook_events")
+
+    def test_changed_records_are_fetched_in_batches(self):
+        """
+        Test that the job fetches each changed record once, grouped by
+        tenant and category, and marks the events processed.
+        """
+        contact_ids = sorted(uuid.uuid4() for _ in range(3))
+        invoice_id = uuid.uuid4()
+        self.deliver([
+            webhook_event(contact_ids[0]),
+            webhook_event(contact_ids[0], event_date="2025-01-01T10:05:00.000"),
+            webhook_event(contact_ids[1]),
+            webhook_event(contact_ids[2]),
+            webhook_event(invoice_id, category="INVOICE"),
+        ])
+        self.server.add("GET", "/api.xro/2.0/Contacts", json={
+            "Contacts": [make_contact(contact_id, f"Contact {i}") for i, contact_id in enumerate(contact_ids)]
+        })
+        self.server.add("GET", "/api.xro/2.0/Invoices", json={
+            "Invoices": [{"InvoiceID": str(invoice_id), "Type": "ACCREC", "Status": "PAID"}]
+        })
+
+        call_command("xero_worker", "--burst")
+
+        job = SyncJob.objects.get()
+        self.assertEqual(job.status, SyncJob.Status.SUCCEEDED)
+        self.assertEqual(job.result["events"], 5)
+        self.assertEqual((job.result["records"], job.result["requests"]), (4, 2))
+        contact_requests = self.server.requests_for("GET", "/api.xro/2.0/Contacts")
+        self.assertEqual(len(contact_requests), 1)
+        self.assertIn("IDs=" + "%2C".join(str(contact_id) for contact_id in contact_ids), contact_requests[0]["query"])
+        self.assertEqual(contact_requests[0]["headers"]["Xero-tenant-id"], "tenant-a")
+        self.assertEqual(Contact.objects.filter(tenant_id="tenant-a").count(), 3)
+        self.assertEqual(Invoice.objects.get().status, "PAID")
+        self.assertFalse(XeroWebhookEvent.objects.filter(processed_at=None).exists())
+
+    def test_failed_fetch_leaves_events_pending(self):
+        """
+        Test that events stay pending when Xero fails, so a retry picks them up.
+        """
+        self.deliver([webhook_event(uuid.uuid4())])
+        self.server.add("GET", "/api.xro/2.0/Contacts", status=500)
+
+        with override_settings(XERO_HTTP_MAX_RETRIES=0), self.assertRaises(XeroAPIError):
+            process_webhook_events()
+
+        self.assertEqual(XeroWebhookEvent.objects.filter(processed_at=None).count(), 1)
+
+    def test_unknown_tenant_is_dropped(self):
+        """
+        Test that events for a tenant without a token are marked processed
+        without calling Xero.
+        """
+        self.deliver([webhook_event(uuid.uuid4(), tenant_id="tenant-gone")])
+
+        with self.assertLogs("features.xero.webhooks", "WARNING"):
+            result = process_webhook_events()
+
+        self.assertEqual((result["events"], result["requests"]), (1, 0))
+        self.assertFalse(XeroWebhookEvent.objects.filter(processed_at=None).exists())
+        self.assertFalse(self.server.requests)
+
+class AccountSnapshotTests(APITestCase):
+    def setUp(self):
+        """
+        Set up the test with two synced accounts and an empty snapshot directory.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(XERO_SNAPSHOT_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.directory = directory.name
+        self.url = "/api/v1/xero/accounts/snapshot/"
+        self.first_id = uuid.uuid4()
+        upsert_accounts([make_account(self.first_id, "100", "Rent"), make_account(uuid.uuid4(), "200", "Power")])
+        clear_page_cache()
+
+    def get(self, **extra):
+        """
+        Request the snapshot and return the response with its streamed body.
+        """
+        response = self.client.get(self.url, **extra)
+        if response.status_code == status.HTTP_200_OK:
+            response.body = b"".join(response.streaming_content)
+        return response
+
+    def expected(self):
+        return account_values_serializer.serialize_rows(
+            account_values_serializer.values(ChartOfAccount.objects.order_by("name", "account_id"))
+        )
+
+    def test_snapshot_is_served_without_queries(self):
+        """
+        Test that the first request builds the snapshot and later ones are
+        served from it without touching the database.
+        """
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.body), self.expected())
+        self.assertNotIn("Content-Encoding", response)
+
+        with self.assertNumQueries(0):
+            again = self.get()
+        self.assertEqual(again.body, response.body)
+        self.assertEqual(again["ETag"], response["ETag"])
+
+    def test_encoding_negotiation(self):
+        """
+        Test that gzip is sent to clients accepting it, and plain JSON to
+        clients that don't or that refuse it with q=0.
+        """
+        plain = self.get().body
+        response = self.get(HTTP_ACCEPT_ENCODING="deflate, gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.body), plain)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        response = self.get(HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response.body, plain)
+
+    def test_brotli_is_preferred(self):
+        """
+        Test that brotli is picked over gzip when the client accepts both.
+        """
+        response = self.get(HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(snapshots.brotli.decompress(response.body), self.get().body)
+
+    def test_conditional_request(self):
+        """
+        Test that a matching If-None-Match gets a 304, per content coding.
+        """
+        etag = self.get(HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+        response = self.get(HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_new_generation_gets_new_snapshot(self):
+        """
+        Test that a sync leads to a new snapshot, and that only the newest
+        files are kept on disk.
+        """
+        first = self.get()
+        for name in ("Office Rent", "Head Office Rent"):
+            upsert_accounts([make_account(self.first_id, "100", name)])
+            response = self.get()
+            self.assertNotEqual(response["ETag"], first["ETag"])
+            self.assertEqual(json.loads(response.body), self.expected())
+
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.endswith(".snap")]), 2)
+
+    def test_sync_leaves_build_to_first_request(self):
+        """
+        Test that a committed sync does not build a snapshot itself, and that
+        the next request builds one of the new generation.
+        """
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            upsert_accounts([make_account(self.first_id, "100", "Office Rent")])
+
+        generation = SyncGeneration.objects.get(name="accounts").value
+        self.assertLess(snapshots.load_snapshot().generation, generation)
+        response = self.get()
+        self.assertEqual(response["X-Snapshot-Generation"], str(generation))
+        self.assertEqual(json.loads(response.body), self.expected())
+
+    def test_snapshot_is_streamed_in_chunks(self):
+        """
+        Test that the body is streamed from the mapped file in chunks, with
+        its full length announced up front.
+        """
+        plain = self.get().body
+
+        with patch.object(snapshots, "CHUNK_SIZE", 100):
+            response = self.client.get(self.url)
+            chunks = list(response.streaming_content)
+
+        self.assertEqual(response["Content-Length"], str(len(plain)))
+        self.assertEqual(len(chunks), math.ceil(len(plain) / 100))
+        self.assertEqual(b"".join(chunks), plain)
+
+    async def test_snapshot_is_streamed_over_asgi(self):
+        """
+        Test that an ASGI request gets the chunks through an async iterator
+        rather than having Django read the whole body into a list first.
+        """
+        response = await self.async_client.get(self.url)
+
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(json.loads(body), await sync_to_async(self.expected)())
+
+    def test_published_snapshot_is_picked_up(self):
+        """
+        Test that a snapshot published by another process replaces the one a
+        process has mapped, without a restart.
+        """
+        self.get()
+        ChartOfAccount.objects.filter(account_id=self.first_id).update(name="Office Rent")
+        snapshots.build_snapshot()
+
+        response = self.get()
+        self.assertEqual(json.loads(response.body), self.expected())
+
+
+class ChangeFeedTests(APITestCase):
+    def setUp(self):
+        """
+        Set up the test with two synced accounts.
+        """
+        self.url = "/api/v1/xero/accounts/changes/"
+        self.first_id = uuid.uuid4()
+        self.second_id = uuid.uuid4()
+        upsert_accounts([
+            make_account(self.first_id, "100", "Rent"),
+            make_account(self.second_id, "200", "Power"),
+        ])
+
+    def log(self):
+        return list(ChartOfAccountChange.objects.order_by("seq").values_list("account_id", "operation"))
+
+    def test_sync_records_changes(self):
+        """
+        Test that creates, updates and pruned deletes are appended in order,
+        and that unchanged accounts are not.
+        """
+        new_id = uuid.uuid4()
+        upsert_accounts([
+            make_account(self.first_id, "100", "Office Rent"),
+            make_account(new_id, "300", "Water"),
+        ], prune=True)
+
+        self.assertEqual(self.log(), [
+            (self.first_id, "created"),
+            (self.second_id, "created"),
+            (self.second_id, "deleted"),
+            (self.first_id, "updated"),
+            (new_id, "created"),
+        ])
+
+        upsert_accounts([make_account(self.first_id, "100", "Office Rent")])
+        self.assertEqual(len(self.log()), 5)
+
+    def test_released_code_records_delete(self):
+        """
+        Test that a stale row removed to free its code is logged as deleted,
+        in the buffered and the streaming sync.
+        """
+        new_id, newer_id = uuid.uuid4(), uuid.uuid4()
+        upsert_accounts([make_account(new_id, "100", "Rent")])
+        upsert_account_stream([make_account(newer_id, "200", "Power")], batch_size=1)
+
+        self.assertEqual(self.log()[2:], [
+            (self.first_id, "deleted"),
+            (new_id, "created"),
+            (newer_id, "created"),
+            (self.second_id, "deleted"),
+        ])
+
+    def test_feed_pages(self):
+        """
+        Test that the feed is read in pages by following the cursor, with the
+        current values of live accounts and none for deleted ones.
+        """
+        upsert_accounts([make_account(self.first_id, "100", "Office Rent")], prune=True)
+
+        response = self.client.get(self.url, {"since": 0, "page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["has_more"])
+        first_page = response.data["changes"]
+        self.assertEqual([change["operation"] for change in first_page], ["created", "created"])
+        self.assertEqual(first_page[0]["account"]["name"], "Office Rent")
+        self.assertIsNone(first_page[1]["account"])
+
+        response = self.client.get(self.url, {"since": response.data["cursor"], "page_size": 2})
+        self.assertFalse(response.data["has_more"])
+        self.assertEqual(
+            [(change["account_id"], change["operation"]) for change in response.data["changes"]],
+            [(self.second_id, "deleted"), (self.first_id, "updated")],
+        )
+
+        cursor = response.data["cursor"]
+        response = self.client.get(self.url, {"since": cursor})
+        self.assertEqual(response.data, {"changes": [], "cursor": cursor, "has_more": False})
+
+    @override_settings(XERO_CHANGES_MAX_PAGE_SIZE=1)
+    def test_page_size_is_capped(self):
+        """
+        Test that a client cannot ask for more than XERO_CHANGES_MAX_PAGE_SIZE entries.
+        """
+        response = self.client.get(self.url, {"page_size": 100})
+        self.assertEqual(len(response.data["changes"]), 1)
+        self.assertTrue(response.data["has_more"])
+
+    def test_invalid_cursor(self):
+        """
+        Test that a malformed or negative cursor is rejected with 400.
+        """
+        for since in ("abc", "-1"):
+            with self.subTest(since=since):
+                response = self.client.get(self.url, {"since": since})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_compaction_keeps_latest_entry(self):
+        """
+        Test that compaction drops superseded entries but the feed still ends
+        in the same state.
+        """
+        upsert_accounts([make_account(self.first_id, "100", "Office Rent")])
+        upsert_accounts([make_account(self.first_id, "100", "Head Office Rent")])
+
+        result = compact_changes()
+
+        self.assertEqual(result, {"superseded": 2, "expired": 0, "horizon": 0})
+        self.assertEqual(self.log(), [(self.second_id, "created"), (self.first_id, "updated")])
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["changes"][1]["account"]["name"], "Head Office Rent")
+
+    def test_expired_cursor(self):
+        """
+        Test that entries past the retention period are dropped and older
+        cursors, including a new consumer's since=0, get a 410 giving the
+        horizon and pointing at the current end of the log.
+        """
+        ChartOfAccountChange.objects.update(changed_at=timezone.now() - timedelta(days=31))
+        upsert_accounts([make_account(self.first_id, "100", "Office Rent")])
+        latest = ChartOfAccountChange.objects.latest("seq").seq
+
+        call_command("xero_compact_changes", retention_days=30, stdout=io.StringIO())
+
+        response = self.client.get(self.url, {"since": 0})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertEqual(response.data["cursor"], latest)
+        self.assertEqual(response.data["horizon"], latest - 1)
+
+        response = self.client.get(self.url, {"since": latest - 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([change["seq"] for change in response.data["changes"]], [latest])
+
+    def test_tenant_filter(self):
+        """
+        Test that ?tenant_id= only returns the changes of that tenant.
+        """
+        other_id = uuid.uuid4()
+        upsert_accounts([make_account(other_id, "100", "Rent")], tenant_id="tenant-b")
+
+        response = self.client.get(self.url, {"tenant_id": "tenant-b"})
+        self.assertEqual([change["account_id"] for change in response.data["changes"]], [other_id])
+
+
+class ReplicaReadTests(APITestCase):
+    def setUp(self):
+        """
+        Set up the test with one synced account and no cached pages.
+        """
+        upsert_accounts([make_account(uuid.uuid4(), "100", "Rent")])
+        clear_page_cache()
+
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_reads_stay_on_primary_after_sync(self):
+        """
+        Test that the list reads the primary right after a sync, so the
+        client sees its own changes.
+        """
+        response = self.client.get("/api/v1/xero/accounts/all/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    @override_settings(DATABASE_REPLICAS=["replica1"], DATABASE_REPLICA_LAG=0)
+    def test_reads_go_to_replica_once_caught_up(self):
+        """
+        Test that the list and the export read from the replica once the lag
+        has passed.
+        """
+        for url in ("/api/v1/xero/accounts/all/", "/api/v1/xero/accounts/export/"):
+            with self.subTest(url=url), self.assertRaisesMessage(ConnectionDoesNotExist, "replica1"):
+                response = self.client.get(url)
+                b"".join(response.streaming_content)
+
+
+class ConcurrentSyncTests(SimpleTestCase):
+    """
+    Reads and writes during a sync on a SQLite file set up like a deployment.
+
+    The in-memory test database can't use WAL, so every thread of a test
+    swaps its ``default`` connection for one to a temporary file, opened with
+    the project's connection options.
+    """
+    databases = {"default"}
+
+    def setUp(self):
+        """
+        Create the account tables in a temporary file and sync 50 accounts into it.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(XERO_SNAPSHOT_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.original = connections[DEFAULT_DB_ALIAS]
+        self.settings_dict = {**self.original.settings_dict, "NAME": os.path.join(directory.name, "db.sqlite3")}
+        self.use_file_database()
+        self.addCleanup(self.restore_database)
+        with connection.schema_editor() as editor:
+            for model in (ChartOfAccount, ChartOfAccountChange, SyncGeneration, SyncFlight):
+                editor.create_model(model)
+        upsert_accounts([make_account(uuid.uuid4(), f"{i:04}", f"Account {i}") for i in range(50)])
+        clear_page_cache()
+
+    def use_file_database(self):
+        connections[DEFAULT_DB_ALIAS] = type(self.original)(self.settings_dict)
+
+    def restore_database(self):
+        connections[DEFAULT_DB_ALIAS].close()
+        connections[DEFAULT_DB_ALIAS] = self.original
+        clear_page_cache()
+
+    def start_sync(self, accounts, tenant_id="", started=None):
+        """
+        Stream ``accounts`` into the database on another thread, slowly
+        enough that the sync transaction stays open for a while.
+        """
+        errors = []
+
+        def slow():
+            for number, account in enumerate(accounts):
+                if number == 10 and started is not None:
+                    started.set()
+                time.sleep(0.005)
+                yield account
+
+        def run():
+            self.use_file_database()
+            try:
+                upsert_account_stream(slow(), tenant_id=tenant_id, batch_size=10)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections[DEFAULT_DB_ALIAS].close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread, errors
+
+    def test_connection_uses_wal(self):
+        """
+        Test that SQLite connections are opened in WAL mode.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+
+    def test_reads_during_sync(self):
+        """
+        Test that exports keep being served while a sync is writing, and see
+        the chart as it was before the sync until it commits.
+        """
+        started = threading.Event()
+        new_accounts = [make_account(uuid.uuid4(), f"9{i:03}", f"New {i}") for i in range(100)]
+        thread, errors = self.start_sync(new_accounts, started=started)
+        self.assertTrue(started.wait(5))
+
+        counts = []
+        while thread.is_alive():
+            response = self.client.get("/api/v1/xero/accounts/export/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            counts.append(len(b"".join(response.streaming_content).splitlines()))
+        thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(counts[0], 50)
+        self.assertLessEqual(set(counts), {50, 150})
+        self.assertEqual(ChartOfAccount.objects.count(), 150)
+
+    def test_concurrent_syncs_wait_for_each_other(self):
+        """
+        Test that a second sync waits for the write lock instead of failing
+        with "database is locked".
+        """
+        syncs = [
+            self.start_sync(
+                [make_account(uuid.uuid4(), f"{i:04}", f"{tenant_id} {i}") for i in range(50)], tenant_id=tenant_id
+            )
+            for tenant_id in ("tenant-a", "tenant-b")
+        ]
+        for thread, errors in syncs:
+            thread.join()
+            self.assertEqual(errors, [])
+        self.assertEqual(ChartOfAccount.objects.count(), 150)
+
+    def test_concurrent_calls_share_one_run(self):
+        """
+        Test that calls arriving while a sync runs wait for it and return its
+        result, both within a process and across processes (simulated by
+        giving every call its own process lock).
+        """
+        for name, lock in (("threads", singleflight._lock), ("processes", lambda key: threading.Lock())):
+            with self.subTest(name), patch.object(singleflight, "_lock", lock):
+                runs, results = [], []
+                barrier = threading.Barrier(4)
+
+                def run():
+                    runs.append(1)
+                    time.sleep(0.3)
+                    return {"runs": len(runs)}
+
+                def call():
+                    self.use_file_database()
+                    try:
+                        barrier.wait()
+                        results.append(singleflight.run_once("Accounts", name, run, fresh_for=0))
+                    finally:
+                        connections[DEFAULT_DB_ALIAS].close()
+
+                threads = [threading.Thread(target=call) for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+                self.assertEqual(len(runs), 1)
+                self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+                self.assertEqual({result["runs"] for result, _ in results}, {1})
+
+    def test_waiting_thread_gives_up_after_wait(self):
+        """
+        Test that a thread waiting on a sync run by another thread of the same
+        process gives up after ``wait``, rather than when the sync ends.
+        """
+        started, done = threading.Event(), threading.Event()
+
+        def run():
+            started.set()
+            done.wait(5)
+            return {}
+
+        def lead():
+            self.use_file_database()
+            try:
+                singleflight.run_once("Accounts", "waiting", run, fresh_for=0)
+            finally:
+                connections[DEFAULT_DB_ALIAS].close()
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        self.addCleanup(leader.join)
+        self.addCleanup(done.set)
+        self.assertTrue(started.wait(5))
+
+        began = time.monotonic()
+        with self.assertRaises(SyncInProgressError):
+            singleflight.run_once("Accounts", "waiting", lambda: {}, fresh_for=0, wait=0.2)
+        self.assertLess(time.monotonic() - began, 2)
+
+
+@override_settings(XERO_SYNC_FRESH_SECONDS=0)
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Upper bounds on the SQL queries of every Xero endpoint.
+
+    Each endpoint is called with several dataset sizes. Reads must stay flat;
+    writes may only grow with the number of bulk batches, never per row, so
+    an N+1 pattern fails at the larger sizes with the offending SQL listed.
+    """
+    SIZES = [1, 10, 100, 1000]
+
+    def setUp(self):
+        """
+        Start a stand-in Xero server and store a token for it.
+        """
+        self.server = FakeXeroServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(
+            XERO_API_BASE_URL=self.server.url,
+            XERO_IDENTITY_BASE_URL=self.server.url,
+            XERO_SYNC_IN_BACKGROUND=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.token = XeroToken.objects.create(
+            access_token="valid_access_token", refresh_token="valid_refresh_token", expires_in=3600
+        )
+        self.server.add("POST", "/connect/token", json={
+            "access_token": "new_access_token", "refresh_token": "new_refresh_token", "expires_in": 1800,
+        })
+
+    def get(self, url, params=None, **headers):
+        """
+        Call an endpoint, failing unless it succeeded, and consume the body
+        of a streaming response so its queries are counted.
+        """
+        response = self.client.get(url, params, **headers)
+        self.assertLess(response.status_code, 400)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def aget(self, url, params=None):
+        """
+        Call an async endpoint from the test thread, failing unless it succeeded.
+        """
+        response = async_to_sync(self.async_client.get)(url, params)
+        self.assertLess(response.status_code, 400)
+        return response
+
+    def batches(self, model, size):
+        """
+        Return the statements a bulk write of ``size`` rows of ``model`` needs
+        on this database, which caps the parameters of a single query.
+        """
+        fields = model._meta.concrete_fields
+        return math.ceil(size / connection.ops.bulk_batch_size(fields, [None] * size))
+
+    def seed_accounts(self, size):
+        """
+        Replace the stored accounts with ``size`` new ones.
+        """
+        ChartOfAccount.objects.all().delete()
+        ChartOfAccount.objects.bulk_create(
+            ChartOfAccount(
+                account_id=uuid.uuid4(),
+                code=f"{i:05}",
+                name=f"Account {i:05}",
+                type="EXPENSE",
+                updated_date_utc=timezone.now(),
+            )
+            for i in range(size)
+        )
+        clear_page_cache()
+
+    def serve_accounts(self, size):
+        """
+        Empty the table and serve ``size`` accounts from the fake Xero server.
+        """
+        ChartOfAccount.objects.all().delete()
+        XeroSyncState.objects.all().delete()
+        accounts = [make_account(uuid.uuid4(), f"{i:05}", f"Account {i:05}") for i in range(size)]
+        self.server.routes.clear()
+        self.server.add("GET", "/api.xro/2.0/Accounts", json={"Accounts": accounts})
+
+    def serve_connections(self, size):
+        """
+        Serve a token and ``size`` connected tenants for the callback.
+        """
+        XeroToken.objects.all().delete()
+        self.server.routes.clear()
+        self.server.add("POST", "/connect/token", json={
+            "access_token": "new_access_token", "refresh_token": "new_refresh_token", "expires_in": 1800,
+        })
+        self.server.add("GET", "/connections", json=[
+            {"tenantId": f"tenant-{i}", "tenantName": f"Org {i}"} for i in range(size)
+        ])
+
+    def test_login(self):
+        """
+        Test that the login redirect does not touch the database.
+        """
+        with self.assertMaxQueries(0):
+            self.get("/api/v1/xero/login/")
+
+    def test_callback(self):
+        """
+        Test that storing the tenants of an authorization does not query per tenant.
+        """
+        self.assertQueryBudget(
+            lambda size: 5 + self.batches(XeroToken, size), self.SIZES, self.serve_connections,
+            lambda: self.get("/api/v1/xero/callback/", {"code": "code"}),
+        )
+
+    def test_async_callback(self):
+        """
+        Test that the async callback stores the tenants without a query per tenant.
+        """
+        self.assertQueryBudget(
+            lambda size: 5 + self.batches(XeroToken, size), self.SIZES, self.serve_connections,
+            lambda: self.aget("/api/v1/xero/async/callback/", {"code": "code"}),
+        )
+
+    def test_token_refresh(self):
+        """
+        Test that a token refresh costs the same whatever is stored.
+        """
+        self.assertQueryBudget(
+            3, self.SIZES, self.seed_accounts,
+            lambda: self.get("/api/v1/xero/token/refresh/"),
+        )
+
+    def test_async_token_refresh(self):
+        """
+        Test that an async token refresh costs the same whatever is stored.
+        """
+        self.assertQueryBudget(
+            3, self.SIZES, self.seed_accounts,
+            lambda: self.aget("/api/v1/xero/async/token/refresh/"),
+        )
+
+    def test_accounts_update(self):
+        """
+        Test that a sync only issues a statement per bulk batch, not per account,
+        for both the buffered and the streaming update, change log included.
+        """
+        for params in ({"full": "true"}, {"full": "true", "stream": "true"}):
+            with self.subTest(**params):
+                self.assertQueryBudget(
+                    lambda size: 26 + self.batches(ChartOfAccount, size) + self.batches(ChartOfAccountChange, size), self.SIZES, self.serve_accounts,
+                    lambda: self.get("/api/v1/xero/accounts/update/", params),
+                )
+
+    def test_accounts_resync(self):
+        """
+        Test that reconciling unchanged accounts only issues a statement per batch.
+        """
+        def setup(size):
+            self.serve_accounts(size)
+            self.get("/api/v1/xero/accounts/update/", {"full": "true"})
+
+        self.assertQueryBudget(
+            lambda size: 16 + self.batches(ChartOfAccount, size), self.SIZES, setup,
+            lambda: self.get("/api/v1/xero/accounts/update/", {"full": "true"}),
+        )
+
+    def test_async_accounts_update(self):
+        """
+        Test that the async sync only issues a statement per bulk batch.
+        """
+        self.assertQueryBudget(
+            lambda size: 26 + self.batches(ChartOfAccount, size) + self.batches(ChartOfAccountChange, size), self.SIZES, self.serve_accounts,
+            lambda: self.aget("/api/v1/xero/async/accounts/update/", {"full": "true"}),
+        )
+
+    def test_entity_update(self):
+        """
+        Test that a paged entity sync costs a fixed number of queries per page,
+        not per row.
+        """
+        def setup(size):
+            Contact.objects.all().delete()
+            XeroSyncState.objects.all().delete()
+            contacts = [make_contact(uuid.uuid4(), f"Contact {i:05}") for i in range(size)]
+            self.server.add_pages("/api.xro/2.0/Contacts", "Contacts", contacts)
+
+        self.assertQueryBudget(
+            lambda size: 24 + 12 * max(math.ceil(size / settings.XERO_SYNC_PAGE_SIZE), 1), self.SIZES, setup,
+            lambda: self.get("/api/v1/xero/entities/contacts/update/", {"full": "true"}),
+        )
+
+    def test_accounts_snapshot(self):
+        """
+        Test that the snapshot is served without queries at every table size,
+        at most re-reading the sync generation.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        def setup(size):
+            self.seed_accounts(size)
+            with transaction.atomic():
+                bump_generation(ACCOUNTS)
+            self.get("/api/v1/xero/accounts/snapshot/")
+
+        with override_settings(XERO_SNAPSHOT_DIR=directory.name):
+            self.assertQueryBudget(
+                1, self.SIZES, setup,
+                lambda: self.get("/api/v1/xero/accounts/snapshot/", HTTP_ACCEPT_ENCODING="gzip"),
+            )
+
+    def test_account_changes(self):
+        """
+        Test that a page of the change feed costs a query per batch of
+        accounts, not per entry.
+        """
+        def setup(size):
+            self.seed_accounts(size)
+            ChartOfAccountChange.objects.all().delete()
+            ChartOfAccountChange.objects.bulk_create(
+                ChartOfAccountChange(account_id=account_id, operation="updated")
+                for account_id in ChartOfAccount.objects.values_list("account_id", flat=True)
+            )
+
+        self.assertQueryBudget(
+            lambda size: 2 + math.ceil(size / 500), self.SIZES, setup,
+            lambda: self.get("/api/v1/xero/accounts/changes/", {"page_size": 1000}),
+        )
+
+    @override_settings(XERO_WEBHOOK_KEY="webhook-key")
+    def test_webhook(self):
+        """
+        Test that storing a webhook delivery does not query per event.
+        """
+        def setup(size):
+            XeroWebhookEvent.objects.all().delete()
+            SyncJob.objects.all().delete()
+            self.body = json.dumps({"events": [webhook_event(uuid.uuid4()) for _ in range(size)]}).encode()
+
+        def deliver():
+            signature = base64.b64encode(hmac.new(b"webhook-key", self.body, hashlib.sha256).digest()).decode()
+            response = self.client.generic(
+                "POST", "/api/v1/xero/webhooks/", self.body, content_type="application/json",
+                HTTP_X_XERO_SIGNATURE=signature,
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertQueryBudget(
+            lambda size: 3 + self.batches(XeroWebhookEvent, size), self.SIZES, setup, deliver
+        )
+
+    def test_accounts_list(self):
+        """
+        Test that listing accounts costs the same at every table size, with
+        keyset and numbered pages.
+        """
+        for params in ({"page_size": 200}, {"page_size": 200, "page": 1}, {"type": "EXPENSE"}):
+            with self.subTest(**params):
+                self.assertQueryBudget(
+                    3, self.SIZES, self.seed_accounts,
+                    lambda: self.get("/api/v1/xero/accounts/all/", params),
+                )
+
+    @override_settings(XERO_EXPORT_CHUNK_SIZE=100)
+    def test_accounts_export(self):
+        """
+        Test that an export reads the table in chunks rather than row by row.
+        """
+        self.assertQueryBudget(
+            lambda size: 2 + size // settings.XERO_EXPORT_CHUNK_SIZE, self.SIZES, self.seed_accounts,
+            lambda: self.get("/api/v1/xero/accounts/export/"),
+        )
+
+    def test_sync_job_status(self):
+        """
+        Test that polling a job costs the same whatever is stored.
+        """
+        job = enqueue("accounts", {"full": True})
+        self.assertQueryBudget(
+            1, self.SIZES, self.seed_accounts,
+            lambda: self.get(f"/api/v1/xero/jobs/{job.pk}/"),
+        )
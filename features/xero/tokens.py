@@ -0,0 +1,417 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from config.env import env
+from .client import get_async_client, get_client
+from . import ratelimit
+from .exceptions import NoTokenError, RateLimitedError, TokenRefreshError
+from .metrics import token_refreshes
+from .models import XeroToken
+
+XERO_TOKEN_PATH = "connect/token"
+XERO_CONNECTIONS_PATH = "connections"
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    """
+    Immutable snapshot of a XeroToken row held in the per-process cache.
+    """
+    pk: int
+    tenant_id: str
+    access_token: str
+    expires_at: datetime
+    version: int
+
+    @classmethod
+    def from_model(cls, token):
+        return cls(token.pk, token.tenant_id, token.access_token, token.expires_at, token.version)
+
+    def expires_soon(self):
+        if self.expires_at is None:
+            return False
+        margin = timedelta(seconds=settings.XERO_TOKEN_REFRESH_MARGIN)
+        return self.expires_at - timezone.now() <= margin
+
+    def headers(self):
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        if self.tenant_id:
+            headers["Xero-tenant-id"] = self.tenant_id
+        return headers
+
+
+# Cached tokens keyed by tenant id. ``None`` is the default connection, used
+# by callers that do not name a tenant.
+_cache = {}
+_refresh_locks = defaultdict(threading.Lock)
+_refresh_locks_guard = threading.Lock()
+_async_refresh_locks = weakref.WeakKeyDictionary()
+
+
+def clear_token_cache():
+    _cache.clear()
+
+
+@receiver(post_save, sender=XeroToken)
+@receiver(post_delete, sender=XeroToken)
+def _clear_token_cache_on_change(**kwargs):
+    clear_token_cache()
+
+
+def token_expiry(expires_in):
+    return timezone.now() + timedelta(seconds=int(expires_in))
+
+
+def store_connections(token_data, connections):
+    """
+    Save the tokens from an authorization as one XeroToken per connected tenant.
+
+    Xero issues one token set per authorization, valid for every organisation
+    the user connected, so each tenant row gets a copy. Rows saved before
+    tenants were tracked are replaced.
+
+    Args:
+        token_data: The token endpoint response.
+        connections: The ``/connections`` response listing the tenants.
+
+    Returns:
+        list: ``{"tenant_id", "tenant_name"}`` for each stored tenant.
+    """
+    values = {
+        "access_token": token_data["access_token"],
+        "refresh_token": token_data["refresh_token"],
+        "expires_in": token_data["expires_in"],
+        "expires_at": token_expiry(token_data["expires_in"]),
+        "refresh_lock_until": None,
+    }
+    tenants = {
+        connection["tenantId"]: connection.get("tenantName") or "" for connection in connections
+    }
+    with transaction.atomic():
+        XeroToken.objects.filter(tenant_id=None).delete()
+        # Load the existing rows once and write them back in bulk, rather
+        # than an update_or_create per tenant.
+        existing = XeroToken.objects.in_bulk(list(tenants), field_name="tenant_id")
+        updated, created = [], []
+        for tenant_id, tenant_name in tenants.items():
+            token = existing.get(tenant_id) or XeroToken(tenant_id=tenant_id)
+            for field, value in {**values, "tenant_name": tenant_name}.items():
+                setattr(token, field, value)
+            (updated if token.pk else created).append(token)
+        if updated:
+            XeroToken.objects.bulk_update(updated, [*values, "tenant_name"])
+        if created:
+            XeroToken.objects.bulk_create(created)
+    # Bulk writes do not send post_save, so drop cached tokens here.
+    clear_token_cache()
+    return [{"tenant_id": tenant_id, "tenant_name": tenant_name} for tenant_id, tenant_name in tenants.items()]
+
+
+def _refresh_lock(tenant_id):
+    with _refresh_locks_guard:
+        return _refresh_locks[tenant_id]
+
+
+def get_access_token(tenant_id=None, force_refresh=False, stale=None):
+    """
+    Return a valid access token for a tenant, refreshing it if required.
+
+    Tokens are served from a per-process cache, so the common path does not
+    touch the database. A token is refreshed proactively once it is within
+    ``XERO_TOKEN_REFRESH_MARGIN`` seconds of expiry, or unconditionally when
+    ``force_refresh`` is set (e.g. after a 401). Only one thread per process,
+    and only one process at a time via a lease on the token row, calls Xero;
+    everyone else waits for and reuses the new token.
+
+    Args:
+        tenant_id: The Xero tenant. Defaults to the first stored connection.
+        force_refresh: Refresh even if the token does not look expired.
+        stale: The token that was rejected by Xero. If another worker has
+            already replaced it, the replacement is returned without a refresh.
+
+    Returns:
+        CachedToken: The current access token.
+
+    Raises:
+        NoTokenError: No Xero token has been stored for the tenant.
+        TokenRefreshError: Xero rejected the refresh request.
+    """
+    cached = _cache.get(tenant_id)
+    if cached is not None and not force_refresh and not cached.expires_soon():
+        return cached
+
+    with _refresh_lock(tenant_id):
+        cached = _cache.get(tenant_id)
+        if cached is not None and _is_usable(cached, force_refresh, stale):
+            return cached
+        return _load_or_refresh(tenant_id, force_refresh, stale)
+
+
+def _is_usable(token, force_refresh, stale):
+    if force_refresh:
+        return stale is not None and token.version != stale.version
+    return not token.expires_soon()
+
+
+def _load_token(tenant_id):
+    if tenant_id is None:
+        return XeroToken.objects.order_by("pk").first()
+    return XeroToken.objects.filter(tenant_id=tenant_id).first()
+
+
+def _claim_refresh(tenant_id, force_refresh, stale):
+    """
+    Load the token row and, if it needs refreshing, try to take the refresh lease.
+
+    Returns:
+        tuple: ``(outcome, token)``. ``"usable"`` with a CachedToken that can be
+        used as is, ``"leased"`` with the XeroToken row this worker must now
+        refresh, or ``"wait"`` with the CachedToken another worker is replacing.
+    """
+    token = _load_token(tenant_id)
+    if token is None:
+        raise NoTokenError()
+    current = CachedToken.from_model(token)
+    if _is_usable(current, force_refresh, stale):
+        _cache[tenant_id] = current
+        return "usable", current
+
+    now = timezone.now()
+    acquired = XeroToken.objects.filter(
+        Q(refresh_lock_until__isnull=True) | Q(refresh_lock_until__lt=now),
+        pk=token.pk,
+        version=token.version,
+    ).update(refresh_lock_until=now + timedelta(seconds=settings.XERO_TOKEN_REFRESH_LEASE))
+    return ("leased", token) if acquired else ("wait", current)
+
+
+def _refresh_request(token):
+    data = {
+        "grant_type": "refresh_token",
+        "refresh_token": token.refresh_token,
+        "client_id": env.str("XERO_CLIENT_ID"),
+        "client_secret": env.str("XERO_CLIENT_SECRET"),
+    }
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    return data, headers
+
+
+def _release_lease(token):
+    XeroToken.objects.filter(pk=token.pk).update(refresh_lock_until=None)
+
+
+def _store_refresh(tenant_id, token, status_code, response_data):
+    """
+    Save the outcome of a refresh request and release the lease.
+
+    One authorization can cover several tenants, all sharing a refresh token.
+    Xero rotates that token on every refresh, so every row that held it is
+    updated together.
+    """
+    if status_code != 200 or "access_token" not in response_data:
+        token_refreshes.inc(outcome="rejected")
+        _release_lease(token)
+        raise TokenRefreshError(response_data)
+    token_refreshes.inc(outcome="success")
+
+    expires_at = token_expiry(response_data["expires_in"])
+    XeroToken.objects.filter(Q(pk=token.pk) | Q(refresh_token=token.refresh_token)).update(
+        access_token=response_data["access_token"],
+        refresh_token=response_data["refresh_token"],
+        expires_in=response_data["expires_in"],
+        expires_at=expires_at,
+        refresh_lock_until=None,
+        version=F("version") + 1,
+    )
+    clear_token_cache()
+    _cache[tenant_id] = CachedToken(
+        token.pk, token.tenant_id, response_data["access_token"], expires_at, token.version + 1
+    )
+    return _cache[tenant_id]
+
+
+def _wait_timeout():
+    return TokenRefreshError({"error": "Timed out waiting for another worker to refresh the token"})
+
+
+def _load_or_refresh(tenant_id, force_refresh, stale):
+    deadline = time.monotonic() + settings.XERO_TOKEN_REFRESH_LEASE * 2
+    while True:
+        outcome, token = _claim_refresh(tenant_id, force_refresh, stale)
+        if outcome == "usable":
+            return token
+        if outcome == "leased":
+            return _refresh(tenant_id, token)
+
+        # Another worker holds the lease; wait for it to publish a new version.
+        if time.monotonic() > deadline:
+            raise _wait_timeout()
+        stale, force_refresh = token, True
+        time.sleep(0.1)
+
+
+def _refresh(tenant_id, token):
+    """
+    Exchange the refresh token for a new access token while holding the lease.
+    """
+    data, headers = _refresh_request(token)
+    try:
+        client = get_client()
+        response = client.post(client.identity_url(XERO_TOKEN_PATH), data=data, headers=headers)
+        response_data = response.json()
+    except Exception:
+        token_refreshes.inc(outcome="error")
+        _release_lease(token)
+        raise
+    return _store_refresh(tenant_id, token, response.status_code, response_data)
+
+
+def _limited_get(client, url, headers, token, **kwargs):
+    """
+    Send one GET within the shared rate limits of the token's tenant.
+
+    Waits for capacity first, and raises instead of returning a 429 that
+    Xero's own retries could not get past.
+    """
+    headers = {**headers, **token.headers()}
+    if not settings.XERO_RATE_LIMIT_ENABLED:
+        return client.get(url, headers=headers, **kwargs)
+
+    slot = ratelimit.acquire(token.tenant_id)
+    try:
+        response = client.get(url, headers=headers, **kwargs)
+    finally:
+        ratelimit.release(token.tenant_id, slot)
+    return ratelimit.check_response(token.tenant_id, response)
+
+
+def xero_get(url, headers=None, tenant_id=None, **kwargs):
+    """
+    Make an authorized GET request to the Xero API on behalf of a tenant.
+
+    Adds the bearer token and ``Xero-tenant-id`` headers, and on a 401
+    refreshes the token once and retries. The final response is returned
+    either way. Calls are paced by the shared rate limiter in
+    ``features.xero.ratelimit``.
+
+    Raises:
+        NoTokenError: No Xero token has been stored for the tenant.
+        TokenRefreshError: A proactive refresh of an expiring token failed.
+        RateLimitedError: Xero's rate limits leave no room for the call
+            within ``XERO_RATE_LIMIT_MAX_WAIT``.
+    """
+    token = get_access_token(tenant_id)
+    client = get_client()
+    headers = dict(headers or {})
+
+    response = _limited_get(client, url, headers, token, **kwargs)
+    if response.status_code != 401:
+        return response
+
+    try:
+        token = get_access_token(tenant_id, force_refresh=True, stale=token)
+    except TokenRefreshError:
+        return response
+    # Release the connection of a streamed 401 before retrying.
+    response.close()
+    return _limited_get(client, url, headers, token, **kwargs)
+
+
+def _async_refresh_lock(tenant_id):
+    loop = asyncio.get_running_loop()
+    locks = _async_refresh_locks.setdefault(loop, {})
+    if tenant_id not in locks:
+        locks[tenant_id] = asyncio.Lock()
+    return locks[tenant_id]
+
+
+async def aget_access_token(tenant_id=None, force_refresh=False, stale=None):
+    """
+    Async version of ``get_access_token``.
+
+    The cached fast path never leaves the event loop. Database work runs in
+    a thread via ``sync_to_async`` and the refresh call uses the async client,
+    with the same row lease deduplicating refreshes across workers.
+    """
+    cached = _cache.get(tenant_id)
+    if cached is not None and not force_refresh and not cached.expires_soon():
+        return cached
+
+    async with _async_refresh_lock(tenant_id):
+        cached = _cache.get(tenant_id)
+        if cached is not None and _is_usable(cached, force_refresh, stale):
+            return cached
+
+        deadline = time.monotonic() + settings.XERO_TOKEN_REFRESH_LEASE * 2
+        while True:
+            outcome, token = await sync_to_async(_claim_refresh)(tenant_id, force_refresh, stale)
+            if outcome == "usable":
+                return token
+            if outcome == "leased":
+                return await _arefresh(tenant_id, token)
+
+            if time.monotonic() > deadline:
+                raise _wait_timeout()
+            stale, force_refresh = token, True
+            await asyncio.sleep(0.1)
+
+
+async def _arefresh(tenant_id, token):
+    data, headers = _refresh_request(token)
+    try:
+        client = get_async_client()
+        response = await client.post(client.identity_url(XERO_TOKEN_PATH), data=data, headers=headers)
+        response_data = response.json()
+    except Exception:
+        token_refreshes.inc(outcome="error")
+        await sync_to_async(_release_lease)(token)
+        raise
+    return await sync_to_async(_store_refresh)(tenant_id, token, response.status_code, response_data)
+
+
+async def _alimited_get(client, url, headers, token, **kwargs):
+    headers = {**headers, **token.headers()}
+    if not settings.XERO_RATE_LIMIT_ENABLED:
+        return await client.get(url, headers=headers, **kwargs)
+
+    slot = await ratelimit.aacquire(token.tenant_id)
+    try:
+        response = await client.get(url, headers=headers, **kwargs)
+    finally:
+        await sync_to_async(ratelimit.release)(token.tenant_id, slot)
+    retry_after = await sync_to_async(ratelimit.record_response)(token.tenant_id, response)
+    if retry_after is not None:
+        raise RateLimitedError(retry_after)
+    return response
+
+
+async def axero_get(url, headers=None, tenant_id=None, **kwargs):
+    """
+    Async version of ``xero_get``.
+    """
+    token = await aget_access_token(tenant_id)
+    client = get_async_client()
+    headers = dict(headers or {})
+
+    response = await _alimited_get(client, url, headers, token, **kwargs)
+    if response.status_code != 401:
+        return response
+
+    try:
+        token = await aget_access_token(tenant_id, force_refresh=True, stale=token)
+    except TokenRefreshError:
+        return response
+    return await _alimited_get(client, url, headers, token, **kwargs)
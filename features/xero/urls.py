@@ -1,10 +1,21 @@
 from django.urls import path
+from .async_views import (
+    AsyncXeroCallbackView,
+    AsyncRefreshTokenView,
+    AsyncUpdateChartOfAccountsView,
+)
 from .views import (
     XeroLoginAPIView,
     XeroCallbackAPIView,
     RefreshTokenAPIView,
     UpdateChartOfAccountsAPIView,
     ChartOfAccountsAllAPIView,
+    ChartOfAccountsExportAPIView,
+    ChartOfAccountChangesAPIView,
+    ChartOfAccountsSnapshotAPIView,
+    SyncJobAPIView,
+    EntitySyncAPIView,
+    XeroWebhookAPIView,
 )
 
 urlpatterns = [
@@ -21,4 +32,29 @@ urlpatterns = [
         ChartOfAccountsAllAPIView.as_view(),
         name="xero-accounts-all"
     ),
+    path(
+        "accounts/export/",
+        ChartOfAccountsExportAPIView.as_view(),
+        name="xero-accounts-export"
+    ),
+    path(
+        "accounts/snapshot/",
+        ChartOfAccountsSnapshotAPIView.as_view(),
+        name="xero-accounts-snapshot"
+    ),
+    path(
+        "accounts/changes/",
+        ChartOfAccountChangesAPIView.as_view(),
+        name="xero-accounts-changes"
+    ),
+    path("entities/<str:entity>/update/", EntitySyncAPIView.as_view(), name="xero-entity-update"),
+    path("webhooks/", XeroWebhookAPIView.as_view(), name="xero-webhooks"),
+    path("jobs/<uuid:job_id>/", SyncJobAPIView.as_view(), name="xero-sync-job"),
+    path("async/callback/", AsyncXeroCallbackView.as_view(), name="xero-async-callback"),
+    path("async/token/refresh/", AsyncRefreshTokenView.as_view(), name="xero-async-refresh-token"),
+    path(
+        "async/accounts/update/",
+        AsyncUpdateChartOfAccountsView.as_view(),
+        name="xero-async-accounts-update"
+    ),
 ]
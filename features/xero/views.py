@@ -1,16 +1,130 @@
+import json
+import math
+
 from rest_framework.views import APIView
-from rest_framework.generics import ListAPIView
+from rest_framework.generics import GenericAPIView, ListAPIView, RetrieveAPIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.settings import api_settings
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
+from django.utils.text import compress_sequence
+from django.views.decorators.http import condition
 from config.env import env
-import requests
-from .models import XeroToken, ChartOfAccount
-from .serializers import ChartOfAccountSerializer
+from features.common.db import read_from_replica
+from .caching import (
+    ACCOUNTS, accounts_etag, accounts_last_modified, get_generation, page_cache, page_cache_key, replicas_caught_up,
+)
+from .changes import changes_since, get_horizon
+from .client import get_client
+from .entities import ENTITIES
+from .entity_sync import sync_entity_once
+from .breaker import latency_budget
+from .exceptions import (
+    CircuitOpenError, LatencyBudgetExceededError, NoTokenError, RateLimitedError, SyncInProgressError,
+    TokenRefreshError, XeroAPIError, XeroUnauthorizedError,
+)
+from .exports import EXPORT_CONTENT_TYPES, EXPORTERS
+from .filters import ChartOfAccountFilterBackend
+from .jobs import enqueue
+from .metrics import sync_stage_duration
+from .models import ChartOfAccount, ChartOfAccountChange, SyncJob
+from .pagination import AccountKeysetPagination, AccountPageNumberPagination
+from .renderers import FastJSONRenderer
+from .serializers import ChartOfAccountSerializer, SyncJobSerializer, account_values_serializer, parse_fields
+from .snapshots import get_snapshot, negotiate_encoding
+from .sync import BATCH_SIZE, sync_all_tenants, sync_chart_of_accounts_once
+from .tokens import XERO_CONNECTIONS_PATH, XERO_TOKEN_PATH, get_access_token, store_connections
+from .webhooks import store_events, verify_signature
 
 XERO_AUTH_URL = "https://login.xero.com/identity/connect/authorize"
-XERO_TOKEN_URL = "https://identity.xero.com/connect/token"
-XERO_ACCOUNTS_URL = "https://api.xero.com/api.xro/2.0/Accounts"
+
+def xero_unavailable_response(exc):
+    """
+    The fast answer while a Xero endpoint's circuit breaker is open.
+    """
+    return Response(
+        {"error": str(exc), "degraded": True},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+def budget_exceeded_response(exc):
+    return Response(exc.details, status=status.HTTP_504_GATEWAY_TIMEOUT)
+
+
+def sync_in_progress_response(exc):
+    return Response(
+        {"error": str(exc)},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+def serialize_accounts(serializer, account_ids):
+    """
+    Serialize the accounts with the given ids, in that order, from the
+    database; used to answer a request with the result of another's sync.
+    """
+    extra = [] if "account_id" in serializer.field_names else ["account_id"]
+    rows = {}
+    for start in range(0, len(account_ids), BATCH_SIZE):
+        batch = ChartOfAccount.objects.filter(account_id__in=account_ids[start:start + BATCH_SIZE])
+        for row in serializer.serialize_rows(serializer.values(batch, *extra)):
+            rows[str(row["account_id"])] = row
+    data = [rows[account_id] for account_id in account_ids if account_id in rows]
+    for row in data:
+        for name in extra:
+            del row[name]
+    return data
+
+def sync_response_data(result, ran, serializer, echo):
+    """
+    Build the body answering an inline Chart of Accounts sync, for both the
+    sync and the async update view.
+
+    Args:
+        result: The shared result from ``sync_chart_of_accounts_once``.
+        ran: The SyncResult when this request ran the sync itself, else None.
+        serializer: Serializes the accounts, limited to ``?fields=``.
+        echo: Return the accounts rather than only the counts.
+    """
+    if result["summary"]["not_modified"]:
+        return {"message": "Chart of Accounts is up to date", "data": []}
+    if not echo:
+        return {"message": "Chart of Accounts synced successfully", "summary": result["summary"]}
+
+    with sync_stage_duration.time(stage="serialize"):
+        if ran is not None:
+            data = serializer.serialize_objects(ran.accounts)
+        else:
+            data = serialize_accounts(serializer, result["account_ids"])
+    return {"message": "Chart of Accounts retrieved successfully", "data": data}
+
+class LatencyBudgetMixin:
+    """
+    Give a view's Xero calls the latency budget in the setting named by
+    ``latency_budget_setting`` (see ``breaker.latency_budget``).
+    """
+    latency_budget_setting = None
+
+    def dispatch(self, request, *args, **kwargs):
+        seconds = getattr(settings, self.latency_budget_setting)
+        if self.view_is_async:
+            return self._dispatch_async(seconds, request, *args, **kwargs)
+        with latency_budget(seconds):
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _dispatch_async(self, seconds, request, *args, **kwargs):
+        with latency_budget(seconds):
+            return await super().dispatch(request, *args, **kwargs)
 
 class XeroLoginAPIView(APIView):
     """
@@ -27,24 +141,28 @@ class XeroLoginAPIView(APIView):
             "response_type": "code",
             "client_id": env.str("XERO_CLIENT_ID"),
             "redirect_uri": env.str("XERO_REDIRECT_URI"),
-            "scope": "accounting.settings.read offline_access",
+            "scope": "accounting.settings.read accounting.contacts.read accounting.transactions.read offline_access",
         }
         auth_url = f"{XERO_AUTH_URL}?"+ "&".join([f"{k}={v}" for k, v in params.items()])
         return Response({"redirect_url": auth_url}, status=status.HTTP_200_OK)
 
 
-class XeroCallbackAPIView(APIView):
+class XeroCallbackAPIView(LatencyBudgetMixin, APIView):
     """
     Handle the Xero authorization code callback.
 
     This view handles the authorization code callback from Xero after the user
     has authorized the app. It exchanges the authorization code for an access
-    token and refresh token, and stores them in the database.
+    token and refresh token, looks up the connected organisations with Xero's
+    connections endpoint, and stores one token per tenant in the database.
+    The Xero calls share ``XERO_CALLBACK_LATENCY_BUDGET``.
 
     Returns:
         Response: A response object containing the result of the authentication
         flow.
     """
+    latency_budget_setting = "XERO_CALLBACK_LATENCY_BUDGET"
+
     def get(self, request):
         code = request.GET.get("code")
         if not code:
@@ -57,22 +175,30 @@ class XeroCallbackAPIView(APIView):
             "client_id": env.str("XERO_CLIENT_ID"),
             "client_secret": env.str("XERO_CLIENT_SECRET"),
         }
-        response = requests.post(XERO_TOKEN_URL, data=data).json()
-
-        if "error" in response:
-            return Response({"error": response.get("error_description", "OAuth token exchange failed")}, status=status.HTTP_400_BAD_REQUEST)
-
-        XeroToken.objects.update_or_create(
-            id=1,
-            defaults={
-                "access_token": response["access_token"],
-                "refresh_token": response["refresh_token"],
-                "expires_in": response["expires_in"],
-            },
-        )
-        return Response({"message": "Xero authentication successful"}, status=status.HTTP_200_OK)
+        client = get_client()
+        try:
+            response = client.post(client.identity_url(XERO_TOKEN_PATH), data=data).json()
+
+            if "error" in response:
+                return Response({"error": response.get("error_description", "OAuth token exchange failed")}, status=status.HTTP_400_BAD_REQUEST)
 
-class RefreshTokenAPIView(APIView):
+            connections = client.get(
+                client.api_url(XERO_CONNECTIONS_PATH),
+                headers={"Authorization": f"Bearer {response['access_token']}", "Accept": "application/json"},
+            )
+        except CircuitOpenError as exc:
+            return xero_unavailable_response(exc)
+        except LatencyBudgetExceededError as exc:
+            return budget_exceeded_response(exc)
+        if connections.status_code != 200:
+            return Response({"error": "Could not list Xero connections"}, status=status.HTTP_502_BAD_GATEWAY)
+
+        tenants = store_connections(response, connections.json())
+        if not tenants:
+            return Response({"error": "No Xero organisation was connected"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": "Xero authentication successful", "tenants": tenants}, status=status.HTTP_200_OK)
+
+class RefreshTokenAPIView(LatencyBudgetMixin, APIView):
     """
     Retrieve and refresh the Xero access token using the stored refresh token.
 
@@ -83,6 +209,11 @@ class RefreshTokenAPIView(APIView):
     with the new access token. If the refresh fails, it returns an error message
     with details of the failure.
 
+    Tokens are also refreshed automatically shortly before they expire and after
+    a 401 from Xero, so calling this endpoint is rarely necessary. Pass
+    ``?tenant_id=`` to pick the tenant; the first connection is used otherwise.
+    The refresh is limited to ``XERO_REFRESH_LATENCY_BUDGET``.
+
     Args:
         request: The HTTP request object.
 
@@ -91,41 +222,29 @@ class RefreshTokenAPIView(APIView):
         the token refresh operation. On success, it includes the new access token.
         On failure, it includes error details.
     """
-    def get(self, request):
+    latency_budget_setting = "XERO_REFRESH_LATENCY_BUDGET"
 
-        token = XeroToken.objects.first()
-        if not token:
+    def get(self, request):
+        try:
+            get_access_token(request.query_params.get("tenant_id"), force_refresh=True)
+        except NoTokenError:
             return Response({"error": "No token found"}, status=status.HTTP_400_BAD_REQUEST)
-
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": token.refresh_token,
-            "client_id": env.str("XERO_CLIENT_ID"),
-            "client_secret": env.str("XERO_CLIENT_SECRET"),
-        }
-
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-
-        response = requests.post("https://identity.xero.com/connect/token", data=data, headers=headers)
-        response_data = response.json()
-
-        if response.status_code == 200 and "access_token" in response_data:
-            token.access_token = response_data["access_token"]
-            token.refresh_token = response_data["refresh_token"]
-            token.expires_in = response_data["expires_in"]
-            token.save()
-
+        except CircuitOpenError as exc:
+            return xero_unavailable_response(exc)
+        except LatencyBudgetExceededError as exc:
+            return budget_exceeded_response(exc)
+        except TokenRefreshError as exc:
             return Response(
-                {"message": "Token refreshed successfully"},
-                status=status.HTTP_200_OK
+                {"error": "Token refresh failed", "details": exc.details},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
         return Response(
-            {"error": "Token refresh failed", "details": response_data},
-            status=status.HTTP_400_BAD_REQUEST
+            {"message": "Token refreshed successfully"},
+            status=status.HTTP_200_OK
         )
 
-class UpdateChartOfAccountsAPIView(APIView):
+class UpdateChartOfAccountsAPIView(LatencyBudgetMixin, APIView):
     """
     Retrieve a list of Chart of Accounts from Xero.
 
@@ -135,6 +254,34 @@ class UpdateChartOfAccountsAPIView(APIView):
     message with the list of Chart of Accounts. If the request fails, it returns an error
     message with details of the failure.
 
+    Once a sync has completed, later calls are incremental: the stored watermark is
+    sent as ``If-Modified-Since`` and only accounts changed since then are fetched.
+    A full reconcile, which also removes accounts deleted in Xero, runs every
+    ``XERO_FULL_SYNC_INTERVAL`` seconds or when ``?full=true`` is passed.
+
+    When ``XERO_SYNC_IN_BACKGROUND`` is enabled the sync is queued for the
+    ``xero_worker`` command instead, and a 202 response with the job id is returned
+    straight away. Pass ``?wait=true`` to run the sync inside the request anyway.
+
+    ``?tenant_id=`` selects the tenant to sync, defaulting to the first
+    connection. ``?tenant_id=all`` syncs every tenant concurrently and reports
+    a summary per tenant.
+
+    ``?stream=true`` parses the Xero response incrementally and writes it in
+    batches, keeping memory flat for very large charts, and returns only the
+    created/updated/unchanged counts; add ``?echo=true`` to also return the
+    accounts. Background jobs always sync this way.
+
+    ``?fields=code,name`` limits the returned accounts to those fields.
+
+    Inline syncs are coalesced per tenant: a request arriving while the same
+    sync runs, or within ``XERO_SYNC_FRESH_SECONDS`` after it, gets that
+    sync's result without calling Xero.
+
+    Inline syncs are limited to ``XERO_SYNC_LATENCY_BUDGET``; past it the
+    response is a 504. While Xero's circuit breaker is open the response is
+    an immediate 503 with ``"degraded": true`` and a ``Retry-After``.
+
     Args:
         request: The HTTP request object.
 
@@ -143,57 +290,407 @@ class UpdateChartOfAccountsAPIView(APIView):
         the Chart of Accounts retrieval operation. On success, it includes the list of
         Chart of Accounts. On failure, it includes error details.
     """
+    renderer_classes = [FastJSONRenderer, *api_settings.DEFAULT_RENDERER_CLASSES]
+    latency_budget_setting = "XERO_SYNC_LATENCY_BUDGET"
+
     def get(self, request):
-        token = XeroToken.objects.first()
-        if not token:
-            return Response({"error": "No token found"}, status=status.HTTP_400_BAD_REQUEST)
+        full_sync = request.query_params.get("full") == "true"
+        tenant_id = request.query_params.get("tenant_id")
+        try:
+            serializer = parse_fields(request.query_params.get("fields"))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if settings.XERO_SYNC_IN_BACKGROUND and request.query_params.get("wait") != "true":
+            try:
+                priority = int(request.query_params.get("priority", 0))
+            except ValueError:
+                return Response({"error": "priority must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            params = {"full": True} if full_sync else {}
+            if tenant_id == "all":
+                job = enqueue("accounts_all", params, priority=priority)
+            else:
+                if tenant_id:
+                    params["tenant_id"] = tenant_id
+                job = enqueue("accounts", params, priority=priority)
+            return Response(
+                {
+                    "message": "Chart of Accounts sync queued",
+                    "job_id": str(job.pk),
+                    "status_url": reverse("xero-sync-job", kwargs={"job_id": job.pk}),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
 
-        headers = {
-            "Authorization": f"Bearer {token.access_token}",
-            "Accept": "application/json"
-        }
-        response = requests.get(XERO_ACCOUNTS_URL, headers=headers)
+        if tenant_id == "all":
+            try:
+                results = sync_all_tenants(full=full_sync)
+            except NoTokenError:
+                return Response({"error": "No token found"}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                {"message": "Chart of Accounts synced for all tenants", "tenants": results},
+                status=status.HTTP_200_OK,
+            )
 
-        if response.status_code == 401:
+        stream = request.query_params.get("stream") == "true"
+        echo = not stream or request.query_params.get("echo") == "true"
+        try:
+            result, ran = sync_chart_of_accounts_once(
+                full=full_sync, tenant_id=tenant_id, stream=stream, keep_accounts=echo
+            )
+        except NoTokenError:
+            return Response({"error": "No token found"}, status=status.HTTP_400_BAD_REQUEST)
+        except (TokenRefreshError, XeroUnauthorizedError):
             return Response({"error": "Unauthorized - Token expired"}, status=status.HTTP_401_UNAUTHORIZED)
-
-        data = response.json()
-
-        accounts_data = []
-        for account in data.get("Accounts", []):
-            account_obj, created = ChartOfAccount.objects.update_or_create(
-                account_id=account["AccountID"],
-                defaults={
-                    "code": account.get("Code"),
-                    "name": account.get("Name"),
-                    "type": account.get("Type"),
-                    "bank_account_number": account.get("BankAccountNumber"),
-                    "status": account.get("Status"),
-                    "description": account.get("Description"),
-                    "bank_account_type": account.get("BankAccountType"),
-                    "currency_code": account.get("CurrencyCode"),
-                    "tax_type": account.get("TaxType"),
-                    "enable_payments_to_account": account.get("EnablePaymentsToAccount", False),
-                    "show_in_expense_claims": account.get("ShowInExpenseClaims", False),
-                    "class_type": account.get("Class"),
-                    "system_account": account.get("SystemAccount"),
-                    "reporting_code": account.get("ReportingCode"),
-                    "reporting_code_name": account.get("ReportingCodeName"),
-                    "has_attachments": account.get("HasAttachments", False),
-                    "updated_date_utc": account.get("UpdatedDateUTC"),
-                    "add_to_watchlist": account.get("AddToWatchlist", False),
+        except RateLimitedError as exc:
+            return Response(
+                {"error": "Xero rate limit reached"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(math.ceil(exc.retry_after))},
+            )
+        except LatencyBudgetExceededError as exc:
+            return budget_exceeded_response(exc)
+        except XeroAPIError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_502_BAD_GATEWAY)
+        except SyncInProgressError as exc:
+            return sync_in_progress_response(exc)
+        except CircuitOpenError as exc:
+            return xero_unavailable_response(exc)
+
+        return Response(sync_response_data(result, ran, serializer, echo), status=status.HTTP_200_OK)
+
+class EntitySyncAPIView(LatencyBudgetMixin, APIView):
+    """
+    API endpoint to sync a paged Xero collection, e.g. ``/entities/contacts/update/``.
+
+    Any entity declared in ``features.xero.entities.ENTITIES`` can be synced;
+    the URL takes its lowercased name. Like the accounts update, the sync is
+    queued for the ``xero_worker`` command when ``XERO_SYNC_IN_BACKGROUND``
+    is enabled, unless ``?wait=true`` is passed, and accepts ``?full=true``
+    and ``?tenant_id=``. Inline syncs return the created/updated/unchanged
+    counts, and share the accounts update's latency budget and degraded 503.
+    """
+    latency_budget_setting = "XERO_SYNC_LATENCY_BUDGET"
+
+    def get(self, request, entity):
+        name = {name.lower(): name for name in ENTITIES}.get(entity.lower())
+        if name is None:
+            return Response({"error": f"Unknown entity: {entity}"}, status=status.HTTP_404_NOT_FOUND)
+        full_sync = request.query_params.get("full") == "true"
+        tenant_id = request.query_params.get("tenant_id")
+
+        if settings.XERO_SYNC_IN_BACKGROUND and request.query_params.get("wait") != "true":
+            params = {"entity": name}
+            if full_sync:
+                params["full"] = True
+            if tenant_id:
+                params["tenant_id"] = tenant_id
+            job = enqueue("entity", params)
+            return Response(
+                {
+                    "message": f"{name} sync queued",
+                    "job_id": str(job.pk),
+                    "status_url": reverse("xero-sync-job", kwargs={"job_id": job.pk}),
                 },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        try:
+            summary = sync_entity_once(name, full=full_sync, tenant_id=tenant_id)
+        except NoTokenError:
+            return Response({"error": "No token found"}, status=status.HTTP_400_BAD_REQUEST)
+        except (TokenRefreshError, XeroUnauthorizedError):
+            return Response({"error": "Unauthorized - Token expired"}, status=status.HTTP_401_UNAUTHORIZED)
+        except RateLimitedError as exc:
+            return Response(
+                {"error": "Xero rate limit reached"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(math.ceil(exc.retry_after))},
             )
-            accounts_data.append(account_obj)
+        except LatencyBudgetExceededError as exc:
+            return budget_exceeded_response(exc)
+        except XeroAPIError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_502_BAD_GATEWAY)
+        except SyncInProgressError as exc:
+            return sync_in_progress_response(exc)
+        except CircuitOpenError as exc:
+            return xero_unavailable_response(exc)
+
+        message = f"{name} are up to date" if summary["not_modified"] else f"{name} synced successfully"
+        return Response({"message": message, "summary": summary}, status=status.HTTP_200_OK)
+
+class XeroWebhookAPIView(APIView):
+    """
+    Receiver for Xero webhooks.
+
+    Xero signs each delivery with the webhook key and expects a 200 within
+    five seconds, or a 401 when the ``x-xero-signature`` header does not
+    match. The receiver only checks the signature, saves the events and
+    queues a ``webhook_events`` job; the job starts after
+    ``XERO_WEBHOOK_COALESCE_SECONDS`` so that events arriving meanwhile are
+    handled together, and fetches only the changed records.
+    """
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request):
+        body = request.body
+        if not verify_signature(body, request.headers.get("x-xero-signature")):
+            return Response(status=status.HTTP_401_UNAUTHORIZED)
+        try:
+            received = store_events(json.loads(body))
+        except (KeyError, TypeError, ValueError):
+            return Response({"error": "Invalid webhook payload"}, status=status.HTTP_400_BAD_REQUEST)
+        if received:
+            enqueue("webhook_events", delay=settings.XERO_WEBHOOK_COALESCE_SECONDS)
+        return Response(status=status.HTTP_200_OK)
+
+class ReplicaReadMixin:
+    """
+    Serve a view's reads from a read replica.
+
+    Reads stay on the primary for ``DATABASE_REPLICA_LAG`` seconds after a
+    sync commits changes to the ``replica_generation`` data set, so a client
+    that has just synced reads its own writes. The queryset is bound to the
+    chosen database, which keeps streamed responses on it too.
+    """
+    replica_generation = ACCOUNTS
 
-        serializer = ChartOfAccountSerializer(accounts_data, many=True)
-        return Response({"message": "Chart of Accounts retrieved successfully", "data": serializer.data}, status=status.HTTP_200_OK)
+    def dispatch(self, request, *args, **kwargs):
+        with read_from_replica(replicas_caught_up(self.replica_generation)) as alias:
+            self.read_alias = alias
+            return super().dispatch(request, *args, **kwargs)
 
-class ChartOfAccountsAllAPIView(ListAPIView):
+    def get_queryset(self):
+        return super().get_queryset().using(self.read_alias)
+
+class ChartOfAccountsAllAPIView(ReplicaReadMixin, ListAPIView):
     """
     API endpoint to retrieve all Chart of Accounts.
 
-    Returns a list of all Chart of Accounts from Xero.
+    Returns a list of all Chart of Accounts from Xero. Pass ``?tenant_id=`` to
+    only list the accounts of one tenant, and filter on ``type``, ``status``,
+    ``class_type``, ``currency_code``, ``tax_type``, ``reporting_code`` or the
+    boolean flags, e.g. ``?type=EXPENSE&status=ACTIVE``. Comma separated
+    values match any of them.
+
+    Pages are keyset-paginated on ``(name, account_id)``: follow the ``next``
+    and ``previous`` links, which carry an opaque ``?cursor=``. ``?page_size=``
+    sets the page size, up to ``XERO_ACCOUNTS_MAX_PAGE_SIZE``. Passing
+    ``?page=N`` switches to numbered pages with a total ``count``, which get
+    slower the deeper they go.
+
+    Responses carry an ``ETag`` and ``Last-Modified`` taken from the accounts
+    sync generation, and conditional requests are answered with ``304`` until
+    a sync commits changes. Rendered pages are cached per URL for the current
+    generation, so repeated polls do not query the accounts table. Reads go
+    to a replica when ``DATABASE_REPLICA_URLS`` are configured.
+
+    ``?fields=code,name`` returns only those fields and reads only their
+    columns (plus the cursor's); unknown fields are rejected with a 400.
     """
     queryset = ChartOfAccount.objects.all()
     serializer_class = ChartOfAccountSerializer
+    filter_backends = [ChartOfAccountFilterBackend]
+    renderer_classes = [FastJSONRenderer, *api_settings.DEFAULT_RENDERER_CLASSES]
+    # Serialize pages from values() rows; set to None to use serializer_class.
+    values_serializer = account_values_serializer
+    # The fields picked with ?fields=, set per request.
+    fields_serializer = account_values_serializer
+
+    @method_decorator(condition(etag_func=accounts_etag, last_modified_func=accounts_last_modified))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        try:
+            self.fields_serializer = parse_fields(request.query_params.get("fields"))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        generation = get_generation(ACCOUNTS)
+        key = page_cache_key(generation, request, request.accepted_renderer.format)
+        data = page_cache().get(key)
+        if data is None:
+            data = self.render_page(request, *args, **kwargs).data
+            page_cache().set(key, data, settings.XERO_PAGE_CACHE_TIMEOUT)
+
+        response = Response(data)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.fields_serializer is not account_values_serializer:
+            queryset = queryset.only(*self.fields_serializer.field_names, *AccountKeysetPagination.ordering)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.fields_serializer is not account_values_serializer:
+            kwargs["fields"] = self.fields_serializer.field_names
+        return super().get_serializer(*args, **kwargs)
+
+    def render_page(self, request, *args, **kwargs):
+        if self.values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.values_serializer.restrict(self.fields_serializer.field_names)
+        # The keyset cursor is taken from the rows, so its columns are read
+        # even when not asked for, and dropped once the links are built.
+        extra = [name for name in AccountKeysetPagination.ordering if name not in serializer.field_names]
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()), *extra)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            data = serializer.serialize_rows(queryset)
+            response = Response(data)
+        else:
+            data = serializer.serialize_rows(page)
+            response = self.get_paginated_response(data)
+        for row in data:
+            for name in extra:
+                del row[name]
+        return response
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if "page" in self.request.query_params:
+                self._paginator = AccountPageNumberPagination()
+            else:
+                self._paginator = AccountKeysetPagination()
+        return self._paginator
+
+class ChartOfAccountsExportAPIView(ReplicaReadMixin, GenericAPIView):
+    """
+    Stream every Chart of Account in one response, as NDJSON (the default) or
+    CSV with ``?export_format=csv``.
+
+    Accepts the same filters as ``ChartOfAccountsAllAPIView``. Rows are read
+    from the database in chunks of ``XERO_EXPORT_CHUNK_SIZE`` and written out
+    as they are serialized, so memory use does not grow with the table and
+    the first bytes are sent immediately. The body is gzipped when the client
+    sends ``Accept-Encoding: gzip``. Like the list, the export carries an
+    ``ETag`` and answers conditional requests with ``304``.
+
+    Returns:
+        StreamingHttpResponse: The accounts, or a 400 for an unknown format.
+    """
+    queryset = ChartOfAccount.objects.all()
+    filter_backends = [ChartOfAccountFilterBackend]
+
+    @method_decorator(condition(etag_func=accounts_etag, last_modified_func=accounts_last_modified))
+    def get(self, request):
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format not in EXPORTERS:
+            return Response(
+                {"error": f"export_format must be one of: {', '.join(EXPORTERS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        content = EXPORTERS[export_format](queryset)
+        response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[export_format])
+        response["Content-Disposition"] = f'attachment; filename="chart-of-accounts.{export_format}"'
+
+        patch_vary_headers(response, ["Accept-Encoding"])
+        if "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", ""):
+            response.streaming_content = compress_sequence(response.streaming_content)
+            response["Content-Encoding"] = "gzip"
+        patch_cache_control(response, no_cache=True)
+        return response
+
+class ChartOfAccountsSnapshotAPIView(APIView):
+    """
+    Serve every Chart of Account as one prebuilt JSON array.
+
+    The body is built once per sync generation by ``features.xero.snapshots``
+    and stored gzipped, and brotli-compressed when brotli is installed, next
+    to the plain JSON. Requests only pick the coding the client accepts and
+    stream the stored bytes in chunks straight from the memory-mapped file,
+    without a query, serialization or a copy of the whole body. Each coding
+    has its own ``ETag`` derived from the content hash, and conditional
+    requests are answered with ``304``.
+    """
+    def get(self, request):
+        snapshot = get_snapshot()
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), snapshot.parts)
+        etag = snapshot.etag(encoding)
+
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            if isinstance(request._request, ASGIRequest):
+                chunks = snapshot.aiter_part(encoding)
+            else:
+                chunks = snapshot.iter_part(encoding)
+            response = StreamingHttpResponse(chunks, content_type="application/json")
+            response["Content-Length"] = len(snapshot.parts[encoding])
+            if encoding != "identity":
+                response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        response["X-Snapshot-Generation"] = str(snapshot.generation)
+        patch_vary_headers(response, ["Accept-Encoding"])
+        patch_cache_control(response, no_cache=True)
+        return response
+
+class ChartOfAccountChangesAPIView(APIView):
+    """
+    Feed of the changes syncs made to the Chart of Accounts, for consumers
+    keeping a mirror up to date without downloading every account.
+
+    Entries are returned in sequence order after ``?since=<cursor>``, each
+    with its ``operation`` and, unless the account was deleted, its current
+    values. Pass the returned ``cursor`` as ``since`` on the next call;
+    ``has_more`` says whether to call again straight away. ``?page_size=``
+    sets the number of entries, up to ``XERO_CHANGES_MAX_PAGE_SIZE``, and
+    ``?tenant_id=`` limits the feed to one tenant. Treat ``created`` and
+    ``updated`` alike as upserts: compaction keeps only the last entry of
+    each account.
+
+    Entries older than ``XERO_CHANGES_RETENTION_DAYS`` are dropped by the
+    ``xero_compact_changes`` command, which raises the ``horizon``, the
+    oldest cursor still served. A cursor before it gets a 410 carrying the
+    ``horizon`` and the current ``cursor``: download ``/accounts/all/`` in
+    full, then follow the feed from that cursor. New consumers start with
+    ``since=0``, which replays the whole log until the first compaction
+    expires entries and gets the 410 from then on.
+    """
+    def get(self, request):
+        try:
+            since = int(request.query_params.get("since", 0))
+            page_size = int(request.query_params.get("page_size", settings.XERO_CHANGES_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "since and page_size must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or page_size < 1:
+            return Response({"error": "since and page_size must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = min(page_size, settings.XERO_CHANGES_MAX_PAGE_SIZE)
+
+        horizon = get_horizon()
+        if since < horizon:
+            latest = ChartOfAccountChange.objects.order_by("-seq").values_list("seq", flat=True).first()
+            return Response(
+                {
+                    "error": "Cursor has expired, download the accounts in full",
+                    "horizon": horizon,
+                    "cursor": latest or since,
+                },
+                status=status.HTTP_410_GONE,
+            )
+
+        changes, has_more = changes_since(since, page_size, tenant_id=request.query_params.get("tenant_id"))
+        response = Response({
+            "changes": changes,
+            "cursor": changes[-1]["seq"] if changes else since,
+            "has_more": has_more,
+        })
+        patch_cache_control(response, no_cache=True)
+        return response
+
+class SyncJobAPIView(RetrieveAPIView):
+    """
+    API endpoint to report the status and timings of a background sync job.
+    """
+    queryset = SyncJob.objects.all()
+    serializer_class = SyncJobSerializer
+    lookup_url_kwarg = "job_id"